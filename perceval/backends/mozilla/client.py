@@ -0,0 +1,461 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+
+import asyncio
+import email.utils
+import logging
+import random
+import time
+
+import requests
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .codec import JSONCodec
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+
+# Seconds to wait for the server to accept a connection or to send data
+DEFAULT_TIMEOUT = 60
+
+# Default values of the retry policy
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF_FACTOR = 1
+DEFAULT_MAX_BACKOFF = 120
+DEFAULT_MAX_ELAPSED = 600
+
+# Status codes of the responses that can be retried
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+
+def create_session(pool_size=DEFAULT_POOL_SIZE, keep_alive=True):
+    """Create a pooled HTTP session.
+
+    The session keeps up to `pool_size` connections open for each
+    host, so they are reused by the next requests instead of opening
+    a new connection each time. Responses are requested compressed
+    with gzip. When `keep_alive` is `False`, connections will be
+    closed after each request.
+
+    :param pool_size: maximum number of connections kept per host
+    :param keep_alive: keep connections open among requests
+
+    :returns: a `requests.Session` object
+    """
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size,
+                                            pool_maxsize=pool_size)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+
+    return session
+
+
+class RetryPolicy:
+    """Policy to retry failed requests.
+
+    Requests are retried when the connection fails or when the server
+    answers with one of `status_codes`, up to `max_retries` times. The
+    time to wait before each retry grows exponentially, starting on
+    `backoff_factor` seconds and up to `max_backoff` seconds. Half of
+    this time is randomized (jitter), so clients which failed at the
+    same time do not retry at the same time, too. When the server
+    sends a `Retry-After` header, its value is waited instead. No
+    more retries are done when waiting for the next one would exceed
+    `max_elapsed` seconds since the first request was sent.
+
+    The policy keeps no state between calls, so it can be shared by
+    several clients and threads. Asynchronous clients retry with
+    `call_async`, which waits with `async_sleep` without blocking the
+    event loop. `clock`, `sleep`, `async_sleep` and `random` can be
+    replaced to test it without waiting.
+
+    :param max_retries: maximum number of retries
+    :param backoff_factor: seconds to wait before the first retry
+    :param max_backoff: maximum seconds to wait between retries
+    :param max_elapsed: maximum seconds spent retrying a request
+    :param status_codes: status codes of the responses to retry
+    :param clock: function which returns the current UNIX time
+    :param sleep: function to wait the given seconds
+    :param async_sleep: coroutine function to wait the given seconds
+    :param random: function which returns a random float in [0, 1)
+    """
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                 max_backoff=DEFAULT_MAX_BACKOFF,
+                 max_elapsed=DEFAULT_MAX_ELAPSED,
+                 status_codes=RETRY_STATUS_CODES,
+                 clock=time.time, sleep=time.sleep, async_sleep=asyncio.sleep,
+                 random=random.random):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.max_elapsed = max_elapsed
+        self.status_codes = status_codes
+        self.clock = clock
+        self.sleep = sleep
+        self.async_sleep = async_sleep
+        self.random = random
+
+    def call(self, send):
+        """Send a request, retrying it according to the policy.
+
+        :param send: function which sends the request and returns
+            its response
+
+        :returns: the last response received
+
+        :raises ConnectionError: when the last request could not
+            be sent
+        """
+        started_on = self.clock()
+        retries = 0
+
+        while True:
+            try:
+                response = send()
+                error = None
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout) as e:
+                response = None
+                error = e
+
+            delay = self.__retry_delay(retries, started_on, response, error)
+
+            if delay is None:
+                break
+
+            self.sleep(delay)
+            retries += 1
+
+        if error:
+            raise error
+
+        return response
+
+    async def call_async(self, send):
+        """Send a request, retrying it according to the policy.
+
+        Asynchronous counterpart of `call`.
+
+        :param send: coroutine function which sends the request
+            and returns its response
+
+        :returns: the last response received
+
+        :raises ConnectionError: when the last request could not
+            be sent
+        """
+        started_on = self.clock()
+        retries = 0
+
+        while True:
+            try:
+                response = await send()
+                error = None
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout) as e:
+                response = None
+                error = e
+
+            delay = self.__retry_delay(retries, started_on, response, error)
+
+            if delay is None:
+                break
+
+            await self.async_sleep(delay)
+            retries += 1
+
+        if error:
+            raise error
+
+        return response
+
+    def __retry_delay(self, retries, started_on, response, error):
+        """Seconds to wait before retrying a request, if it is retried.
+
+        :returns: the seconds to wait or `None` when the request
+            succeeded or it must not be retried again
+        """
+        if response is not None and response.status_code not in self.status_codes:
+            return None
+
+        if retries >= self.max_retries:
+            return None
+
+        delay = self.delay(retries, response)
+
+        if self.clock() + delay - started_on > self.max_elapsed:
+            logger.warning("Retries of the request would exceed %s seconds; giving up",
+                           self.max_elapsed)
+            return None
+
+        if error:
+            cause = str(error)
+        else:
+            cause = "status code %s" % response.status_code
+            response.close()
+
+        logger.warning("Request failed (%s); retrying in %.2f seconds", cause, delay)
+
+        return delay
+
+    def delay(self, retries, response=None):
+        """Seconds to wait before the next retry.
+
+        :param retries: number of retries already done
+        :param response: failed response, if any
+        """
+        retry_after = self.retry_after(response) if response is not None else None
+
+        if retry_after is not None:
+            return retry_after
+
+        backoff = min(self.max_backoff, self.backoff_factor * (2 ** retries))
+
+        return backoff / 2 + self.random() * backoff / 2
+
+    def retry_after(self, response):
+        """Seconds to wait set in the `Retry-After` header of a response.
+
+        The header can be set in seconds or as an HTTP date. When it is
+        not set or its value is not valid, `None` is returned.
+        """
+        value = response.headers.get('Retry-After', None)
+
+        if not value:
+            return None
+
+        try:
+            return max(0, float(value))
+        except ValueError:
+            pass
+
+        date = email.utils.parsedate_tz(value)
+
+        if not date:
+            return None
+
+        return max(0, email.utils.mktime_tz(date) - self.clock())
+
+
+class HttpClient:
+    """Base class for HTTP clients.
+
+    Requests are sent using a session that pools the connections
+    to the servers. A session can be shared by several clients
+    passing it on the `session` parameter. When it is not given,
+    a new session is created.
+
+    Failed requests are retried according to `retry_policy`. When
+    it is not given, a `RetryPolicy` with the default values is used.
+    When a `rate_limiter` is given, each request, including retries,
+    waits until the limiter allows it to be sent. JSON responses are
+    decoded with `codec`, or with the fastest `JSONCodec` installed
+    when it is not given. A request times out, and it is retried,
+    when the server does not accept the connection or does not send
+    data for `timeout` seconds.
+
+    :param session: `requests.Session` used to send the requests
+    :param retry_policy: `RetryPolicy` to retry failed requests
+    :param rate_limiter: `RateLimiter` to pace the requests
+    :param codec: `JSONCodec` to decode JSON responses
+    :param timeout: seconds to wait for the server; `None` to wait
+        forever
+
+    :raises HTTPError: when an error occurs doing the request
+    """
+    def __init__(self, session=None, retry_policy=None, rate_limiter=None, codec=None,
+                 timeout=DEFAULT_TIMEOUT):
+        self.session = session if session else create_session()
+        self.retry_policy = retry_policy if retry_policy else RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.codec = codec if codec else JSONCodec()
+        self.timeout = timeout
+
+    def fetch(self, url, params=None, headers=None, stream=False):
+        """Send a GET request to the server.
+
+        :param url: URL of the request
+        :param params: dict with the HTTP parameters of the request
+        :param headers: dict with extra headers of the request
+        :param stream: when `True`, the body of the response is not
+            downloaded until it is read
+
+        :returns: the response of the server
+        """
+        def send():
+            if self.rate_limiter:
+                self.rate_limiter.acquire(url)
+            return self.session.get(url, params=params, headers=headers,
+                                    stream=stream, timeout=self.timeout)
+
+        response = self.retry_policy.call(send)
+        response.raise_for_status()
+
+        return response
+
+    def fetch_json(self, url, params=None, headers=None):
+        """Send a GET request to the server and decode its JSON response.
+
+        The document is decoded straight from the bytes of the body,
+        which is never converted to text.
+
+        :param url: URL of the request
+        :param params: dict with the HTTP parameters of the request
+        :param headers: dict with extra headers of the request
+
+        :returns: a tuple with the body of the response, as bytes,
+            and its decoded JSON object
+        """
+        content = self.fetch(url, params=params, headers=headers).content
+
+        return content, self.codec.loads(content)
+
+
+class AsyncHttpClient:
+    """Base class for asynchronous HTTP clients.
+
+    Asynchronous counterpart of `HttpClient`, based on `aiohttp`.
+    Clients must be opened with `async with` before sending any
+    request. When no `session` is given, a pooled session is created
+    when the client is opened and closed with it. Otherwise, the
+    session is shared and it is not closed by the client.
+
+    Failed requests are retried according to `retry_policy`, or a
+    `RetryPolicy` with the default values, waiting without blocking
+    the event loop. Errors returned by the server are raised as
+    `HTTPError` exceptions and connection errors and timeouts as
+    their `requests` exceptions, like in synchronous clients. When a
+    `rate_limiter` is given, each request, including retries, waits
+    without blocking the event loop until the limiter allows it to
+    be sent. JSON responses are decoded with `codec`, or with the
+    fastest `JSONCodec` installed.
+
+    :param session: `aiohttp.ClientSession` used to send the requests
+    :param pool_size: maximum number of connections of the session
+        created by the client
+    :param rate_limiter: `RateLimiter` to pace the requests
+    :param codec: `JSONCodec` to decode JSON responses
+    :param retry_policy: `RetryPolicy` to retry failed requests
+    :param timeout: seconds to wait for the server; `None` to wait
+        forever
+
+    :raises ImportError: when `aiohttp` is not installed
+    :raises HTTPError: when an error occurs doing the request
+    """
+    def __init__(self, session=None, pool_size=DEFAULT_POOL_SIZE, rate_limiter=None,
+                 codec=None, retry_policy=None, timeout=DEFAULT_TIMEOUT):
+        if not aiohttp:
+            raise ImportError("aiohttp package is required by asynchronous clients")
+
+        self.session = session
+        self.pool_size = pool_size
+        self.rate_limiter = rate_limiter
+        self.codec = codec if codec else JSONCodec()
+        self.retry_policy = retry_policy if retry_policy else RetryPolicy()
+        self.timeout = timeout
+        self._close_session = session is None
+
+    async def __aenter__(self):
+        if not self.session:
+            connector = aiohttp.TCPConnector(limit=self.pool_size)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 headers={'Accept-Encoding': 'gzip, deflate'})
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if self._close_session and self.session:
+            await self.session.close()
+            self.session = None
+
+    async def fetch(self, url, params=None, headers=None):
+        """Send a GET request to the server.
+
+        :param url: URL of the request
+        :param params: dict with the HTTP parameters of the request
+        :param headers: dict with extra headers of the request
+
+        :returns: the body of the response, as bytes
+        """
+        if params:
+            params = {key: str(value) for key, value in params.items()}
+
+        timeout = aiohttp.ClientTimeout(sock_connect=self.timeout, sock_read=self.timeout)
+
+        async def send():
+            if self.rate_limiter:
+                wait = self.rate_limiter.reserve(url)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+            try:
+                async with self.session.get(url, params=params, headers=headers,
+                                            timeout=timeout) as response:
+                    content = await response.read()
+            except asyncio.TimeoutError as e:
+                raise requests.exceptions.Timeout(str(e) or "timeout reading %s" % url)
+            except aiohttp.ClientConnectionError as e:
+                raise requests.exceptions.ConnectionError(str(e))
+
+            return _response(response, content)
+
+        response = await self.retry_policy.call_async(send)
+        response.raise_for_status()
+
+        return response.content
+
+    async def fetch_json(self, url, params=None, headers=None):
+        """Send a GET request to the server and decode its JSON response.
+
+        :param url: URL of the request
+        :param params: dict with the HTTP parameters of the request
+        :param headers: dict with extra headers of the request
+
+        :returns: a tuple with the body of the response, as bytes,
+            and its decoded JSON object
+        """
+        content = await self.fetch(url, params=params, headers=headers)
+
+        return content, self.codec.loads(content)
+
+
+def _response(response, content):
+    """Build a `requests` response from an `aiohttp` response and its body"""
+
+    result = requests.models.Response()
+    result.status_code = response.status
+    result.reason = response.reason
+    result.url = str(response.url)
+    result.headers = requests.structures.CaseInsensitiveDict(response.headers)
+    result._content = content
+    result._content_consumed = True
+
+    return result
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+ORJSON_CODEC = 'orjson'
+UJSON_CODEC = 'ujson'
+STDLIB_CODEC = 'json'
+
+# Codecs from the fastest to the slowest one
+JSON_CODECS = (ORJSON_CODEC, UJSON_CODEC, STDLIB_CODEC)
+
+
+def default_codec():
+    """Name of the fastest JSON codec installed"""
+
+    if orjson:
+        return ORJSON_CODEC
+    elif ujson:
+        return UJSON_CODEC
+    else:
+        return STDLIB_CODEC
+
+
+class JSONCodec:
+    """Encode and decode JSON documents.
+
+    The library used is selected with `name`: 'orjson', 'ujson' or
+    'json' (the standard library). When it is not given, the fastest
+    one installed is used. Documents can be decoded from `str` or
+    from UTF-8 encoded `bytes`, so the body of a response can be
+    decoded without converting it to text first. Decoding errors are
+    raised as `ValueError` exceptions by all of them. Documents are
+    always encoded into UTF-8 `bytes`, like the bodies of responses.
+
+    :param name: name of the codec
+
+    :raises ValueError: when the codec is not supported
+    :raises ImportError: when the library of the codec is not installed
+    """
+    def __init__(self, name=None):
+        if not name:
+            name = default_codec()
+
+        if name == ORJSON_CODEC:
+            if not orjson:
+                raise ImportError("orjson package is required by '%s' codec" % name)
+            self.loads = orjson.loads
+            self._dumps = orjson.dumps
+        elif name == UJSON_CODEC:
+            if not ujson:
+                raise ImportError("ujson package is required by '%s' codec" % name)
+            self.loads = ujson.loads
+            self._dumps = ujson.dumps
+        elif name == STDLIB_CODEC:
+            self.loads = json.loads
+            self._dumps = json.dumps
+        else:
+            raise ValueError("JSON codec %s not supported; valid codecs are %s"
+                             % (name, ', '.join(JSON_CODECS)))
+
+        self.name = name
+
+    def dumps(self, obj):
+        """Encode an object into a JSON document.
+
+        :param obj: object to encode
+
+        :returns: `bytes` with the document
+        """
+        data = self._dumps(obj)
+
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        return data
@@ -20,8 +20,13 @@
 #     Valerio Cosentino <valcos@bitergia.com>
 #
 
-import json
+import asyncio
+import collections
+import concurrent.futures
+import hashlib
 import logging
+import os
+import sqlite3
 import time
 
 import requests
@@ -35,7 +40,20 @@ from ...backend import (Backend,
                         BackendCommand,
                         BackendCommandArgumentParser,
                         metadata)
+from ...errors import CacheError
 from ...utils import DEFAULT_DATETIME
+from .client import (DEFAULT_POOL_SIZE,
+                     DEFAULT_TIMEOUT,
+                     AsyncHttpClient,
+                     HttpClient,
+                     RetryPolicy,
+                     create_session)
+from .codec import JSON_CODECS, JSONCodec
+from .ratelimit import get_rate_limiter
+from .utils import (async_metadata,
+                    load_state,
+                    ordered_imap,
+                    save_state)
 
 CRATES_URL = "https://crates.io/"
 CRATES_API_URL = 'https://crates.io/api/v1/'
@@ -44,6 +62,21 @@ CRATES_CATEGORY = 'crates'
 SUMMARY_CATEGORY = 'summary'
 
 SLEEP_TIME = 300
+DEFAULT_WORKERS = 1
+
+# Orders of the crates listing
+SORT_ALPHABETICAL = 'alphabetical'
+SORT_RECENT_UPDATES = 'recent-updates'
+
+# Resources requested to build a crate item, in this order
+CRATE_RESOURCES = ('crate', 'owner_team', 'owner_user', 'downloads')
+SUB_RESOURCES = CRATE_RESOURCES[1:]
+
+# Seconds between checks of the sub-resources of unchanged crates
+DEFAULT_REFRESH_INTERVAL = 7 * 24 * 60 * 60
+
+# Minimum seconds between writes of the checkpoint file
+DEFAULT_CHECKPOINT_INTERVAL = 10
 
 logger = logging.getLogger(__name__)
 
@@ -51,44 +84,186 @@ logger = logging.getLogger(__name__)
 class Crates(Backend):
     """Crates.io backend for Perceval.
 
-    This class allows the fetch the packages stored in Crates.io
+    This class allows the fetch the packages stored in Crates.io.
+    When `workers` is greater than one, the resources of several
+    crates are requested in parallel. Crates are always returned
+    in the same order they are listed by the API.
+
+    By default, the whole registry is listed in alphabetical order.
+    In `incremental` mode, crates are listed from the most recently
+    updated to the least one and the listing stops at the first
+    crate updated before `from_date`, so only the pages with the
+    crates updated since then are requested.
+
+    When `index_path` is given, `fetch` keeps in that file an index
+    of the crates already fetched (see `CratesIndex`). Crates with
+    the same update date in the listing are not requested again.
+    Their sub-resources (owners and downloads), which change without
+    updating the crate, are checked every `refresh_interval` seconds;
+    only when they changed, the crate is requested and returned.
+
+    Crates can be fetched resuming an interrupted fetch from a token
+    (see `CratesCheckpoint`). When `checkpoint_path` is given, the
+    position of the fetch in the listing is stored in that file every
+    `checkpoint_interval` seconds and when the fetch is interrupted.
+    The next fetch resumes from there unless another token is given.
+    The file is removed once all the crates are fetched.
+
+    When a cache is given, the pages of the listing and the resources
+    of each crate are stored in it, so the same items can be fetched
+    again from the cache, without sending any request.
 
     :param sleep_time: sleep time in case of connection lost
     :param tag: label used to mark the data
     :param cache: use issues already retrieved in cache
+    :param workers: number of crates fetched in parallel
+    :param incremental: list crates by their update date
+    :param index_path: path of the index of crates
+    :param refresh_interval: seconds between checks of the
+        sub-resources of the crates in the index
+    :param rate_limit: maximum number of requests per second sent
+        to the server
+    :param rate_limit_path: directory to share the rate limit with
+        other processes
+    :param json_codec: name of the codec to decode JSON documents;
+        by default, the fastest one installed
+    :param checkpoint_path: path of the file to store the position
+        of the fetch
+    :param checkpoint_interval: minimum seconds between writes of
+        the checkpoint file
     """
-    version = '0.1.2'
+    version = '0.5.0'
 
-    def __init__(self, sleep_time=SLEEP_TIME, tag=None, cache=None):
+    def __init__(self, sleep_time=SLEEP_TIME, tag=None, cache=None,
+                 workers=DEFAULT_WORKERS, incremental=False, index_path=None,
+                 refresh_interval=DEFAULT_REFRESH_INTERVAL, rate_limit=None,
+                 rate_limit_path=None, json_codec=None, checkpoint_path=None,
+                 checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL):
         origin = CRATES_URL
 
         super().__init__(origin, tag=tag, cache=cache)
-        self.client = CratesClient(sleep_time=sleep_time)
+
+        # Keep a connection open for each concurrent request
+        pool_size = max(DEFAULT_POOL_SIZE, workers * len(CRATE_RESOURCES))
+        session = create_session(pool_size=pool_size)
+
+        self.rate_limiter = None
+        if rate_limit:
+            self.rate_limiter = get_rate_limiter(rate_limit, path=rate_limit_path)
+
+        self.codec = JSONCodec(json_codec)
+        self.client = CratesClient(sleep_time=sleep_time, session=session,
+                                   rate_limiter=self.rate_limiter, codec=self.codec)
+        self.workers = workers
+        self.incremental = incremental
+        self.index_path = index_path
+        self.refresh_interval = refresh_interval
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
 
     @metadata
-    def fetch(self, from_date=DEFAULT_DATETIME, category=CRATES_CATEGORY):
+    def fetch(self, from_date=DEFAULT_DATETIME, category=CRATES_CATEGORY,
+              resume_token=None):
         """Fetch package data.
 
         The method retrieves packages and summary from Crates.io.
 
         :param from_date: obtain packages updated since this date
         :param category: select the category to fetch (crates or summary)
+        :param resume_token: token of the checkpoint to resume the
+            fetch of crates from
 
         :returns: a summary and crate items
+
+        :raises ValueError: when the resume token is not valid
         """
 
         if category == CRATES_CATEGORY:
-            return self.__fetch_crates(from_date)
+            return self.__fetch_crates(from_date, resume_token)
         else:
             return self.__fetch_summary()
 
+    @async_metadata
+    async def fetch_async(self, from_date=DEFAULT_DATETIME, category=CRATES_CATEGORY,
+                          session=None):
+        """Fetch package data asynchronously.
+
+        Asynchronous counterpart of `fetch`. Items are the same ones
+        `fetch` returns. The resources of a crate are requested
+        concurrently and up to `workers` crates are in flight.
+        Neither the index of crates nor checkpoints are used.
+
+        :param from_date: obtain packages updated since this date
+        :param category: select the category to fetch (crates or summary)
+        :param session: `aiohttp.ClientSession` used to send the requests;
+            a new one is created when it is not given
+
+        :returns: an asynchronous generator of summary and crate items
+        """
+        pool_size = max(DEFAULT_POOL_SIZE, self.workers * len(CRATE_RESOURCES))
+
+        async with AsyncCratesClient(session=session, pool_size=pool_size,
+                                     rate_limiter=self.rate_limiter,
+                                     codec=self.codec) as client:
+            self._purge_cache_queue()
+
+            if category == CRATES_CATEGORY:
+                async for crate in self.__fetch_crates_async(client, from_date):
+                    yield crate
+                    self._flush_cache_queue()
+            else:
+                raw_summary = await client.summary()
+
+                yield self.__build_summary(raw_summary)
+                self._flush_cache_queue()
+
+    @metadata
+    def fetch_from_cache(self):
+        """Fetch the summary and the crates from the cache.
+
+        Items are the same ones the fetch process stored in the
+        cache returned, in the same order.
+
+        :returns: a generator of summary and crate items
+
+        :raises CacheError: raised when an error occurs accessing the
+            cache
+        """
+        logger.info("Retrieving cached Crates.io items: '%s'", self.origin)
+
+        if not self.cache:
+            raise CacheError(cause="cache instance was not provided")
+
+        cache_items = self.cache.retrieve()
+
+        nitems = 0
+
+        for raw_item in cache_items:
+            data = self.codec.loads(raw_item)
+
+            if 'num_downloads' in data:
+                # The summary is stored with its fetch date
+                yield data
+            elif 'crate' in data:
+                # The resources of a crate are stored in a row
+                raw_sub_resources = [next(cache_items) for _ in SUB_RESOURCES]
+                yield self.__add_sub_resources(data['crate'], *raw_sub_resources)
+            else:
+                # Pages of the listing are not needed to build the items
+                continue
+
+            nitems += 1
+
+        logger.info("Retrieval process completed: %s items retrieved from cache",
+                    nitems)
+
     @classmethod
     def has_caching(cls):
         """Returns whether it supports caching items on the fetch process.
 
         :returns: this backend supports items cache
         """
-        return False
+        return True
 
     @classmethod
     def has_resuming(cls):
@@ -96,7 +271,7 @@ class Crates(Backend):
 
         :returns: this backend supports items resuming
         """
-        return False
+        return True
 
     @staticmethod
     def metadata_id(item):
@@ -145,78 +320,536 @@ class Crates(Backend):
     def __fetch_summary(self):
         """Fetch summary"""
 
+        self._purge_cache_queue()
+
         raw_summary = self.client.summary()
-        summary = json.loads(raw_summary)
+
+        yield self.__build_summary(raw_summary)
+        self._flush_cache_queue()
+
+    def __build_summary(self, raw_summary):
+        """Build the summary item, adding the date when it was fetched"""
+
+        summary = self.codec.loads(raw_summary)
         summary['fetched_on'] = str(datetime_utcnow())
 
-        yield summary
+        # Store the fetch date too; the item would change otherwise
+        self._push_cache_queue(self.codec.dumps(summary))
+
+        return summary
 
-    def __fetch_crates(self, from_date):
+    def __fetch_crates(self, from_date, resume_token):
         """Fetch crates"""
 
         from_date = datetime_to_utc(from_date)
+        sort = SORT_RECENT_UPDATES if self.incremental else SORT_ALPHABETICAL
 
-        crates_groups = self.client.crates()
+        checkpoint = CratesCheckpoint(self.checkpoint_path, sort=sort,
+                                      interval=self.checkpoint_interval)
 
-        for raw_crates in crates_groups:
-            crates = json.loads(raw_crates)
+        if not resume_token:
+            resume_token = checkpoint.load()
 
-            for crate_container in crates['crates']:
+        from_page, after_crate = CratesCheckpoint.parse_token(resume_token)
+
+        if resume_token:
+            logger.info("Resuming the fetch of crates from page %i after crate '%s'",
+                        from_page, after_crate)
+
+        listing = self.__list_crates(sort, from_page, after_crate)
 
-                if str_to_datetime(crate_container['updated_at']) < from_date:
-                    continue
+        if self.incremental:
+            crates = self.__fetch_recent_crates(listing, from_date)
+        else:
+            crates = self.__fetch_listed_crates(listing, from_date)
 
-                crate_id = crate_container['id']
+        crates = checkpoint.track(crates)
 
-                crate = self.__fetch_crate_data(crate_id)
-                crate['owner_team_data'] = self.__fetch_crate_owner_team(crate_id)
-                crate['owner_user_data'] = self.__fetch_crate_owner_user(crate_id)
-                crate['version_downloads_data'] = self.__fetch_crate_version_downloads(crate_id)
+        self._purge_cache_queue()
 
+        try:
+            for crate in self.__fetch_tracked_crates(crates, checkpoint):
                 yield crate
+        except BaseException:
+            # Interrupted; keep the position of the last crate fetched
+            checkpoint.save()
+            raise
+        else:
+            checkpoint.clear()
 
-    def __fetch_crate_owner_team(self, crate_id):
-        """Get crate team owner"""
+        # Store the pages of the listing read after the last crate
+        self._flush_cache_queue()
 
-        raw_owner_team = self.client.crate_attribute(crate_id, 'owner_team')
+    def __fetch_tracked_crates(self, crates, checkpoint):
+        """Fetch the given crates, marking each one as done in the checkpoint.
 
-        owner_team = json.loads(raw_owner_team)
+        A crate is done once the next one is requested, so the crate
+        being processed when the fetch is interrupted is fetched again.
+        """
 
-        return owner_team
+        if self.index_path:
+            with CratesIndex(self.index_path) as index:
+                for crate in self.__fetch_indexed_crates(crates, index, checkpoint):
+                    yield crate
+            return
 
-    def __fetch_crate_owner_user(self, crate_id):
-        """Get crate user owners"""
+        resources = ((crate_container['id'], resource)
+                     for crate_container in crates for resource in CRATE_RESOURCES)
 
-        raw_owner_user = self.client.crate_attribute(crate_id, 'owner_user')
+        if self.workers > 1:
+            raw_resources = self.__fetch_resources_concurrently(resources)
+        else:
+            raw_resources = map(self.__fetch_crate_resource, resources)
 
-        owner_user = json.loads(raw_owner_user)
+        # Group the resources of each crate, which are returned in order
+        for raw_data in zip(*[raw_resources] * len(CRATE_RESOURCES)):
+            yield self.__build_crate(*raw_data)
+            self._flush_cache_queue()
+            checkpoint.done()
+
+    def __list_crates(self, sort, from_page, after_crate):
+        """Get the listing entries of the crates with their page.
+
+        The listing starts at `from_page`. When `after_crate` is
+        in that page, the entries up to it are skipped.
+        """
+        crates_groups = self.client.crates(from_page=from_page, sort=sort)
+        page = from_page
 
-        return owner_user
+        try:
+            for raw_crates, crates in crates_groups:
+                self._push_cache_queue(raw_crates)
+                entries = crates['crates']
 
-    def __fetch_crate_version_downloads(self, crate_id):
-        """Get crate version downloads"""
+                if after_crate:
+                    crate_ids = [crate_container['id'] for crate_container in entries]
 
-        raw_version_downloads = self.client.crate_attribute(crate_id, "downloads")
+                    if after_crate in crate_ids:
+                        entries = entries[crate_ids.index(after_crate) + 1:]
+                    after_crate = None
 
-        version_downloads = json.loads(raw_version_downloads)
+                for crate_container in entries:
+                    yield page, crate_container
 
-        return version_downloads
+                page += 1
+        finally:
+            crates_groups.close()
+
+    def __fetch_listed_crates(self, listing, from_date):
+        """Get the listing entries of the crates updated since the given date"""
+
+        for page, crate_container in listing:
+            if str_to_datetime(crate_container['updated_at']) < from_date:
+                continue
+
+            yield page, crate_container
+
+    def __fetch_recent_crates(self, listing, from_date):
+        """Get the listing entries of the crates updated since the given date.
+
+        Crates are listed by their update date, from the newest
+        to the oldest, so no more pages are requested once a crate
+        updated before `from_date` is found. Crates updated while
+        the listing is read move to its first page, shifting the
+        next ones; those which are listed twice are returned once.
+        """
+        crate_ids = set()
 
-    def __fetch_crate_data(self, crate_id):
-        """Get crate data"""
+        for page, crate_container in listing:
+            if str_to_datetime(crate_container['updated_at']) < from_date:
+                logger.debug("No more crates updated since %s", str(from_date))
+                listing.close()
+                return
+
+            if crate_container['id'] in crate_ids:
+                continue
+
+            crate_ids.add(crate_container['id'])
+            yield page, crate_container
+
+    def __fetch_indexed_crates(self, crates, index, checkpoint):
+        """Fetch the crates which are not up to date in the index.
+
+        The index is updated once each crate is returned, so crates
+        are fetched again when the process is interrupted before.
+        """
+        now = datetime_utcnow().timestamp()
+
+        tasks = ((crate_container, index.get(crate_container['id']), now)
+                 for crate_container in crates)
+
+        if self.workers > 1:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers)
+            results = ordered_imap(executor, self.__fetch_indexed_crate,
+                                   tasks, self.workers)
+        else:
+            executor = None
+            results = map(self.__fetch_indexed_crate, tasks)
+
+        try:
+            for crate_container, digest, raw_data in results:
+                if raw_data:
+                    yield self.__build_crate(*raw_data)
+                    self._flush_cache_queue()
+
+                if digest:
+                    index.update(crate_container['id'], crate_container['updated_at'],
+                                 digest, now)
+                checkpoint.done()
+        finally:
+            if executor:
+                executor.shutdown()
+
+    def __is_outdated(self, crate_container, entry, now):
+        """Check whether a crate or its sub-resources might have changed"""
+
+        if not entry or entry.updated_at != crate_container['updated_at']:
+            return True
+
+        return now - entry.refreshed_on >= self.refresh_interval
+
+    def __fetch_indexed_crate(self, task):
+        """Get the resources of a crate.
+
+        Nothing is requested when the crate is up to date in the
+        index; neither data nor digest are returned. Otherwise,
+        sub-resources are requested first. When neither the crate
+        nor its sub-resources changed since they were indexed, the
+        crate is not requested and no data is returned.
+        """
+
+        crate_container, entry, now = task
+        crate_id = crate_container['id']
+
+        if not self.__is_outdated(crate_container, entry, now):
+            return crate_container, None, None
+
+        raw_sub_resources = [self.client.crate_attribute(crate_id, name)
+                             for name in SUB_RESOURCES]
+        digest = CratesIndex.digest(raw_sub_resources)
+
+        if entry and entry.updated_at == crate_container['updated_at'] \
+                and entry.digest == digest:
+            return crate_container, digest, None
 
         raw_crate = self.client.crate(crate_id)
 
-        crate = json.loads(raw_crate)
-        return crate['crate']
+        return crate_container, digest, [raw_crate] + raw_sub_resources
+
+    async def __fetch_crates_async(self, client, from_date):
+        """Fetch crates asynchronously"""
+
+        from_date = datetime_to_utc(from_date)
+
+        sort = SORT_RECENT_UPDATES if self.incremental else SORT_ALPHABETICAL
+        listed_ids = set()
+
+        async for raw_crates, crates in client.crates(sort=sort):
+            self._push_cache_queue(raw_crates)
+            crate_ids = []
+            recent = True
+
+            for crate_container in crates['crates']:
+                if str_to_datetime(crate_container['updated_at']) >= from_date:
+                    crate_ids.append(crate_container['id'])
+                elif self.incremental:
+                    recent = False
+                    break
+
+            if self.incremental:
+                crate_ids = [crate_id for crate_id in crate_ids if crate_id not in listed_ids]
+                listed_ids.update(crate_ids)
+
+            for i in range(0, len(crate_ids), self.workers):
+                fetching = [self.__fetch_crate_async(client, crate_id)
+                            for crate_id in crate_ids[i:i + self.workers]]
+
+                for raw_data in await asyncio.gather(*fetching):
+                    yield self.__build_crate(*raw_data)
+
+            if not recent:
+                logger.debug("No more crates updated since %s", str(from_date))
+                break
+
+    async def __fetch_crate_async(self, client, crate_id):
+        """Get the resources of a crate concurrently"""
+
+        fetching = [client.crate(crate_id)]
+        fetching += [client.crate_attribute(crate_id, resource)
+                     for resource in CRATE_RESOURCES[1:]]
+
+        raw_data = await asyncio.gather(*fetching)
+
+        return raw_data
+
+    def __fetch_resources_concurrently(self, resources):
+        """Get crates resources using a pool of workers.
+
+        Each worker requests a single resource so the resources
+        of a crate are fetched in parallel, too. Results are
+        returned in the same order of `resources`.
+        """
+        nthreads = self.workers * len(CRATE_RESOURCES)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=nthreads) as executor:
+            for raw_resource in ordered_imap(executor,
+                                             self.__fetch_crate_resource,
+                                             resources, nthreads):
+                yield raw_resource
+
+    def __fetch_crate_resource(self, resource):
+        """Get the raw data of a crate resource"""
+
+        crate_id, name = resource
+
+        if name == 'crate':
+            return self.client.crate(crate_id)
+        else:
+            return self.client.crate_attribute(crate_id, name)
+
+    def __build_crate(self, raw_crate, raw_owner_team, raw_owner_user, raw_version_downloads):
+        """Build a crate item from the data of its resources.
+
+        The resources are added to the cache queue, in this order.
+        """
+        for raw_resource in (raw_crate, raw_owner_team, raw_owner_user, raw_version_downloads):
+            self._push_cache_queue(raw_resource)
+
+        crate = self.codec.loads(raw_crate)['crate']
+
+        return self.__add_sub_resources(crate, raw_owner_team, raw_owner_user,
+                                        raw_version_downloads)
+
+    def __add_sub_resources(self, crate, raw_owner_team, raw_owner_user, raw_version_downloads):
+        """Add the data of the sub-resources to a crate"""
+
+        crate['owner_team_data'] = self.codec.loads(raw_owner_team)
+        crate['owner_user_data'] = self.codec.loads(raw_owner_user)
+        crate['version_downloads_data'] = self.codec.loads(raw_version_downloads)
+
+        return crate
+
+
+class CratesIndex:
+    """Index of the crates already fetched.
+
+    The index is a SQLite database which maps the id of each crate
+    to its update date in the listing, the digest of the data of its
+    sub-resources and the time when they were fetched. Changes are
+    committed every `COMMIT_SIZE` updates and when the index is
+    closed.
+
+    :param path: path of the database
+    """
+    COMMIT_SIZE = 1000
+
+    Entry = collections.namedtuple('Entry', ['updated_at', 'digest', 'refreshed_on'])
 
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS crates (
+                                id TEXT PRIMARY KEY,
+                                updated_at TEXT NOT NULL,
+                                digest BLOB NOT NULL,
+                                refreshed_on REAL NOT NULL
+                             ) WITHOUT ROWID""")
+        self.conn.commit()
+        self.pending = 0
 
-class CratesClient:
-    """Client for retrieving information from Crates API"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get(self, crate_id):
+        """Get the entry of a crate or `None` when it is not indexed"""
+
+        row = self.conn.execute("SELECT updated_at, digest, refreshed_on FROM crates WHERE id = ?",
+                                (crate_id,)).fetchone()
+
+        return self.Entry(*row) if row else None
+
+    def update(self, crate_id, updated_at, digest, refreshed_on):
+        """Set the entry of a crate"""
+
+        self.conn.execute("INSERT OR REPLACE INTO crates VALUES (?, ?, ?, ?)",
+                          (crate_id, updated_at, digest, refreshed_on))
+        self.pending += 1
+
+        if self.pending >= self.COMMIT_SIZE:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    @staticmethod
+    def digest(raw_resources):
+        """Calculate the digest of the data of some resources"""
+
+        sha1 = hashlib.sha1()
+
+        for raw_resource in raw_resources:
+            if isinstance(raw_resource, str):
+                raw_resource = raw_resource.encode('utf-8')
+            sha1.update(raw_resource)
+            sha1.update(b'\0')
+
+        return sha1.digest()
+
+
+class CratesCheckpoint:
+    """Position of a fetch in the listing of crates.
+
+    Crates are registered with `track` in the order they are listed
+    and they must be marked with `done`, in the same order, once they
+    are fetched. The checkpoint is the page and the id of the last
+    crate done. It is stored in `path` when `save` is called and,
+    at most every `interval` seconds, when crates are done.
+
+    A checkpoint is resumed from its token, a string with the page
+    and the id of the crate separated by a colon (i.e. '12:serde').
+
+    :param path: path of the checkpoint file; when it is `None`,
+        the checkpoint is not stored
+    :param sort: order of the listing of crates
+    :param interval: minimum seconds between writes of the file
+    """
+    def __init__(self, path=None, sort=SORT_ALPHABETICAL,
+                 interval=DEFAULT_CHECKPOINT_INTERVAL):
+        self.path = path
+        self.sort = sort
+        self.interval = interval
+        self.page = None
+        self.crate = None
+        self.listed = collections.deque()
+        self.saved_on = time.monotonic()
+
+    @property
+    def token(self):
+        """Token to resume from the checkpoint or `None` when no crate was done"""
+
+        if self.page is None:
+            return None
+
+        return '%s:%s' % (self.page, self.crate)
+
+    @staticmethod
+    def parse_token(token):
+        """Get the page and the id of the crate of a token.
+
+        :param token: token of a checkpoint; when it is empty, the
+            listing starts on the first page
+
+        :returns: a tuple with the page and the id of the crate
+
+        :raises ValueError: when the token is not valid
+        """
+        if not token:
+            return 1, None
+
+        page, sep, crate_id = token.partition(':')
+
+        try:
+            page = int(page)
+        except ValueError:
+            page = 0
+
+        if not sep or page < 1:
+            raise ValueError("invalid resume token '%s'; expected '<page>:<crate id>'" % token)
+
+        return page, crate_id or None
+
+    def load(self):
+        """Read the token of the checkpoint stored in the file.
+
+        :returns: the token or `None` when there is no checkpoint
+            for the listing order
+        """
+        if not self.path:
+            return None
+
+        state = load_state(self.path)
+
+        if not state:
+            return None
+
+        if state.get('sort', None) != self.sort:
+            logger.warning("Checkpoint %s ignored; crates were listed in '%s' order",
+                           self.path, state.get('sort', None))
+            return None
+
+        return state.get('token', None)
+
+    def track(self, crates):
+        """Register the crates listed, given with their page"""
+
+        for page, crate_container in crates:
+            self.listed.append((page, crate_container['id']))
+            yield crate_container
+
+    def done(self):
+        """Mark as done the oldest crate registered"""
+
+        self.page, self.crate = self.listed.popleft()
+
+        if time.monotonic() - self.saved_on >= self.interval:
+            self.save()
+
+    def save(self):
+        """Store the checkpoint in the file"""
+
+        if not self.path or self.page is None:
+            return
+
+        state = {
+            'page': self.page,
+            'crate': self.crate,
+            'sort': self.sort,
+            'token': self.token
+        }
+        save_state(self.path, state)
+        self.saved_on = time.monotonic()
+
+    def clear(self):
+        """Remove the checkpoint file"""
+
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class CratesClient(HttpClient):
+    """Client for retrieving information from Crates API
+
+    Failed requests are retried up to `MAX_RETRIES` times, waiting
+    up to `sleep_time` seconds between retries, unless another
+    `retry_policy` is given.
+
+    :param sleep_time: maximum sleep time between retries
+    :param session: HTTP session used to send the requests
+    :param retry_policy: policy to retry failed requests
+    :param rate_limiter: rate limiter to pace the requests
+    :param codec: codec to decode JSON responses
+    :param timeout: seconds to wait for the server
+    """
 
     MAX_RETRIES = 5
 
-    def __init__(self, sleep_time=SLEEP_TIME):
+    def __init__(self, sleep_time=SLEEP_TIME, session=None, retry_policy=None,
+                 rate_limiter=None, codec=None, timeout=DEFAULT_TIMEOUT):
+        if not retry_policy:
+            retry_policy = RetryPolicy(max_retries=self.MAX_RETRIES,
+                                       max_backoff=float(sleep_time),
+                                       max_elapsed=self.MAX_RETRIES * float(sleep_time))
+
+        super().__init__(session=session, retry_policy=retry_policy,
+                         rate_limiter=rate_limiter, codec=codec, timeout=timeout)
         self.sleep_time = sleep_time
 
     def summary(self):
@@ -227,11 +860,15 @@ class CratesClient:
 
         return raw_content
 
-    def crates(self, from_page=1):
-        """Get crates in alphabetical order"""
+    def crates(self, from_page=1, sort=SORT_ALPHABETICAL):
+        """Get crates in alphabetical order or by their update date.
+
+        Each page is returned as a tuple with its raw content and
+        its decoded JSON object, so it is decoded only once.
+        """
 
         path = urijoin(CRATES_API_URL, CRATES_CATEGORY)
-        raw_crates = self.__fetch_items(path, from_page)
+        raw_crates = self.__fetch_items(path, from_page, sort)
 
         return raw_crates
 
@@ -268,35 +905,21 @@ class CratesClient:
     def __send_request(self, url, params=None, headers=None):
         """Send request"""
 
-        retries = 0
+        r = self.fetch(url, params=params, headers=headers)
 
-        while retries < self.MAX_RETRIES:
-            try:
-                r = requests.get(url,
-                                 params=params,
-                                 headers=headers)
-                break
-            except requests.exceptions.ConnectionError:
-                logger.warning("Connection was lost, the backend will sleep for " +
-                               str(self.sleep_time) + "s before starting again")
-                time.sleep(self.sleep_time * retries)
-                retries += 1
-
-        r.raise_for_status()
+        return r.content
 
-        return r.text
-
-    def __build_payload(self, page=None):
+    def __build_payload(self, page=None, sort=SORT_ALPHABETICAL):
         """Build payload"""
 
-        payload = {'sort': 'alphabetical'}
+        payload = {'sort': sort}
 
         if page:
             payload['page'] = str(page)
 
         return payload
 
-    def __fetch_items(self, path, page=1):
+    def __fetch_items(self, path, page=1, sort=SORT_ALPHABETICAL):
         """Return the items from Crates.io API using pagination"""
 
         fetch_data = True
@@ -307,26 +930,102 @@ class CratesClient:
             logger.debug("Fetching page: %i", page)
 
             try:
-                payload = self.__build_payload(page=page)
-                raw_content = self.__send_request(path, payload, self.__set_headers())
-                content = json.loads(raw_content)
+                payload = self.__build_payload(page=page, sort=sort)
+                raw_content, content = self.fetch_json(path, params=payload,
+                                                       headers=self.__set_headers())
 
                 parsed_crates += len(content['crates'])
 
                 if not total_crates:
                     total_crates = content['meta']['total']
+                    # Count the crates of the pages before the first one
+                    parsed_crates += (page - 1) * len(content['crates'])
 
             except requests.exceptions.HTTPError as e:
                 logger.error("HTTP exception raised - %s", e.response.text)
                 raise e
 
-            yield raw_content
+            yield raw_content, content
             page += 1
 
-            if parsed_crates >= total_crates:
+            if parsed_crates >= total_crates or not content['crates']:
                 fetch_data = False
 
 
+class AsyncCratesClient(AsyncHttpClient):
+    """Asynchronous client for retrieving information from Crates API
+
+    Asynchronous counterpart of `CratesClient`. It must be opened
+    with `async with` before sending any request.
+
+    :param session: `aiohttp.ClientSession` used to send the requests
+    :param pool_size: maximum number of connections of the session
+        created by the client
+    :param rate_limiter: rate limiter to pace the requests
+    :param codec: codec to decode JSON responses
+    :param retry_policy: policy to retry failed requests
+    :param timeout: seconds to wait for the server
+    """
+    HEADERS = {'Content-type': 'application/json'}
+
+    async def summary(self):
+        """Get Crates.io summary"""
+
+        path = urijoin(CRATES_API_URL, SUMMARY_CATEGORY)
+        raw_content = await self.fetch(path, headers=self.HEADERS)
+
+        return raw_content
+
+    async def crates(self, from_page=1, sort=SORT_ALPHABETICAL):
+        """Get crates in alphabetical order or by their update date.
+
+        Each page is returned as a tuple with its raw content and
+        its decoded JSON object.
+        """
+
+        path = urijoin(CRATES_API_URL, CRATES_CATEGORY)
+
+        page = from_page
+        parsed_crates = 0
+        total_crates = 0
+
+        while True:
+            logger.debug("Fetching page: %i", page)
+
+            payload = {'sort': sort, 'page': str(page)}
+            raw_content, content = await self.fetch_json(path, params=payload,
+                                                         headers=self.HEADERS)
+
+            parsed_crates += len(content['crates'])
+
+            if not total_crates:
+                total_crates = content['meta']['total']
+                # Count the crates of the pages before the first one
+                parsed_crates += (page - 1) * len(content['crates'])
+
+            yield raw_content, content
+            page += 1
+
+            if parsed_crates >= total_crates or not content['crates']:
+                break
+
+    async def crate(self, crate_id):
+        """Get a crate by its ID"""
+
+        path = urijoin(CRATES_API_URL, CRATES_CATEGORY, crate_id)
+        raw_crate = await self.fetch(path, headers=self.HEADERS)
+
+        return raw_crate
+
+    async def crate_attribute(self, crate_id, attribute):
+        """Get crate attribute"""
+
+        path = urijoin(CRATES_API_URL, CRATES_CATEGORY, crate_id, attribute)
+        raw_attribute_data = await self.fetch(path, headers=self.HEADERS)
+
+        return raw_attribute_data
+
+
 class CratesCommand(BackendCommand):
     """Class to run Crates.io backend from the command line."""
 
@@ -337,7 +1036,7 @@ class CratesCommand(BackendCommand):
         """Returns the Launchpad argument parser."""
 
         parser = BackendCommandArgumentParser(from_date=True,
-                                              cache=False,
+                                              cache=True,
                                               token_auth=True)
 
         # Optional arguments
@@ -347,5 +1046,30 @@ class CratesCommand(BackendCommand):
         group.add_argument('--category', default=CRATES_CATEGORY,
                            choices=(CRATES_CATEGORY, SUMMARY_CATEGORY),
                            help="category of items to fecth")
+        group.add_argument('--workers', dest='workers',
+                           type=int, default=DEFAULT_WORKERS,
+                           help="number of crates fetched in parallel")
+        group.add_argument('--incremental', dest='incremental',
+                           action='store_true',
+                           help="list crates by update date, stopping at the first one before from-date")
+        group.add_argument('--index-path', dest='index_path',
+                           help="file to keep the index of crates already fetched")
+        group.add_argument('--refresh-interval', dest='refresh_interval',
+                           type=int, default=DEFAULT_REFRESH_INTERVAL,
+                           help="seconds between checks of owners and downloads of unchanged crates")
+        group.add_argument('--rate-limit', dest='rate_limit', type=float,
+                           help="maximum number of requests per second sent to the server")
+        group.add_argument('--rate-limit-path', dest='rate_limit_path',
+                           help="directory to share the rate limit with other processes")
+        group.add_argument('--json-codec', dest='json_codec',
+                           choices=JSON_CODECS,
+                           help="library to decode JSON documents (default: fastest installed)")
+        group.add_argument('--checkpoint-path', dest='checkpoint_path',
+                           help="file to store the position of the fetch to resume it")
+        group.add_argument('--checkpoint-interval', dest='checkpoint_interval',
+                           type=float, default=DEFAULT_CHECKPOINT_INTERVAL,
+                           help="minimum seconds between writes of the checkpoint file")
+        group.add_argument('--resume-token', dest='resume_token',
+                           help="token of the checkpoint to resume the fetch from ('<page>:<crate id>')")
 
         return parser
@@ -20,8 +20,10 @@
 #     Alvaro del Castillo <acs@bitergia.com>
 #
 
+import collections
+import concurrent.futures
 import functools
-import json
+import itertools
 import logging
 
 import requests
@@ -34,12 +36,61 @@ from ...backend import (Backend,
                         BackendCommandArgumentParser,
                         metadata)
 from ...errors import CacheError, ParseError
+from .client import (DEFAULT_POOL_SIZE,
+                     DEFAULT_TIMEOUT,
+                     AsyncHttpClient,
+                     HttpClient,
+                     create_session)
+from .codec import JSON_CODECS, JSONCodec
+from .ratelimit import get_rate_limiter
+from .utils import async_metadata, ordered_imap, prefetch
 
 
 logger = logging.getLogger(__name__)
 
 KITSUNE_URL = "https://support.mozilla.org"
 DEFAULT_OFFSET = 0
+DEFAULT_PREFETCH = 0
+DEFAULT_WORKERS = 1
+DEFAULT_SHARDS = 1
+
+# Pages of questions fetched by each task of a sharded fetch
+DEFAULT_SHARD_PAGES = 10
+
+# Mark of the end of the answers of a question in the cache;
+# caches written by previous versions store it as text
+END_OF_QUESTION = b'{}'
+END_OF_QUESTION_MARKS = (END_OF_QUESTION, '{}')
+
+
+def _is_skippable_page_error(error):
+    """Check whether a page of questions which failed is skipped.
+
+    Pages failing with a server error (500) are skipped, losing
+    their questions, and the fetch goes on with the next page; the
+    error is logged in that case. Other errors must be propagated.
+
+    :param error: `HTTPError` raised requesting the page
+    """
+    if error.response is None or error.response.status_code != 500:
+        return False
+
+    logger.exception(error)
+    logger.error("Problem getting Kitsune questions. " +
+                 "Loosing %i questions. Going to the next page.",
+                 KitsuneClient.ITEMS_PER_PAGE)
+    return True
+
+
+def _questions_parse_error(error, content):
+    """Build the error raised when a page of questions is not valid.
+
+    :param error: error raised decoding the page
+    :param content: content shown as the cause of the error
+    """
+    logger.error(error)
+    cause = ("Bad JSON format for mozilla_questions: %s" % content)
+    return ParseError(cause=cause)
 
 
 def kitsune_metadata(func):
@@ -56,6 +107,19 @@ def kitsune_metadata(func):
     return decorator
 
 
+def kitsune_async_metadata(func):
+    """Kitsune metadata decorator for asynchronous generators.
+
+    Asynchronous counterpart of `kitsune_metadata` decorator.
+    """
+    @functools.wraps(func)
+    async def decorator(self, *args, **kwargs):
+        async for item in func(self, *args, **kwargs):
+            item['offset'] = item['data'].pop('offset')
+            yield item
+    return decorator
+
+
 class Kitsune(Backend):
     """Kitsune backend for Perceval.
 
@@ -64,22 +128,74 @@ class Kitsune(Backend):
     If not, https://support.mozilla.org will be used. The origin
     of the data will be set to this URL.
 
-    Questions and answers are returned from older to newer.
+    Questions and answers are returned from older to newer. When
+    `workers` is greater than one, the answers of the questions of
+    a page are fetched concurrently. When `batch_answers` is set,
+    the answers of all the questions of a page are requested at
+    once and joined to their questions afterwards; they are requested
+    question by question again if the server does not filter them.
+
+    When `shards` is greater than one, the pages of questions are
+    split in ranges of `shard_pages` pages, which are fetched by
+    `shards` processes, each one with its own client. Questions are
+    returned in the same order, so offsets and the cache are the
+    same ones of a serial fetch. A rate limit is divided among the
+    processes unless they share it with `rate_limit_path`.
 
     :param url: Kitsune URL
     :param tag: label used to mark the data
     :param cache: cache object to store raw data
+    :param prefetch: number of questions pages read in advance
+    :param workers: number of questions whose answers are fetched
+        in parallel
+    :param batch_answers: request the answers of a page of questions
+        in bulk
+    :param rate_limit: maximum number of requests per second sent
+        to the server
+    :param rate_limit_path: directory to share the rate limit with
+        other processes
+    :param json_codec: name of the codec to decode JSON documents;
+        by default, the fastest one installed
+    :param shards: number of processes fetching pages of questions
+    :param shard_pages: number of pages of each range fetched by
+        a process
+
+    :raises ValueError: when the number of shards or pages of the
+        ranges is not positive
     """
-    version = '0.4.0'
+    version = '0.6.0'
 
-    def __init__(self, url=None, tag=None, cache=None):
+    def __init__(self, url=None, tag=None, cache=None, prefetch=DEFAULT_PREFETCH,
+                 workers=DEFAULT_WORKERS, batch_answers=False, rate_limit=None,
+                 rate_limit_path=None, json_codec=None, shards=DEFAULT_SHARDS,
+                 shard_pages=DEFAULT_SHARD_PAGES):
         if not url:
             url = KITSUNE_URL
         origin = url
 
+        if shards < 1 or shard_pages < 1:
+            raise ValueError("shards and shard pages must be greater than 0; %s and %s given"
+                             % (shards, shard_pages))
+
         super().__init__(origin, tag=tag, cache=cache)
         self.url = url
-        self.client = KitsuneClient(url)
+        self.workers = workers
+        self.batch_answers = batch_answers
+        self.codec = JSONCodec(json_codec)
+        self.shards = shards
+        self.shard_pages = shard_pages
+        self.rate_limit = rate_limit
+        self.rate_limit_path = rate_limit_path
+
+        # Keep a connection open for each concurrent request
+        session = create_session(pool_size=max(DEFAULT_POOL_SIZE, workers + 1))
+
+        self.rate_limiter = None
+        if rate_limit:
+            self.rate_limiter = get_rate_limiter(rate_limit, path=rate_limit_path)
+
+        self.client = KitsuneClient(url, session=session, prefetch=prefetch,
+                                    rate_limiter=self.rate_limiter, codec=self.codec)
 
     @kitsune_metadata
     @metadata
@@ -89,6 +205,98 @@ class Kitsune(Backend):
         :offset: obtain questions after offset
         :returns: a generator of questions
         """
+        fetch = self.__start_fetch(offset)
+
+        if self.shards > 1:
+            for question in self.__fetch_shards(fetch):
+                yield question
+            return
+
+        questions_page = self.client.get_questions(offset)
+
+        while True:
+            try:
+                raw_questions, questions_data = next(questions_page)
+            except StopIteration:
+                break
+            except ValueError as ex:
+                raise _questions_parse_error(ex, str(ex))
+            except requests.exceptions.HTTPError as e:
+                # Continue with the next page if it is a 500 error;
+                # if it is another error just propagate the exception
+                if not _is_skippable_page_error(e):
+                    raise e
+                questions_page = self.client.get_questions(self.__skip_page(fetch))
+                continue
+
+            questions = self.__read_page(fetch, raw_questions, questions_data)
+
+            for question, answers_pages in zip(questions, self.__fetch_answers(questions)):
+                self.__push_question(fetch, question, answers_pages)
+                yield question
+                self.__question_done(fetch)
+
+            self.__page_done(fetch)
+
+        self.__end_fetch(fetch)
+
+    @kitsune_async_metadata
+    @async_metadata
+    async def fetch_async(self, offset=DEFAULT_OFFSET, session=None):
+        """Fetch questions from the Kitsune url asynchronously.
+
+        Asynchronous counterpart of `fetch`. Questions are the same
+        ones `fetch` returns. Answers are always requested question
+        by question and pages are not sharded; to fetch several
+        Kitsune sites concurrently, run a `fetch_async` for each one
+        in the same event loop.
+
+        :offset: obtain questions after offset
+        :session: `aiohttp.ClientSession` used to send the requests;
+            a new one is created when it is not given
+
+        :returns: an asynchronous generator of questions
+        """
+        fetch = self.__start_fetch(offset)
+
+        async with AsyncKitsuneClient(self.url, session=session,
+                                      rate_limiter=self.rate_limiter,
+                                      codec=self.codec) as client:
+            questions_page = client.get_questions(offset)
+
+            while True:
+                try:
+                    raw_questions, questions_data = await questions_page.__anext__()
+                except StopAsyncIteration:
+                    break
+                except ValueError as ex:
+                    raise _questions_parse_error(ex, str(ex))
+                except requests.exceptions.HTTPError as e:
+                    # Continue with the next page if it is a 500 error;
+                    # if it is another error just propagate the exception
+                    if not _is_skippable_page_error(e):
+                        raise e
+                    questions_page = client.get_questions(self.__skip_page(fetch))
+                    continue
+
+                questions = self.__read_page(fetch, raw_questions, questions_data)
+
+                for question in questions:
+                    answers_pages = [answers_page async for answers_page
+                                     in client.get_question_answers(question['id'])]
+                    self.__push_question(fetch, question, answers_pages)
+                    yield question
+                    self.__question_done(fetch)
+
+                self.__page_done(fetch)
+
+        self.__end_fetch(fetch)
+
+    def __start_fetch(self, offset):
+        """Prepare a fetch of questions after `offset`.
+
+        :returns: a `_KitsuneFetch` with the state of the fetch
+        """
         logger.info("Looking for questions at url '%s' using offset %s",
                     self.url, str(offset))
 
@@ -96,141 +304,430 @@ class Kitsune(Backend):
         # Add to the cache the offset so it can be used to recover from cache
         self._push_cache_queue(offset)
 
-        nquestions = 0  # number of questions processed
-        tquestions = 0  # number of questions from API data
-        equestions = 0  # number of questions dropped by errors
+        return _KitsuneFetch(offset)
 
-        # Always get complete pages so the first item is always
-        # the first one in the page
-        page = int(offset / KitsuneClient.ITEMS_PER_PAGE)
-        page_offset = page * KitsuneClient.ITEMS_PER_PAGE
-        # drop questions from page before the offset
-        drop_questions = offset - page_offset
-        current_offset = offset
+    def __read_page(self, fetch, raw_questions, questions_data):
+        """Add a page of questions to the cache queue.
 
-        questions_page = self.client.get_questions(offset)
+        :returns: the questions of the page after the offset
+        """
+        self._push_cache_queue(raw_questions)
+
+        try:
+            fetch.tquestions = questions_data['count']
+            questions = questions_data['results']
+        except KeyError as ex:
+            raise _questions_parse_error(ex, raw_questions)
+
+        if fetch.drop_questions > 0:
+            # Remove extra questions due to page base retrieval
+            ndropped = min(fetch.drop_questions, len(questions))
+            questions = questions[ndropped:]
+            fetch.drop_questions -= ndropped
+
+        return questions
+
+    def __skip_page(self, fetch):
+        """Skip a page of questions which failed.
+
+        The offset of the next page is stored so it is recovered
+        from the cache.
+
+        :returns: the offset of the question after the page
+        """
+        fetch.equestions += KitsuneClient.ITEMS_PER_PAGE
+        fetch.current_offset += KitsuneClient.ITEMS_PER_PAGE
+        self._push_cache_queue(fetch.current_offset)
+
+        return fetch.current_offset
+
+    def __push_question(self, fetch, question, answers_pages):
+        """Add the answers of a question to it and to the cache queue"""
+
+        question['offset'] = fetch.current_offset
+        fetch.current_offset += 1
+        question['answers_data'] = []
+
+        for raw_answers, answers in answers_pages:
+            self._push_cache_queue(raw_answers)
+            question['answers_data'] += answers['results']
+
+    def __question_done(self, fetch):
+        """Mark the end of the answers of a question in the cache queue"""
+
+        fetch.nquestions += 1
+        self._push_cache_queue(END_OF_QUESTION)
+
+    def __page_done(self, fetch):
+        """Store the questions of a page in the cache"""
+
+        logger.debug("Questions: %i/%i", fetch.nquestions + fetch.offset, fetch.tquestions)
+
+        self._flush_cache_queue()
+
+    @staticmethod
+    def __end_fetch(fetch):
+        """Log the totals of a fetch"""
+
+        logger.info("Total number of questions: %i (%i total)", fetch.nquestions, fetch.tquestions)
+        logger.info("Questions with errors dropped: %i", fetch.equestions)
+
+    def __fetch_shards(self, fetch):
+        """Fetch the questions splitting their pages among processes.
+
+        The number of questions, read from the page of the offset,
+        sets the pages to fetch. That page is fetched by this process
+        and the next ones are split in ranges which are fetched by
+        `_fetch_shard` in `shards` processes, keeping at most `shards`
+        ranges pending at the same time. The last range goes on until
+        the end of the listing, so questions added while fetching are
+        not lost. Pages failing with a server error before the number
+        of questions is known are skipped, as `fetch` does.
+        """
+        page = KitsuneClient.FIRST_PAGE + int(fetch.offset / KitsuneClient.ITEMS_PER_PAGE)
+        keep_raw = bool(self.cache)
+        first_pages = []  # pages fetched by this process
 
         while True:
             try:
-                raw_questions = next(questions_page)
+                raw_questions, questions_data = next(self.client.get_questions_pages(page, page))
+                fetch.tquestions = questions_data['count']
+                questions = questions_data['results'][fetch.drop_questions:]
+            except (ValueError, KeyError) as ex:
+                raise _questions_parse_error(ex, str(ex))
+            except requests.exceptions.HTTPError as e:
+                # Continue with the next page if it is a 500 error;
+                # the questions before the offset are still dropped
+                # from the next one, as `fetch` does
+                if not _is_skippable_page_error(e):
+                    raise e
+                first_pages.append((page, None, [], []))
+                page += 1
+                continue
+            break
+
+        first_pages.append(self.__fetch_page(page, raw_questions, questions, keep_raw))
+
+        last_page = KitsuneClient.FIRST_PAGE
+        last_page += int(max(fetch.tquestions - 1, 0) / KitsuneClient.ITEMS_PER_PAGE)
+
+        # Ranges of the pages after the one already fetched
+        shards = [[first, min(first + self.shard_pages - 1, last_page), 0]
+                  for first in range(page + 1, last_page + 1, self.shard_pages)]
+
+        if shards:
+            shards[-1][1] = None
+        elif questions_data['next']:
+            shards = [[page + 1, None, 0]]
+
+        logger.info("Fetching %i pages of questions in %i ranges with %i processes",
+                    max(last_page - page, 0), len(shards), self.shards)
+
+        rate_limit = self.rate_limit
+        if rate_limit and not self.rate_limit_path:
+            # Each process has its own limiter
+            rate_limit /= self.shards
+
+        options = {
+            'url': self.url,
+            'workers': self.workers,
+            'batch_answers': self.batch_answers,
+            'rate_limit': rate_limit,
+            'rate_limit_path': self.rate_limit_path,
+            'json_codec': self.codec.name
+        }
+        fetch_shard = functools.partial(_fetch_shard, options, keep_raw)
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.shards) as executor:
+            shards_pages = itertools.chain([first_pages],
+                                           ordered_imap(executor, fetch_shard, shards, self.shards))
+
+            while True:
+                try:
+                    pages = next(shards_pages)
+                except StopIteration:
+                    break
+                except (ValueError, KeyError) as ex:
+                    raise _questions_parse_error(ex, str(ex))
+
+                for page, raw_questions, questions, raw_answers in pages:
+                    if raw_questions is None:
+                        # The page failed
+                        self.__skip_page(fetch)
+                        continue
+
+                    self._push_cache_queue(raw_questions)
+
+                    for question, raw_answers_pages in zip(questions, raw_answers):
+                        for raw_answers_page in raw_answers_pages:
+                            self._push_cache_queue(raw_answers_page)
+                        question['offset'] = fetch.current_offset
+                        fetch.current_offset += 1
+                        yield question
+                        self.__question_done(fetch)
+
+                    self.__page_done(fetch)
+
+        self.__end_fetch(fetch)
+
+    def _fetch_pages(self, first_page, last_page=None, drop_questions=0, keep_raw=False):
+        """Fetch a range of pages of questions with their answers.
+
+        This method is run by the processes of a sharded fetch. Pages
+        which fail with a server error are skipped, as `fetch` does;
+        a page not found is taken as the end of the listing.
+
+        :param first_page: first page of the range
+        :param last_page: last page of the range; when it is `None`,
+            pages are fetched until the end of the listing
+        :param drop_questions: questions dropped from the first page
+        :param keep_raw: return the raw content of the pages
+
+        :returns: a list of tuples, one for each page, with its number,
+            its raw content (`None` when it failed), its questions with
+            their answers and the list of raw pages of answers of each
+            question
+        """
+        pages = []
+        page = first_page
+        questions_pages = self.client.get_questions_pages(first_page, last_page)
+
+        while True:
+            try:
+                raw_questions, questions_data = next(questions_pages)
             except StopIteration:
                 break
             except requests.exceptions.HTTPError as e:
-                # Continue with the next page if it is a 500 error
-                if e.response.status_code == 500:
-                    logger.exception(e)
-                    logger.error("Problem getting Kitsune questions. " +
-                                 "Loosing %i questions. Going to the next page.",
-                                 KitsuneClient.ITEMS_PER_PAGE)
-                    equestions += KitsuneClient.ITEMS_PER_PAGE
-                    current_offset += KitsuneClient.ITEMS_PER_PAGE
-                    questions_page = self.client.get_questions(current_offset)
+                if _is_skippable_page_error(e):
+                    pages.append((page, None, [], []))
+                    page += 1
+
+                    if last_page is not None and page > last_page:
+                        break
+
+                    questions_pages = self.client.get_questions_pages(page, last_page)
                     continue
+                elif e.response.status_code == 404:
+                    logger.warning("Page %i of questions not found; end of the listing", page)
+                    break
                 else:
-                    # If it is another error just propagate the exception
                     raise e
 
-            self._push_cache_queue(raw_questions)
+            questions = questions_data['results'][drop_questions:]
+            drop_questions = 0
 
-            try:
-                questions_data = json.loads(raw_questions)
-                tquestions = questions_data['count']
-                questions = questions_data['results']
-            except (ValueError, KeyError) as ex:
-                logger.error(ex)
-                cause = ("Bad JSON format for mozilla_questions: %s" % (raw_questions))
-                raise ParseError(cause=cause)
+            pages.append(self.__fetch_page(page, raw_questions, questions, keep_raw))
+            page += 1
+
+        return pages
 
+    def __fetch_page(self, page, raw_questions, questions, keep_raw=False):
+        """Fetch the answers of the questions of a page.
+
+        :param page: number of the page
+        :param raw_questions: raw content of the page
+        :param questions: questions of the page
+        :param keep_raw: return the raw content of the pages
+
+        :returns: a tuple with the number of the page, its raw content,
+            its questions with their answers and the list of raw pages
+            of answers of each question
+        """
+        raw_answers = []
+
+        for question, answers_pages in zip(questions, self.__fetch_answers(questions)):
+            question['answers_data'] = []
+            raw_answers_pages = []
+            for raw_answers_page, answers in answers_pages:
+                question['answers_data'] += answers['results']
+                if keep_raw:
+                    raw_answers_pages.append(raw_answers_page)
+            raw_answers.append(raw_answers_pages)
+
+        return (page, raw_questions if keep_raw else b'', questions, raw_answers)
+
+    def __fetch_answers(self, questions):
+        """Get the pages of answers of the given questions.
+
+        When there is more than one worker, the answers of the
+        questions are fetched concurrently. Pages are always
+        returned in the same order of `questions`.
+        """
+        if self.batch_answers:
+            answers_pages = self.__fetch_answers_batch(questions)
+        else:
+            answers_pages = self.__fetch_questions_answers(questions)
+
+        for question_answers_pages in answers_pages:
+            yield question_answers_pages
+
+    def __fetch_questions_answers(self, questions):
+        """Get the pages of answers of the given questions one by one"""
+
+        if self.workers <= 1:
             for question in questions:
-                if drop_questions > 0:
-                    # Remove extra questions due to page base retrieval
-                    drop_questions -= 1
-                    continue
-                question['offset'] = current_offset
-                current_offset += 1
-                question['answers_data'] = []
-                for raw_answers in self.client.get_question_answers(question['id']):
-                    self._push_cache_queue(raw_answers)
-                    answers = json.loads(raw_answers)['results']
-                    question['answers_data'] += answers
-                yield question
-                nquestions += 1
-                self._push_cache_queue('{}')  # Mark with empty dict end of question
+                yield self.client.get_question_answers(question['id'])
+            return
+
+        def fetch_question_answers(question):
+            return [answers_page for answers_page
+                    in self.client.get_question_answers(question['id'])]
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for answers_pages in ordered_imap(executor, fetch_question_answers,
+                                              questions, self.workers):
+                yield answers_pages
+
+    def __fetch_answers_batch(self, questions):
+        """Get the answers of the given questions with a single query.
+
+        The answers are indexed by question and returned as a page
+        for each question with answers. These pages have the same
+        format as those returned by the API, so they are stored in
+        the cache in the same way.
+
+        The answers are checked against the questions requested.
+        When one of them belongs to another question, the server
+        ignored the filter, so the answers of these and the next
+        questions are requested question by question. The answers
+        of these questions are also requested one by one when the
+        server reports more answers than the questions have.
+        """
+        if not questions:
+            return
 
-            logger.debug("Questions: %i/%i", nquestions + offset, tquestions)
+        question_ids = [question['id'] for question in questions]
+        answers_index = self.__fetch_answers_index(questions)
 
-            self._flush_cache_queue()
+        if answers_index is None:
+            for answers_pages in self.__fetch_questions_answers(questions):
+                yield answers_pages
+            return
 
-        logger.info("Total number of questions: %i (%i total)", nquestions, tquestions)
-        logger.info("Questions with errors dropped: %i", equestions)
+        for question_id in question_ids:
+            answers = answers_index.get(question_id, None)
+
+            if answers:
+                answers = {'results': answers}
+                yield [(self.codec.dumps(answers), answers)]
+            else:
+                yield []
+
+    def __fetch_answers_index(self, questions):
+        """Get the answers of the given questions indexed by question.
+
+        :returns: a dict with the list of answers of each question or
+            `None` when the answers returned are not the ones of
+            `questions`
+        """
+        question_ids = [question['id'] for question in questions]
+        requested = set(question_ids)
+
+        # Questions not including their number of answers are not bounded
+        max_answers = None
+        if all('num_answers' in question for question in questions):
+            max_answers = sum(question['num_answers'] for question in questions)
+
+        answers_index = collections.defaultdict(list)
+
+        for _, answers in self.client.get_answers(question_ids):
+            if any(answer['question'] not in requested for answer in answers['results']):
+                logger.warning("Kitsune server ignored the filter of questions; "
+                               "requesting answers question by question")
+                self.batch_answers = False
+                return None
+
+            nanswers = answers.get('count', 0)
+
+            if max_answers is not None and nanswers > max_answers:
+                logger.warning("Got %i answers for questions with %i answers; "
+                               "requesting them question by question",
+                               nanswers, max_answers)
+                return None
+
+            for answer in answers['results']:
+                answers_index[answer['question']].append(answer)
+
+        return answers_index
 
     @kitsune_metadata
     @metadata
     def fetch_from_cache(self):
         """Fetch the questions from the cache.
 
-        It only works with a cache created from one execution.
+        The cache is read as a stream, so only a page of questions
+        and the answers of a question are kept in memory. Offsets of
+        new executions and marks of the end of the questions are
+        recognized without decoding them; pages are decoded once.
 
         :returns: a generator of questions
 
         :raises CacheError: raised when an error occurs accessing the
             cache
         """
-        def get_drop_questions(offset):
-            page = int(offset / KitsuneClient.ITEMS_PER_PAGE)
-            page_offset = page * KitsuneClient.ITEMS_PER_PAGE
-            drop_questions = offset - page_offset
-            return drop_questions
-
-        def get_answers(cache_answers):
-            answers_data = []
-
-            for answers_raw in cache_answers:
-                answers = json.loads(answers_raw)
-                if not answers:
-                    # empty dict is the mark for end of question answers
-                    break
-                else:
-                    answers = answers['results']
-                    answers_data += answers
-
-            return answers_data
-
         if not self.cache:
             raise CacheError(cause="cache instance was not provided")
 
-        cache_items = self.cache.retrieve()
+        logger.info("Retrieving cached questions: '%s'", self.url)
 
         nquestions = 0
 
-        logger.info("Retrieving cached questions: '%s'", self.url)
-
-        for items_raw in cache_items:
-            if type(items_raw) is int:
-                # offset from a new execution results in the cache
-                offset = items_raw
-                questions_raw = next(cache_items)
-                drop_questions = get_drop_questions(offset)
-            else:
-                questions_raw = items_raw
-            if not json.loads(questions_raw):
-                # Last item is the empty dict
-                questions_raw = next(cache_items)
-            questions = json.loads(questions_raw)['results']
-            for question in questions:
-                if drop_questions > 0:
-                    # Remove extra questions due to page base retrieval
-                    drop_questions -= 1
-                    continue
-                question['offset'] = offset
-                offset += 1
-                question['answers_data'] = get_answers(cache_items)
-                yield question
-                nquestions += 1
+        for question in self.__read_cache(self.cache.retrieve()):
+            yield question
+            nquestions += 1
 
         logger.info("Retrieval process completed: %s questions retrieved from cache",
                     nquestions)
 
+    def __read_cache(self, cache_items):
+        """Rebuild the questions from the items of the cache.
+
+        Each execution stores its offset followed by pages of
+        questions. After each page, the answers pages of each of
+        its questions are stored, ending with `END_OF_QUESTION`.
+        Questions of a page which was not completely stored are
+        discarded when the offset of the next execution is found.
+        """
+        offset = DEFAULT_OFFSET
+        drop_questions = 0
+        questions = collections.deque()
+        question = None
+
+        for raw_item in cache_items:
+            if type(raw_item) is int:
+                # Offset of a new execution; pages are always complete
+                # so the questions before the offset are dropped
+                offset = raw_item
+                drop_questions = offset % KitsuneClient.ITEMS_PER_PAGE
+                questions.clear()
+                question = None
+                continue
+
+            end_of_question = raw_item in END_OF_QUESTION_MARKS
+
+            if question is None:
+                if questions:
+                    question = questions.popleft()
+                    question['offset'] = offset
+                    question['answers_data'] = []
+                    offset += 1
+                elif not end_of_question:
+                    page = self.codec.loads(raw_item)['results']
+
+                    ndropped = min(drop_questions, len(page))
+                    drop_questions -= ndropped
+
+                    questions.extend(page[ndropped:])
+                    continue
+                else:
+                    continue
+
+            if end_of_question:
+                yield question
+                question = None
+            else:
+                question['answers_data'] += self.codec.loads(raw_item)['results']
+
     @classmethod
     def has_caching(cls):
         """Returns whether it supports caching items on the fetch process.
@@ -277,21 +774,84 @@ class Kitsune(Backend):
         return 'question'
 
 
-class KitsuneClient:
+class _KitsuneFetch:
+    """State of a fetch of Kitsune questions.
+
+    It is shared by the steps of `Kitsune.fetch` and `Kitsune.fetch_async`.
+
+    :param offset: offset of the first question to fetch
+    """
+    def __init__(self, offset):
+        self.offset = offset
+        self.current_offset = offset  # offset of the next question
+        # Always get complete pages so the first item is always the
+        # first one in the page; drop questions before the offset
+        self.drop_questions = offset % KitsuneClient.ITEMS_PER_PAGE
+        self.nquestions = 0  # number of questions processed
+        self.tquestions = 0  # number of questions from API data
+        self.equestions = 0  # number of questions dropped by errors
+
+
+# Backend of a process of a sharded fetch and the options it was built with
+_shard_backend = None
+_shard_options = None
+
+
+def _fetch_shard(options, keep_raw, shard):
+    """Fetch a range of pages of questions in a process.
+
+    The backend of the process is created on its first call and
+    reused by the next ones.
+
+    :param options: arguments to create the backend of the process
+    :param keep_raw: return the raw content of the pages
+    :param shard: list with the first and the last pages of the
+        range and the number of questions dropped from the first one
+
+    :returns: the pages returned by `Kitsune._fetch_pages`
+    """
+    global _shard_backend, _shard_options
+
+    if _shard_backend is None or _shard_options != options:
+        _shard_backend = Kitsune(**options)
+        _shard_options = options
+
+    first_page, last_page, drop_questions = shard
+
+    return _shard_backend._fetch_pages(first_page, last_page,
+                                       drop_questions=drop_questions,
+                                       keep_raw=keep_raw)
+
+
+class KitsuneClient(HttpClient):
     """Kitsune API client.
 
     This class implements a simple client to retrieve questions and answers from
     a Kitsune site.
 
+    When `prefetch` is set, the pages of questions are read in advance
+    in a background thread, keeping up to `prefetch` pages in memory,
+    while the previous ones are processed.
+
     :param url: URL of Kitsune (sample https://support.mozilla.org)
+    :param session: HTTP session used to send the requests
+    :param prefetch: number of questions pages read in advance
+    :param retry_policy: policy to retry failed requests
+    :param rate_limiter: rate limiter to pace the requests
+    :param codec: codec to decode JSON responses
+    :param timeout: seconds to wait for the server
 
     :raises HTTPError: when an error occurs doing the request
     """
     FIRST_PAGE = 1  # Initial page in Kitsune
     ITEMS_PER_PAGE = 20  # Items per page in Kitsune API
 
-    def __init__(self, url):
+    def __init__(self, url, session=None, prefetch=DEFAULT_PREFETCH, retry_policy=None,
+                 rate_limiter=None, codec=None, timeout=DEFAULT_TIMEOUT):
+        super().__init__(session=session, retry_policy=retry_policy,
+                         rate_limiter=rate_limiter, codec=codec, timeout=timeout)
         self.url = url
+        self.prefetch = prefetch
         self.api_url = urijoin(self.url, '/api/2/')
 
     def call(self, api_url, params):
@@ -299,23 +859,37 @@ class KitsuneClient:
         :param api_url: api url to run on the server
         :param params: dict with the HTTP parameters needed to run
             the given command
+
+        :returns: a tuple with the raw response and its decoded
+            JSON object
         """
         logger.debug("Kitsune client calls API: %s params: %s",
                      api_url, str(params))
 
-        req = requests.get(api_url, params=params)
-        req.raise_for_status()
-
-        return req.text
+        return self.fetch_json(api_url, params=params)
 
     def get_questions(self, offset=None):
-        """Retrieve questions from older to newer updated starting offset"""
+        """Retrieve questions from older to newer updated starting offset.
 
-        page = KitsuneClient.FIRST_PAGE
+        Each page is returned as a tuple with its raw content and
+        its decoded JSON object, so it is decoded only once.
+        """
 
-        if offset:
-            page += int(offset / KitsuneClient.ITEMS_PER_PAGE)
+        questions = self.__fetch_questions(offset)
+
+        if self.prefetch > 0:
+            questions = prefetch(questions, self.prefetch)
+
+        return questions
 
+    def get_questions_pages(self, first_page, last_page=None):
+        """Retrieve a range of pages of questions from older to newer updated.
+
+        Pages are retrieved until `last_page` or, when it is not
+        given, until the last page. Each page is returned as a tuple
+        with its raw content and its decoded JSON object.
+        """
+        page = first_page
         next_uri = None  # URI for the next questions query
 
         while True:
@@ -326,17 +900,30 @@ class KitsuneClient:
                 "ordering": "updated"
             }
 
-            questions = self.call(api_questions_url, params)
-            yield questions
+            questions, questions_json = self.call(api_questions_url, params)
+            yield questions, questions_json
 
-            questions_json = json.loads(questions)
             next_uri = questions_json['next']
-            if not next_uri:
+            if not next_uri or page == last_page:
                 break
             page += 1
 
+    def __fetch_questions(self, offset):
+        """Fetch the pages of questions starting offset"""
+
+        page = KitsuneClient.FIRST_PAGE
+
+        if offset:
+            page += int(offset / KitsuneClient.ITEMS_PER_PAGE)
+
+        return self.get_questions_pages(page)
+
     def get_question_answers(self, question_id):
-        """Retrieve all answers for a question from older to newer (updated)"""
+        """Retrieve all answers for a question from older to newer (updated).
+
+        Each page is returned as a tuple with its raw content and
+        its decoded JSON object.
+        """
 
         page = KitsuneClient.FIRST_PAGE
 
@@ -347,10 +934,120 @@ class KitsuneClient:
                 "question": question_id,
                 "ordering": "updated"
             }
-            answers_raw = self.call(api_answers_url, params)
-            yield answers_raw
+            answers_raw, answers = self.call(api_answers_url, params)
+            yield answers_raw, answers
+
+            if not answers['next']:
+                break
+            page += 1
+
+    def get_answers(self, question_ids):
+        """Retrieve all answers of a set of questions from older to newer (updated).
+
+        Each page is returned as a tuple with its raw content and
+        its decoded JSON object.
+        """
+
+        page = KitsuneClient.FIRST_PAGE
+        question_ids = ','.join([str(question_id) for question_id in question_ids])
+
+        while True:
+            api_answers_url = urijoin(self.api_url, '/answer') + '/'
+            params = {
+                "page": page,
+                "question__in": question_ids,
+                "ordering": "updated"
+            }
+            answers_raw, answers = self.call(api_answers_url, params)
+            yield answers_raw, answers
+
+            if not answers['next']:
+                break
+            page += 1
+
+
+class AsyncKitsuneClient(AsyncHttpClient):
+    """Asynchronous Kitsune API client.
+
+    Asynchronous counterpart of `KitsuneClient`. It must be opened
+    with `async with` before sending any request.
+
+    :param url: URL of Kitsune (sample https://support.mozilla.org)
+    :param session: `aiohttp.ClientSession` used to send the requests
+    :param rate_limiter: rate limiter to pace the requests
+    :param codec: codec to decode JSON responses
+    :param retry_policy: policy to retry failed requests
+    :param timeout: seconds to wait for the server
+
+    :raises HTTPError: when an error occurs doing the request
+    """
+    def __init__(self, url, session=None, rate_limiter=None, codec=None, retry_policy=None,
+                 timeout=DEFAULT_TIMEOUT):
+        super().__init__(session=session, rate_limiter=rate_limiter, codec=codec,
+                         retry_policy=retry_policy, timeout=timeout)
+        self.url = url
+        self.api_url = urijoin(self.url, '/api/2/')
+
+    async def call(self, api_url, params):
+        """Run an API command.
+        :param api_url: api url to run on the server
+        :param params: dict with the HTTP parameters needed to run
+            the given command
+
+        :returns: a tuple with the raw response and its decoded
+            JSON object
+        """
+        logger.debug("Kitsune client calls API: %s params: %s",
+                     api_url, str(params))
+
+        return await self.fetch_json(api_url, params=params)
+
+    async def get_questions(self, offset=None):
+        """Retrieve questions from older to newer updated starting offset.
+
+        Each page is returned as a tuple with its raw content and
+        its decoded JSON object.
+        """
+
+        page = KitsuneClient.FIRST_PAGE
+
+        if offset:
+            page += int(offset / KitsuneClient.ITEMS_PER_PAGE)
+
+        while True:
+            api_questions_url = urijoin(self.api_url, '/question') + '/'
+
+            params = {
+                "page": page,
+                "ordering": "updated"
+            }
+
+            questions, questions_json = await self.call(api_questions_url, params)
+            yield questions, questions_json
+
+            if not questions_json['next']:
+                break
+            page += 1
+
+    async def get_question_answers(self, question_id):
+        """Retrieve all answers for a question from older to newer (updated).
+
+        Each page is returned as a tuple with its raw content and
+        its decoded JSON object.
+        """
+
+        page = KitsuneClient.FIRST_PAGE
+
+        while True:
+            api_answers_url = urijoin(self.api_url, '/answer') + '/'
+            params = {
+                "page": page,
+                "question": question_id,
+                "ordering": "updated"
+            }
+            answers_raw, answers = await self.call(api_answers_url, params)
+            yield answers_raw, answers
 
-            answers = json.loads(answers_raw)
             if not answers['next']:
                 break
             page += 1
@@ -368,6 +1065,31 @@ class KitsuneCommand(BackendCommand):
         parser = BackendCommandArgumentParser(offset=True,
                                               cache=True)
 
+        # Kitsune options
+        group = parser.parser.add_argument_group('Kitsune arguments')
+        group.add_argument('--prefetch', dest='prefetch',
+                           type=int, default=DEFAULT_PREFETCH,
+                           help="number of questions pages read in advance")
+        group.add_argument('--workers', dest='workers',
+                           type=int, default=DEFAULT_WORKERS,
+                           help="number of questions whose answers are fetched in parallel")
+        group.add_argument('--batch-answers', dest='batch_answers',
+                           action='store_true',
+                           help="request the answers of each page of questions in bulk")
+        group.add_argument('--rate-limit', dest='rate_limit', type=float,
+                           help="maximum number of requests per second sent to the server")
+        group.add_argument('--rate-limit-path', dest='rate_limit_path',
+                           help="directory to share the rate limit with other processes")
+        group.add_argument('--json-codec', dest='json_codec',
+                           choices=JSON_CODECS,
+                           help="library to decode JSON documents (default: fastest installed)")
+        group.add_argument('--shards', dest='shards',
+                           type=int, default=DEFAULT_SHARDS,
+                           help="number of processes fetching pages of questions")
+        group.add_argument('--shard-pages', dest='shard_pages',
+                           type=int, default=DEFAULT_SHARD_PAGES,
+                           help="number of pages of each range fetched by a process")
+
         # Required arguments
         parser.parser.add_argument('url', nargs='?',
                                    default="https://support.mozilla.org",
@@ -20,10 +20,11 @@
 #     Alvaro del Castillo <acs@bitergia.com>
 #
 
-import json
+import datetime
+import functools
+import itertools
 import logging
-
-import requests
+import re
 
 from grimoirelab.toolkit.datetime import str_to_datetime
 
@@ -33,6 +34,11 @@ from ...backend import (Backend,
                         metadata)
 from ...errors import CacheError
 from ...utils import DEFAULT_DATETIME
+from .client import DEFAULT_TIMEOUT, AsyncHttpClient, HttpClient
+from .utils import (async_metadata,
+                    iter_json_array,
+                    load_state,
+                    save_state)
 
 
 logger = logging.getLogger(__name__)
@@ -40,6 +46,9 @@ logger = logging.getLogger(__name__)
 MOZILLA_CLUB_URL = \
     "https://spreadsheets.google.com/feeds/cells/1QHl2bjBhMslyFzR5XXPzMLdzzx7oeSKTbgR5PM8qp64/ohaibtm/public/values?alt=json"
 
+# Mark stored in the cache before the chunks of the feed of each fetch
+START_OF_FEED = None
+
 EVENT_TEMPLATE = {
     1: "Status",
     2: "Date of Event",
@@ -63,23 +72,39 @@ EVENT_TEMPLATE = {
     20: "Event Cover Photo"
 }
 
+# Format of the update dates of the cells: %Y-%m-%dT%H:%M:%S.%fZ
+CELL_UPDATED_PATTERN = re.compile(r"^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})\.(\d{1,6})Z$")
+
 
 class MozillaClub(Backend):
     """MozillaClub backend for Perceval.
 
-    This class retrieves the data from MozillaClub.
+    This class retrieves the data from MozillaClub. The spreadsheet
+    feed is parsed while it is downloaded, so events are returned
+    as soon as their row is read.
+
+    The feed is requested with the validators (ETag and Last-Modified)
+    of the previous fetch, so nothing is downloaded when it has not
+    been modified. When the feed is downloaded but its update date is
+    the same of the previous fetch, it is not parsed. These data are
+    kept between executions when `state_path` is given.
 
     :param url: Mozilla Club Events url
     :param cache: cache object to store raw data
     :param tag: label used to mark the data
+    :param state_path: path of the file to store the validators
+        and the update date of the feed
     """
-    version = '0.1.0'
+    version = '0.3.0'
 
-    def __init__(self, url=MOZILLA_CLUB_URL, cache=None, tag=None):
+    def __init__(self, url=MOZILLA_CLUB_URL, cache=None, tag=None, state_path=None):
         origin = url
         self.url = url
         super().__init__(origin, tag=tag, cache=cache)
         self.client = MozillaClubClient(url)
+        self.state_path = state_path
+        self.state = {}
+        self.__chunks_queued = False  # whether chunks are pending to be stored
 
     @metadata
     def fetch(self):
@@ -95,9 +120,84 @@ class MozillaClub(Backend):
 
         nevents = 0  # number of events processed
 
+        if self.state_path:
+            self.state = load_state(self.state_path)
+
+        self._purge_cache_queue()
+        self._push_cache_queue(START_OF_FEED)
+        self.__chunks_queued = False
+
+        parser = MozillaClubParser(self.__stream_cells())
+
+        for event in parser.parse(last_updated=self.state.get('updated', None)):
+            yield event
+            nevents += 1
+
+            # Several events are read from the same chunk; store
+            # only when new chunks were read
+            if self.__chunks_queued:
+                self._flush_cache_queue()
+                self.__chunks_queued = False
+
+        if not self.client.modified or parser.unchanged:
+            logger.info("Feed not modified since the last fetch")
+            self._purge_cache_queue()
+        else:
+            self._flush_cache_queue()
+
+        self.__update_state(parser.updated)
+
+        logger.info("Total number of events: %i", nevents)
+
+    def __stream_cells(self):
+        """Read the chunks of the feed, adding them to the cache queue"""
+
+        chunks = self.client.stream_cells(etag=self.state.get('etag', None),
+                                          last_modified=self.state.get('last_modified', None))
+
+        try:
+            for raw_cells in chunks:
+                self._push_cache_queue(raw_cells)
+                self.__chunks_queued = True
+                yield raw_cells
+        finally:
+            # Release the connection when the feed is not read to the end
+            chunks.close()
+
+    def __update_state(self, updated):
+        """Keep the validators and the update date of the feed"""
+
+        self.state = {
+            'etag': self.client.etag,
+            'last_modified': self.client.last_modified,
+            'updated': updated if updated else self.state.get('updated', None)
+        }
+
+        if self.state_path:
+            save_state(self.state_path, self.state)
+
+    @async_metadata
+    async def fetch_async(self, session=None):
+        """Fetch events from the MozillaClub URL asynchronously.
+
+        Asynchronous counterpart of `fetch`. Events are the same
+        ones `fetch` returns.
+
+        :session: `aiohttp.ClientSession` used to send the request;
+            a new one is created when it is not given
+
+        :returns: an asynchronous generator of events
+        """
+        logger.info("Looking for events at url '%s'", self.url)
+
+        nevents = 0  # number of events processed
+
         self._purge_cache_queue()
+        self._push_cache_queue(START_OF_FEED)
+
+        async with AsyncMozillaClubClient(self.url, session=session) as client:
+            raw_cells = await client.get_cells()
 
-        raw_cells = self.client.get_cells()
         self._push_cache_queue(raw_cells)
         parser = MozillaClubParser(raw_cells)
 
@@ -123,18 +223,35 @@ class MozillaClub(Backend):
         if not self.cache:
             raise CacheError(cause="cache instance was not provided")
 
-        cache_items = next(self.cache.retrieve())
-
-        parser = MozillaClubParser(cache_items)
-
         nevents = 0
 
-        for event in parser.parse():
-            yield event
-            nevents += 1
+        for chunks in self.__read_feeds(self.cache.retrieve()):
+            parser = MozillaClubParser(chunks)
+
+            for event in parser.parse():
+                yield event
+                nevents += 1
 
         logger.info("Total number of events from cache: %i", nevents)
 
+    @staticmethod
+    def __read_feeds(cache_items):
+        """Split the items of the cache in the chunks of each feed.
+
+        Each fetch stores `START_OF_FEED` before the chunks of its
+        feed. Caches written without these marks have a single feed.
+        """
+        nfeed = 0
+
+        def feed_of(raw_item):
+            nonlocal nfeed
+            if raw_item is START_OF_FEED:
+                nfeed += 1
+            return nfeed
+
+        for _, feed_items in itertools.groupby(cache_items, key=feed_of):
+            yield (raw_item for raw_item in feed_items if raw_item is not START_OF_FEED)
+
     @classmethod
     def has_caching(cls):
         """Returns whether it supports caching items on the fetch process.
@@ -182,31 +299,44 @@ class MozillaClub(Backend):
         return float(date.timestamp())
 
 
-class MozillaClubClient:
+class MozillaClubClient(HttpClient):
     """MozillaClub API client.
 
     This class implements a simple client to retrieve events from
     projects in a MozillaClub site.
 
     :param url: URL of MozillaClub
+    :param session: HTTP session used to send the requests
+    :param retry_policy: policy to retry failed requests
+    :param rate_limiter: rate limiter to pace the requests
+    :param timeout: seconds to wait for the server
 
     :raises HTTPError: when an error occurs doing the request
     """
-    def __init__(self, url):
+    CHUNK_SIZE = 64 * 1024  # Size of the chunks read from the feed
+
+    def __init__(self, url, session=None, retry_policy=None, rate_limiter=None,
+                 timeout=DEFAULT_TIMEOUT):
+        super().__init__(session=session, retry_policy=retry_policy,
+                         rate_limiter=rate_limiter, timeout=timeout)
         self.url = url
+        self.etag = None  # validators of the last feed retrieved
+        self.last_modified = None
+        self.modified = True  # whether the last feed was modified
 
     def call(self, uri):
         """Run an API command.
 
         :param params: dict with the HTTP parameters needed to run
             the given command
+
+        :returns: the body of the response, as bytes
         """
         logger.debug("MozillaClub client calls API: %s", self.url)
 
-        req = requests.get(uri)
-        req.raise_for_status()
+        req = self.fetch(uri)
 
-        return req.text
+        return req.content
 
     def get_cells(self):
         """Retrieve all cells from the spreadsheet."""
@@ -216,12 +346,95 @@ class MozillaClubClient:
 
         return raw_cells
 
+    def stream_cells(self, etag=None, last_modified=None):
+        """Retrieve all cells from the spreadsheet in chunks of bytes.
+
+        Chunks are returned as they are read from the socket, without
+        decoding them; the feed is encoded in UTF-8.
+
+        When the validators of a previous response are given, the
+        feed is only retrieved when it was modified. Otherwise, no
+        chunks are returned and `modified` is set to `False`. The
+        validators of the response are set to `etag` and
+        `last_modified` attributes.
+
+        :param etag: ETag of a previous response
+        :param last_modified: Last-Modified date of a previous response
+        """
+        logger.info("Streaming all cells spreadsheet data ...")
+        logger.debug("MozillaClub client calls API: %s", self.url)
+
+        headers = {}
+
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        response = self.fetch(self.url, headers=headers, stream=True)
+
+        if response.status_code == 304:
+            response.close()
+            self.etag = etag
+            self.last_modified = last_modified
+            self.modified = False
+            return
+
+        self.etag = response.headers.get('ETag', None)
+        self.last_modified = response.headers.get('Last-Modified', None)
+        self.modified = True
+
+        try:
+            for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                yield chunk
+        finally:
+            response.close()
+
+
+class AsyncMozillaClubClient(AsyncHttpClient):
+    """Asynchronous MozillaClub API client.
+
+    Asynchronous counterpart of `MozillaClubClient`. It must be
+    opened with `async with` before sending any request.
+
+    :param url: URL of MozillaClub
+    :param session: `aiohttp.ClientSession` used to send the requests
+    :param rate_limiter: rate limiter to pace the requests
+    :param retry_policy: policy to retry failed requests
+    :param timeout: seconds to wait for the server
+
+    :raises HTTPError: when an error occurs doing the request
+    """
+    def __init__(self, url, session=None, rate_limiter=None, retry_policy=None,
+                 timeout=DEFAULT_TIMEOUT):
+        super().__init__(session=session, rate_limiter=rate_limiter,
+                         retry_policy=retry_policy, timeout=timeout)
+        self.url = url
+
+    async def call(self, uri):
+        """Run an API command."""
+
+        logger.debug("MozillaClub client calls API: %s", self.url)
+
+        return await self.fetch(uri)
+
+    async def get_cells(self):
+        """Retrieve all cells from the spreadsheet."""
+
+        logger.info("Retrieving all cells spreadsheet data ...")
+        raw_cells = await self.call(self.url)
+
+        return raw_cells
+
 
 class MozillaClubParser:
     """Git log parser.
 
     This class parses a string in JSON format from a Google Spreadsheet. The
-    feed includes all the cells in a list.
+    feed includes all the cells in a list. The feed can also be given as
+    an iterable of chunks of its text, or of its UTF-8 encoded bytes.
+    Cells are decoded one by one while the chunks are read, so only the
+    cells of the current row are kept in memory.
 
     Events are rows in the spreadsheet. The columns are the fields
     for the event. The JSON retrieved from the spreadsheet feed is
@@ -280,21 +493,38 @@ class MozillaClubParser:
     """
     def __init__(self, feed):
         self.feed = feed  # Spreadsheet feed
-        self.cells = None  # list with all cells to be processed
-        self.ncell = None  # current cell being parsed
+        self.cells = None  # iterator of the cells to be processed
+        self.cell = None  # current cell being parsed
+        self.updated = None  # update date of the feed
+        self.unchanged = False  # whether the feed was not updated
+
+    def parse(self, last_updated=None):
+        """Parse the MozillaClub spreadsheet feed cells json.
 
-    def parse(self):
-        """Parse the MozillaClub spreadsheet feed cells json."""
+        When the update date of the feed is read before the cells
+        and it is equal to `last_updated`, the cells are not parsed.
 
+        :param last_updated: update date of the feed in a previous parse
+        """
         nevents_wrong = 0
 
-        feed_json = json.loads(self.feed)
+        chunks = [self.feed] if isinstance(self.feed, (str, bytes)) else self.feed
+        feed_values = {}
 
-        if 'entry' not in feed_json['feed']:
-            return
+        self.cells = iter_json_array(chunks, ('feed', 'entry'), values=feed_values)
+        self.__next_cell()
+
+        self.updated = self.__get_feed_updated(feed_values)
 
-        self.cells = feed_json['feed']['entry']
-        self.ncell = 0
+        if last_updated and self.updated == last_updated:
+            logger.info("Feed not updated since %s", last_updated)
+            self.unchanged = True
+            self.cells.close()
+
+            # Release the source of the chunks, such as a streamed response
+            if hasattr(chunks, 'close'):
+                chunks.close()
+            return
 
         event_fields = self.__get_event_fields()
 
@@ -302,7 +532,7 @@ class MozillaClubParser:
         # The only way to detect the end of row is looking to the
         # number of column. When the max number is reached (cell_cols) the next
         # cell is from the next row.
-        while self.ncell < len(self.cells):
+        while self.cell:
             # Process the next row (event) getting all cols to build the event
             event = self.__get_next_event(event_fields)
 
@@ -312,8 +542,16 @@ class MozillaClubParser:
                 continue
             yield event
 
+        # The update date might be after the cells
+        self.updated = self.__get_feed_updated(feed_values)
+
         logger.info("Total number of wrong events: %i", nevents_wrong)
 
+    @staticmethod
+    def __get_feed_updated(feed_values):
+        updated = feed_values.get('updated', None)
+        return updated['$t'] if updated else None
+
     def __get_event_fields(self):
         """Get the events fields (columns) from the cells received."""
 
@@ -321,8 +559,8 @@ class MozillaClubParser:
         # The cells in the first row are the column names
         # Check that the columns names are the same we have as template
         # Create the event template from the data retrieved
-        while self.ncell < len(self.cells):
-            cell = self.cells[self.ncell]
+        while self.cell:
+            cell = self.cell
             row = cell['gs$cell']['row']
             if int(row) > 1:
                 # When the row number >1 the column row is finished
@@ -337,32 +575,67 @@ class MozillaClubParser:
             else:
                 logger.warning("Event template changed in spreadsheet. New column: %s", name)
 
-            self.ncell += 1
+            self.__next_cell()
         return event_fields
 
     def __get_next_event(self, event_fields):
         # Fill the empty event with all fields as None
         event = {key: None for key in event_fields.values()}
-        event['updated'] = DEFAULT_DATETIME.isoformat()
+
+        # Latest update of the cells and its original value
+        updated = DEFAULT_DATETIME
+        updated_str = None
 
         last_col = 0
-        while self.ncell < len(self.cells):
+        while self.cell:
             # Get all cols (cells) for the event (row)
-            cell = self.cells[self.ncell]
+            cell = self.cell
             ncol = int(cell['gs$cell']['col'])
             if ncol <= last_col:
                 # new event (row) detected: new cell column lower than last
                 break
             event[event_fields[ncol]] = cell['content']['$t']
             # Add an extra column with the update datetime
-            cell_update = str_to_datetime(cell['updated']['$t'])
-            if cell_update > str_to_datetime(event['updated']):
-                event['updated'] = cell['updated']['$t']
+            cell_update_str = cell['updated']['$t']
+            cell_update = parse_cell_datetime(cell_update_str)
+            if cell_update > updated:
+                updated = cell_update
+                updated_str = cell_update_str
             last_col = ncol
-            self.ncell += 1
+            self.__next_cell()
+
+        event['updated'] = updated_str if updated_str else DEFAULT_DATETIME.isoformat()
 
         return event
 
+    def __next_cell(self):
+        self.cell = next(self.cells, None)
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_cell_datetime(date):
+    """Convert the update date of a cell into a datetime object.
+
+    Google Spreadsheets feeds use the same format for all the dates
+    (`%Y-%m-%dT%H:%M:%S.%fZ`) and many cells share their update date,
+    so these dates are parsed without `dateutil` and the results are
+    memoized. Dates in other formats are parsed by `str_to_datetime`.
+
+    :param date: string to convert
+
+    :returns: a datetime object
+    """
+    m = CELL_UPDATED_PATTERN.match(date)
+
+    if not m:
+        return str_to_datetime(date)
+
+    fields = [int(field) for field in m.groups()[:6]]
+    microsecond = int(m.group(7).ljust(6, '0'))
+
+    return datetime.datetime(*fields, microsecond=microsecond,
+                             tzinfo=datetime.timezone.utc)
+
 
 class MozillaClubCommand(BackendCommand):
     """Class to run MozillaClub backend from the command line."""
@@ -375,6 +648,11 @@ class MozillaClubCommand(BackendCommand):
 
         parser = BackendCommandArgumentParser(cache=True)
 
+        # MozillaClub options
+        group = parser.parser.add_argument_group('MozillaClub arguments')
+        group.add_argument('--state-path', dest='state_path',
+                           help="file to keep the state of the feed between executions")
+
         # Required arguments
         parser.parser.add_argument('url', nargs='?',
                                    default=MOZILLA_CLUB_URL,
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+
+import logging
+import os
+import re
+import threading
+import time
+import urllib.parse
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+# Rate limiters shared by the clients of this process
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+# Characters not allowed in the names of the bucket files
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9.-]')
+
+
+class TokenBucket:
+    """Token bucket to pace requests.
+
+    The bucket is filled with `rate` tokens per second, up to `burst`
+    tokens. Each request takes a token from the bucket. When the bucket
+    is empty, the request has to wait until a new token is added.
+
+    Tokens are reserved in advance: `reserve` takes the tokens, even if
+    the bucket runs into debt, and returns the seconds the caller has
+    to wait before sending the request. This way, concurrent callers
+    are served in order and nobody waits while holding a lock.
+
+    :param rate: tokens added to the bucket per second
+    :param burst: maximum number of tokens in the bucket; by default,
+        the number of tokens added in a second (at least one)
+    :param clock: function which returns the current time in seconds
+    """
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be greater than zero; %s given" % rate)
+
+        self.rate = rate
+        self.burst = burst if burst else max(1, rate)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated_on = None
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """Take tokens from the bucket.
+
+        :param tokens: number of tokens to take
+
+        :returns: seconds to wait until the tokens are available
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens, wait = self._take(self.tokens, self.updated_on, now, tokens)
+            self.updated_on = now
+
+        return wait
+
+    def _take(self, available, updated_on, now, tokens):
+        """Refill the bucket up to `now` and take `tokens` from it"""
+
+        if updated_on is None:
+            available = self.burst
+        else:
+            available = min(self.burst,
+                            available + max(0, now - updated_on) * self.rate)
+
+        available -= tokens
+        wait = -available / self.rate if available < 0 else 0
+
+        return available, wait
+
+
+class FileTokenBucket(TokenBucket):
+    """Token bucket shared among processes.
+
+    The state of the bucket is stored in the file `path`, which is
+    locked while the tokens are taken, so every process of the host
+    using the same file shares the same bucket. The wall clock is
+    used as the time of the bucket by default because it is the same
+    for all the processes.
+
+    :param path: path of the file of the bucket
+    :param rate: tokens added to the bucket per second
+    :param burst: maximum number of tokens in the bucket
+    :param clock: function which returns the current UNIX time
+
+    :raises ImportError: when file locks are not available in this
+        platform
+    """
+    def __init__(self, path, rate, burst=None, clock=time.time):
+        if not fcntl:
+            raise ImportError("fcntl module is required to share rate limits")
+
+        super().__init__(rate, burst=burst, clock=clock)
+        self.path = path
+
+    def reserve(self, tokens=1):
+        """Take tokens from the bucket.
+
+        :param tokens: number of tokens to take
+
+        :returns: seconds to wait until the tokens are available
+        """
+        with self._lock, open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+
+            f.seek(0)
+            available, updated_on = self._read_state(f.read())
+
+            now = self.clock()
+            available, wait = self._take(available, updated_on, now, tokens)
+
+            f.seek(0)
+            f.truncate()
+            f.write("%r %r\n" % (available, now))
+            f.flush()
+
+        return wait
+
+    def _read_state(self, content):
+        """Parse the tokens and the time of the last update of the file"""
+
+        try:
+            available, updated_on = content.split()
+            return float(available), float(updated_on)
+        except ValueError:
+            if content:
+                logger.warning("Invalid state in rate limit file %s; reset", self.path)
+            return self.burst, None
+
+
+class RateLimiter:
+    """Pace the requests sent to each host.
+
+    Each host has its own `TokenBucket`, created when the first request
+    is sent to it, allowing `rate` requests per second with bursts of
+    up to `burst` requests. When `path` is given, the buckets are
+    stored in files of that directory, so they are shared with the
+    other processes that use the same directory.
+
+    :param rate: maximum number of requests per second to each host
+    :param burst: maximum number of requests sent at once to a host
+    :param path: directory where the buckets are shared among processes
+    :param sleep: function to wait the given seconds
+    """
+    def __init__(self, rate, burst=None, path=None, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be greater than zero; %s given" % rate)
+
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+        self.rate = rate
+        self.burst = burst
+        self.path = path
+        self.sleep = sleep
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url):
+        """Get the token bucket of the host of `url`"""
+
+        host = urllib.parse.urlsplit(url).netloc.lower()
+
+        with self._lock:
+            bucket = self._buckets.get(host, None)
+
+            if not bucket:
+                bucket = self._create_bucket(host)
+                self._buckets[host] = bucket
+
+        return bucket
+
+    def reserve(self, url):
+        """Reserve a request to the host of `url`.
+
+        :returns: seconds to wait before sending the request
+        """
+        return self.bucket(url).reserve()
+
+    def acquire(self, url):
+        """Wait until a request can be sent to the host of `url`"""
+
+        wait = self.reserve(url)
+
+        if wait > 0:
+            logger.debug("Rate limit of %s reached; waiting %.2f seconds", url, wait)
+            self.sleep(wait)
+
+    def _create_bucket(self, host):
+        if not self.path:
+            return TokenBucket(self.rate, burst=self.burst)
+
+        filename = _UNSAFE_CHARS.sub('_', host) + '.bucket'
+
+        return FileTokenBucket(os.path.join(self.path, filename),
+                               self.rate, burst=self.burst)
+
+
+def get_rate_limiter(rate, burst=None, path=None):
+    """Get the rate limiter of this process for the given limits.
+
+    Clients and backends which ask for the same limits share the same
+    limiter, so the rate of a host is not exceeded when several of
+    them send requests to it at the same time.
+
+    :param rate: maximum number of requests per second to each host
+    :param burst: maximum number of requests sent at once to a host
+    :param path: directory where the buckets are shared among processes
+
+    :returns: a `RateLimiter` object
+    """
+    key = (rate, burst, os.path.abspath(path) if path else None)
+
+    with _rate_limiters_lock:
+        rate_limiter = _rate_limiters.get(key, None)
+
+        if not rate_limiter:
+            rate_limiter = RateLimiter(rate, burst=burst, path=path)
+            _rate_limiters[key] = rate_limiter
+
+    return rate_limiter
@@ -20,13 +20,12 @@
 #     Alvaro del Castillo <acs@bitergia.com>
 #
 
+import concurrent.futures
 import functools
-import json
 import logging
+import urllib.parse
 
-import requests
-
-from grimoirelab.toolkit.datetime import str_to_datetime
+from grimoirelab.toolkit.datetime import datetime_to_utc, str_to_datetime
 from grimoirelab.toolkit.uris import urijoin
 
 from ...backend import (Backend,
@@ -34,12 +33,54 @@ from ...backend import (Backend,
                         BackendCommandArgumentParser,
                         metadata)
 from ...errors import CacheError
+from .client import (DEFAULT_POOL_SIZE,
+                     DEFAULT_TIMEOUT,
+                     AsyncHttpClient,
+                     HttpClient,
+                     create_session)
+from .codec import JSON_CODECS, JSONCodec
+from .ratelimit import get_rate_limiter
+from .utils import (FlushPolicy,
+                    LRUCache,
+                    async_metadata,
+                    async_round_robin,
+                    load_state,
+                    ordered_imap,
+                    round_robin,
+                    save_state)
 
 
 logger = logging.getLogger(__name__)
 
 MOZILLA_REPS_URL = "https://reps.mozilla.org"
 REMO_DEFAULT_OFFSET = 0
+DEFAULT_WORKERS = 1
+
+# Items between flushes of the cache queue when no policy is given
+DEFAULT_FLUSH_ITEMS = 1
+
+# Maximum number of user records kept in memory
+DEFAULT_USERS_CACHE_SIZE = 10000
+
+# Category of the items of each category that can be fetched
+CATEGORIES = {
+    'events': 'event',
+    'activities': 'activity',
+    'users': 'user'
+}
+
+# Filters of the API to get the items of a category updated since
+# a date; they match the fields used by `ReMo.metadata_updated_on`
+DATE_FILTERS = {
+    'events': 'end__gte',
+    'activities': 'report_date__gte'
+}
+
+# Fields of the items, by category, which reference a user
+USER_FIELDS = {
+    'event': ('owner',),
+    'activity': ('user', 'mentor')
+}
 
 
 def remo_metadata(func):
@@ -56,6 +97,19 @@ def remo_metadata(func):
     return decorator
 
 
+def remo_async_metadata(func):
+    """ReMo metadata decorator for asynchronous generators.
+
+    Asynchronous counterpart of `remo_metadata` decorator.
+    """
+    @functools.wraps(func)
+    async def decorator(self, *args, **kwargs):
+        async for item in func(self, *args, **kwargs):
+            item['offset'] = item['data'].pop('offset')
+            yield item
+    return decorator
+
+
 class ReMo(Backend):
     """ReMo backend for Perceval.
 
@@ -64,83 +118,472 @@ class ReMo(Backend):
     will be used. The origin of the data will be set to this URL.
 
     It uses v2 API to get events, people and activities data.
+    When `workers` is greater than one, the details of the items
+    of a page are fetched concurrently. Several categories can be
+    fetched at once; their pages are requested in turns, sharing
+    the same connections.
+
+    Items updated since a date are fetched giving `from_date`. Events
+    and activities are filtered by date in the server. The rest of
+    the categories are listed from their watermark (see
+    `ReMoWatermarks`) when it is stored in `watermark_path` and none
+    of the items before it was updated since that date.
+
+    When a cache is given, the raw data is stored in it every
+    `flush_items` items, `flush_pages` pages or `flush_interval`
+    seconds, whatever happens first (see `FlushPolicy`). By default,
+    it is stored after every item. Data of the items already returned
+    is also stored when the fetch is interrupted, so the cache always
+    holds the items returned before the last flush.
+
+    When `resolve_users` is set, the records of the users referenced
+    by events (owner) and activities (user and mentor) are added to
+    them in `<field>_data` fields. Records are kept in a LRU cache of
+    `users_cache_size` entries, keyed by their URL, so each user is
+    requested once. The cache is stored between executions in
+    `users_cache_path` when it is given.
 
     :param url: ReMo URL
     :param tag: label used to mark the data
     :param cache: cache object to store raw data
+    :param workers: number of items whose details are fetched
+        in parallel
+    :param rate_limit: maximum number of requests per second sent
+        to the server
+    :param rate_limit_path: directory to share the rate limit with
+        other processes
+    :param json_codec: name of the codec to decode JSON documents;
+        by default, the fastest one installed
+    :param flush_items: number of items between flushes of the cache
+    :param flush_pages: number of pages between flushes of the cache
+    :param flush_interval: seconds between flushes of the cache
+    :param resolve_users: add the records of the users referenced
+        by events and activities
+    :param users_cache_size: maximum number of user records kept
+        in memory
+    :param users_cache_path: path of the file to store the user
+        records between executions
+    :param watermark_path: path of the file to store the watermarks
+        of the categories between executions
     """
-    version = '0.5.0'
+    version = '0.11.0'
 
-    def __init__(self, url=None, tag=None, cache=None):
+    def __init__(self, url=None, tag=None, cache=None, workers=DEFAULT_WORKERS,
+                 rate_limit=None, rate_limit_path=None, json_codec=None,
+                 flush_items=None, flush_pages=None, flush_interval=None,
+                 resolve_users=False, users_cache_size=DEFAULT_USERS_CACHE_SIZE,
+                 users_cache_path=None, watermark_path=None):
         if not url:
             url = MOZILLA_REPS_URL
         origin = url
 
         super().__init__(origin, tag=tag, cache=cache)
         self.url = url
-        self.client = ReMoClient(url)
-        self.__users = {}  # internal users cache
+        self.workers = workers
+        self.codec = JSONCodec(json_codec)
+
+        if not (flush_items or flush_pages or flush_interval):
+            flush_items = DEFAULT_FLUSH_ITEMS
+
+        self.flush_items = flush_items
+        self.flush_pages = flush_pages
+        self.flush_interval = flush_interval
+
+        # Check the limits before fetching
+        self.__flush_policy()
+
+        # Keep a connection open for each concurrent request
+        session = create_session(pool_size=max(DEFAULT_POOL_SIZE, workers + 1))
+
+        self.rate_limiter = None
+        if rate_limit:
+            self.rate_limiter = get_rate_limiter(rate_limit, path=rate_limit_path)
+
+        self.client = ReMoClient(url, session=session, rate_limiter=self.rate_limiter,
+                                 codec=self.codec)
+        self.resolve_users = resolve_users
+        self.users_cache_path = users_cache_path
+        self.__users = LRUCache(users_cache_size)  # raw user records by URL
+        self.watermark_path = watermark_path
 
     @remo_metadata
     @metadata
-    def fetch(self, offset=REMO_DEFAULT_OFFSET, category='events'):
+    def fetch(self, offset=REMO_DEFAULT_OFFSET, category='events', from_date=None):
         """Fetch items from the ReMo url.
 
         The method retrieves, from a ReMo URL, the set of items
-        of the given `category`.
+        of the given `category`. Several categories can be given
+        in a list or separated by commas (i.e 'events,activities').
+        Then, a page of each category is retrieved in turns, so
+        the items of the categories are returned interleaved.
+
+        The offset of each item is its position in its category.
+        When fetching several categories, `offset` can be a dict
+        with the offset of each category; an integer sets the same
+        offset for all of them.
+
+        When `from_date` is given, only the items updated since that
+        date are returned. The offsets of the items of the categories
+        filtered by date in the server are their positions among the
+        items updated since that date.
 
         :offset: obtain items after offset
-        :category: category of items to retrieve
+        :category: category or categories of items to retrieve
+        :from_date: obtain items updated since this date
         :returns: a generator of items
         """
-        supported_categories = ['activities', 'events', 'users']
+        fetch = self.__start_fetch(offset, category, from_date)
 
-        if category not in supported_categories:
-            raise ValueError('ReMo perceval backend does not support ' + category)
+        pages = round_robin([self.__get_pages(self.client, category, fetch.offsets[category],
+                                              fetch.filters.get(category, None))
+                             for category in fetch.categories])
 
-        logger.info("Looking for events at url '%s' of %s category and %i offset",
-                    self.url, category, offset)
+        try:
+            for category, raw_items, items_data, items in pages:
+                self.__push_page(fetch, category, raw_items, items_data)
 
-        nitems = 0  # number of items processed
-        titems = 0  # number of items from API data
+                for raw_item_details, item_details in self.__fetch_items_details(items):
+                    if not self.__start_item(fetch, category, item_details):
+                        continue
 
-        # Always get complete pages so the first item is always
-        # the first one in the page
-        page = int(offset / ReMoClient.ITEMS_PER_PAGE)
-        page_offset = page * ReMoClient.ITEMS_PER_PAGE
-        # drop items from page before the offset
-        drop_items = offset - page_offset
-        logger.debug("%i items dropped to get %i offset starting in page %i (%i page offset)",
-                     drop_items, offset, page, page_offset)
-        current_offset = offset
+                    if self.resolve_users:
+                        users = self.__fetch_users(item_details, fetch.cached_users)
+                        self.__add_users(item_details, users)
+
+                    self.__push_item(fetch, category, raw_item_details, item_details)
+                    yield item_details
+                    self.__item_done(fetch)
+
+                self.__page_done(fetch)
+        finally:
+            self.__end_fetch(fetch)
+
+        logger.info("Total number of items: %i (%i total, %s offset)",
+                    fetch.nitems, sum(fetch.titems.values()), offset)
+
+    def __start_fetch(self, offset, category, from_date):
+        """Prepare a fetch of the items of the given categories.
+
+        The offsets of the categories are set and the cache queue is
+        started with them.
+
+        :returns: a `_ReMoFetch` with the state of the fetch
+        """
+        categories = _parse_categories(category)
+        offsets = _parse_offsets(offset, categories)
+
+        if from_date:
+            from_date = datetime_to_utc(from_date)
+
+        logger.info("Looking for items at url '%s' of %s category, %s offset and from %s",
+                    self.url, ','.join(categories), offset, str(from_date))
+
+        watermarks = ReMoWatermarks(self.watermark_path)
+        watermarks.load()
+        filters = self.__start_categories(categories, offsets, from_date, watermarks)
 
         self._purge_cache_queue()
         # Add to the cache the offset so it can be used to recover from cache
-        self._push_cache_queue(offset)
-
-        for raw_items in self.client.get_items(category, offset):
-            self._push_cache_queue(raw_items)
-            items_data = json.loads(raw_items)
-            titems = items_data['count']
-            logger.info("Pending items to retrieve: %i, %i current offset",
-                        titems - current_offset, current_offset)
-            items = items_data['results']
+        self._push_cache_queue(_offsets_mark(offset, offsets))
+
+        self.__load_users()
+
+        return _ReMoFetch(categories, offsets, filters, from_date,
+                          watermarks, self.__flush_policy())
+
+    def __push_page(self, fetch, category, raw_items, items_data):
+        """Add a page of items to the cache queue"""
+
+        self._push_cache_queue(raw_items)
+        fetch.titems[category] = items_data['count']
+        logger.info("Pending %s to retrieve: %i, %i current offset", category,
+                    fetch.titems[category] - fetch.offsets[category], fetch.offsets[category])
+
+    def __start_item(self, fetch, category, item):
+        """Set the offset of the next item of a category.
+
+        :returns: whether the item was updated since the date of
+            the fetch, so it has to be returned
+        """
+        item_offset = fetch.offsets[category]
+        fetch.offsets[category] += 1
+
+        if not self.__is_updated(category, item_offset, item,
+                                 fetch.from_date, fetch.watermarks):
+            return False
+
+        item['offset'] = item_offset
+        return True
+
+    def __item_done(self, fetch):
+        """Flush the cache queue after an item, when the policy says so"""
+
+        fetch.nitems += 1
+
+        if fetch.flush_policy.item_done():
+            self._flush_cache_queue()
+
+    def __page_done(self, fetch):
+        """Flush the cache queue after a page, when the policy says so"""
+
+        if fetch.flush_policy.page_done():
+            self._flush_cache_queue()
+
+    def __end_fetch(self, fetch):
+        """Store the data of the items already returned"""
+
+        self._flush_cache_queue()
+        self.__save_users()
+        fetch.watermarks.save()
+
+    @staticmethod
+    def __start_categories(categories, offsets, from_date, watermarks):
+        """Set where the listing of each category starts.
+
+        Categories with date filters in the API are filtered in the
+        server when `from_date` is given. The offsets of the rest of
+        the categories are moved to their watermarks, when possible.
+
+        :returns: a dict with the filters of each category
+        """
+        filters = {}
+
+        for category in categories:
+            if from_date and category in DATE_FILTERS:
+                filters[category] = {DATE_FILTERS[category]: from_date.strftime('%Y-%m-%d')}
+                continue
+
+            offset = watermarks.start(category, offsets[category], from_date)
+
+            if offset != offsets[category]:
+                logger.info("%i %s skipped; none of them was updated since %s",
+                            offset - offsets[category], category, str(from_date))
+                offsets[category] = offset
+
+        return filters
+
+    def __is_updated(self, category, offset, item, from_date, watermarks):
+        """Check whether an item was updated since `from_date`.
+
+        The update time of the item is added to the watermark of
+        its category.
+        """
+        updated_on = self.metadata_updated_on(item)
+        watermarks.done(category, offset, updated_on)
+
+        return not from_date or updated_on >= from_date.timestamp()
+
+    def __push_item(self, fetch, category, raw_item, item):
+        """Add the details of an item to the cache queue.
+
+        When the items before it were not stored because they were
+        not updated since the date of the fetch, its offset is stored
+        first, so the offsets are recovered from the cache.
+        """
+        offset = item['offset']
+
+        if fetch.cached_offsets[category] != offset:
+            self._push_cache_queue({category: offset})
+
+        self._push_cache_queue(raw_item)
+        fetch.cached_offsets[category] = offset + 1
+
+    @staticmethod
+    def __get_pages(client, category, offset, filters=None):
+        """Get the pages of a category starting at the given offset.
+
+        Each page is returned as a tuple with its category, its raw
+        content, its decoded JSON object and the items from the offset.
+        """
+        # Always get complete pages so the first item is always
+        # the first one in the page; drop items before the offset
+        drop_items = offset % ReMoClient.ITEMS_PER_PAGE
+
+        for raw_items, items_data in client.get_items(category, offset, filters=filters):
+            items = items_data['results'][drop_items:]
+            drop_items = 0
+            yield category, raw_items, items_data, items
+
+    @staticmethod
+    async def __get_pages_async(client, category, offset, filters=None):
+        """Get the pages of a category asynchronously"""
+
+        drop_items = offset % ReMoClient.ITEMS_PER_PAGE
+
+        async for raw_items, items_data in client.get_items(category, offset, filters=filters):
+            items = items_data['results'][drop_items:]
+            drop_items = 0
+            yield category, raw_items, items_data, items
+
+    def __user_urls(self, item):
+        """Get the URLs of the users referenced by an item"""
+
+        urls = []
+
+        for field in USER_FIELDS.get(self.metadata_category(item), ()):
+            user = item.get(field, None)
+
+            if user and user.get('_url', None):
+                urls.append(user['_url'])
+
+        return urls
+
+    def __fetch_users(self, item, cached_users):
+        """Get the raw records of the users referenced by an item.
+
+        Records not found in the users cache are requested. The
+        records not stored yet in the cache of the backend are added
+        to its queue, with their URL, before the item.
+        """
+        users = {}
+
+        for url in self.__user_urls(item):
+            raw_user = self.__users.get(url)
+
+            if raw_user is None:
+                raw_user, _ = self.client.call(url)
+                self.__users.put(url, raw_user)
+
+            users[url] = raw_user
+            self.__push_user(url, raw_user, cached_users)
+
+        return users
+
+    async def __fetch_users_async(self, client, item, cached_users):
+        """Get the raw records of the users referenced by an item asynchronously"""
+
+        users = {}
+
+        for url in self.__user_urls(item):
+            raw_user = self.__users.get(url)
+
+            if raw_user is None:
+                raw_user, _ = await client.call(url)
+                self.__users.put(url, raw_user)
+
+            users[url] = raw_user
+            self.__push_user(url, raw_user, cached_users)
+
+        return users
+
+    def __push_user(self, url, raw_user, cached_users):
+        """Add a user record to the cache queue once per fetch"""
+
+        if url not in cached_users:
+            self._push_cache_queue((url, raw_user))
+            cached_users.add(url)
+
+    def __add_users(self, item, users):
+        """Add to an item the records of the users it references.
+
+        :param item: event or activity
+        :param users: dict with the raw records of the users by URL
+        """
+        for field in USER_FIELDS.get(self.metadata_category(item), ()):
+            user = item.get(field, None)
+            raw_user = users.get(user.get('_url', None), None) if user else None
+
+            item[field + '_data'] = self.codec.loads(raw_user) if raw_user else None
+
+    def __load_users(self):
+        """Read the user records stored by previous executions"""
+
+        if not (self.resolve_users and self.users_cache_path):
+            return
+
+        state = load_state(self.users_cache_path)
+
+        for url, user in state.get('users', []):
+            self.__users.put(url, user.encode('utf-8'))
+
+        logger.debug("%i user records read from %s", len(self.__users), self.users_cache_path)
+
+    def __save_users(self):
+        """Store the user records for the next executions"""
+
+        if not (self.resolve_users and self.users_cache_path):
+            return
+
+        users = [[url, raw_user.decode('utf-8')] for url, raw_user in self.__users.items()]
+        save_state(self.users_cache_path, {'users': users})
+
+    def __flush_policy(self):
+        """Create the policy to flush the cache queue during a fetch"""
+
+        return FlushPolicy(items=self.flush_items, pages=self.flush_pages,
+                           interval=self.flush_interval)
+
+    def __fetch_items_details(self, items):
+        """Get the details of the given items.
+
+        When there is more than one worker, the details of the
+        items are fetched concurrently. They are always returned
+        in the same order of `items`.
+        """
+        if self.workers <= 1:
             for item in items:
-                if drop_items > 0:
-                    # Remove extra items due to page base retrieval
-                    drop_items -= 1
-                    continue
-                raw_item_details = self.client.call(item['_url'])
-                self._push_cache_queue(raw_item_details)
-                item_details = json.loads(raw_item_details)
-                item_details['offset'] = current_offset
-                current_offset += 1
+                yield self.client.call(item['_url'])
+            return
+
+        def fetch_item_details(item):
+            return self.client.call(item['_url'])
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for item_details in ordered_imap(executor, fetch_item_details,
+                                             items, self.workers):
                 yield item_details
-                nitems += 1
 
-                self._flush_cache_queue()
+    @remo_async_metadata
+    @async_metadata
+    async def fetch_async(self, offset=REMO_DEFAULT_OFFSET, category='events',
+                          session=None, from_date=None):
+        """Fetch items from the ReMo url asynchronously.
+
+        Asynchronous counterpart of `fetch`. Items are the same
+        ones `fetch` returns.
+
+        :offset: obtain items after offset
+        :category: category or categories of items to retrieve
+        :session: `aiohttp.ClientSession` used to send the requests;
+            a new one is created when it is not given
+        :from_date: obtain items updated since this date
+
+        :returns: an asynchronous generator of items
+        """
+        fetch = self.__start_fetch(offset, category, from_date)
+
+        async with AsyncReMoClient(self.url, session=session,
+                                   rate_limiter=self.rate_limiter,
+                                   codec=self.codec) as client:
+            pages = async_round_robin([self.__get_pages_async(client, category, fetch.offsets[category],
+                                                              fetch.filters.get(category, None))
+                                       for category in fetch.categories])
+
+            try:
+                async for category, raw_items, items_data, items in pages:
+                    self.__push_page(fetch, category, raw_items, items_data)
+
+                    for item in items:
+                        raw_item_details, item_details = await client.call(item['_url'])
+
+                        if not self.__start_item(fetch, category, item_details):
+                            continue
+
+                        if self.resolve_users:
+                            users = await self.__fetch_users_async(client, item_details,
+                                                                   fetch.cached_users)
+                            self.__add_users(item_details, users)
 
-        logger.info("Total number of events: %i (%i total, %i offset)", nitems, titems, offset)
+                        self.__push_item(fetch, category, raw_item_details, item_details)
+                        yield item_details
+                        self.__item_done(fetch)
+
+                    self.__page_done(fetch)
+            finally:
+                self.__end_fetch(fetch)
+
+        logger.info("Total number of items: %i (%i total, %s offset)",
+                    fetch.nitems, sum(fetch.titems.values()), offset)
 
     @remo_metadata
     @metadata
@@ -160,20 +603,36 @@ class ReMo(Backend):
         cache_items = self.cache.retrieve()
 
         nitems = 0
+        users = {}
+        offsets = {}  # next offset by category of item
 
         for item in cache_items:
+            if type(item) is tuple:
+                # record of a user referenced by the next items
+                url, raw_user = item
+                users[url] = raw_user
+                continue
             if type(item) is int:
                 # offset from a new execution results in the cache
-                offset = item
-                item = next(cache_items)
-            data = json.loads(item)
+                offsets = dict.fromkeys(CATEGORIES.values(), item)
+                continue
+            if type(item) is dict:
+                # offsets of some categories; they are set when fetching
+                # several categories or skipping items not updated
+                offsets.update((CATEGORIES[category], offset)
+                               for category, offset in item.items())
+                continue
+            data = self.codec.loads(item)
             # The raw_data is always a list of items or an item
             if 'count' in data:
                 # It is a list
                 continue
             else:
-                data['offset'] = offset
-                offset += 1
+                if self.resolve_users:
+                    self.__add_users(data, users)
+                category = self.metadata_category(data)
+                data['offset'] = offsets[category]
+                offsets[category] += 1
                 yield data
                 nitems += 1
 
@@ -246,13 +705,182 @@ class ReMo(Backend):
         return category
 
 
-class ReMoClient:
+def _parse_categories(category):
+    """Get the list of categories to fetch.
+
+    :param category: name of a category, names separated by commas
+        or a list of names
+
+    :raises ValueError: when a category is not supported
+    """
+    if isinstance(category, str):
+        category = category.split(',')
+
+    categories = []
+
+    for name in category:
+        name = name.strip()
+
+        if name not in CATEGORIES:
+            raise ValueError('ReMo perceval backend does not support ' + name)
+        if name not in categories:
+            categories.append(name)
+
+    if not categories:
+        raise ValueError('ReMo perceval backend needs a category')
+
+    return categories
+
+
+def _parse_offsets(offset, categories):
+    """Get the offset of each category to fetch.
+
+    :param offset: offset for all the categories or dict with
+        the offset of each category
+    :param categories: list of categories to fetch
+
+    :raises ValueError: when the dict has offsets of categories
+        that are not fetched
+    """
+    if not isinstance(offset, dict):
+        return dict.fromkeys(categories, offset)
+
+    unknown = set(offset) - set(categories)
+
+    if unknown:
+        raise ValueError('offsets of categories not fetched: ' + ','.join(sorted(unknown)))
+
+    return {category: offset.get(category, REMO_DEFAULT_OFFSET)
+            for category in categories}
+
+
+def _offsets_mark(offset, offsets):
+    """Get the mark of the offsets stored in the cache at the start of a fetch.
+
+    A single offset is stored when it is the offset of every category.
+    """
+    if type(offset) is int and all(value == offset for value in offsets.values()):
+        return offset
+    else:
+        return dict(offsets)
+
+
+class ReMoWatermarks:
+    """Watermarks of the listings of ReMo categories.
+
+    The watermark of a category is the number of items listed before
+    it (`offset`) and the newest update time among them (`updated_on`).
+    When this time is before the date of a fetch, those items were not
+    updated since that date, so the listing starts at the watermark.
+    This assumes new items are added at the end of the listing.
+
+    A category is tracked when the items before the offset where its
+    listing starts are known; it is, when it starts at the first item
+    or before its watermark. Items of a tracked category must be marked
+    with `done`, in the order they are listed. Watermarks are stored in
+    `path` when `save` is called.
+
+    :param path: path of the watermarks file; when it is `None`,
+        watermarks are not stored
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.marks = {}
+        self.tracked = set()
+
+    def load(self):
+        """Read the watermarks stored in the file"""
+
+        if not self.path:
+            return
+
+        state = load_state(self.path)
+        self.marks = state.get('categories', {})
+
+    def start(self, category, offset, from_date=None):
+        """Get the offset to start listing a category.
+
+        :param category: category to list
+        :param offset: offset requested
+        :param from_date: date of the fetch; when it is after the
+            update time of the watermark, the listing starts at the
+            last item before it, so the page requested always exists
+
+        :returns: the offset to start listing the category
+        """
+        mark = self.marks.get(category, None)
+
+        if mark and from_date and mark['updated_on'] < from_date.timestamp():
+            offset = max(offset, mark['offset'] - 1)
+
+        if offset == 0 or (mark and offset <= mark['offset']):
+            self.tracked.add(category)
+
+            if not mark:
+                self.marks[category] = {'offset': 0, 'updated_on': 0}
+
+        return offset
+
+    def done(self, category, offset, updated_on):
+        """Mark as done the item listed at `offset` in a category.
+
+        :param category: category of the item
+        :param offset: offset of the item in the listing
+        :param updated_on: update time of the item as a UNIX timestamp
+        """
+        if category not in self.tracked:
+            return
+
+        mark = self.marks[category]
+        mark['offset'] = max(mark['offset'], offset + 1)
+        mark['updated_on'] = max(mark['updated_on'], updated_on)
+
+    def save(self):
+        """Store the watermarks in the file"""
+
+        if not self.path or not self.tracked:
+            return
+
+        save_state(self.path, {'categories': self.marks})
+
+
+class _ReMoFetch:
+    """State of a fetch of ReMo items.
+
+    It is shared by the steps of `ReMo.fetch` and `ReMo.fetch_async`.
+
+    :param categories: categories of the items to fetch
+    :param offsets: dict with the offset of the next item of each category
+    :param filters: dict with the filters of each category in the API
+    :param from_date: obtain items updated since this date
+    :param watermarks: `ReMoWatermarks` of the categories
+    :param flush_policy: `FlushPolicy` of the cache queue
+    """
+    def __init__(self, categories, offsets, filters, from_date, watermarks, flush_policy):
+        self.categories = categories
+        self.offsets = offsets
+        self.filters = filters
+        self.from_date = from_date
+        self.watermarks = watermarks
+        self.flush_policy = flush_policy
+        self.cached_users = set()  # users already stored in the cache
+        self.cached_offsets = dict(offsets)  # next offsets known by the cache
+        self.nitems = 0  # number of items processed
+        self.titems = {}  # number of items from API data by category
+
+
+class ReMoClient(HttpClient):
     """ReMo API client.
 
     This class implements a simple client to retrieve events from
     projects in a ReMo site.
 
     :param url: URL of ReMo (sample https://reps.mozilla.org)
+    :param session: HTTP session used to send the requests
+    :param retry_policy: policy to retry failed requests
+    :param rate_limiter: rate limiter to pace the requests
+    :param codec: codec to decode JSON responses
+    :param timeout: seconds to wait for the server
 
     :raises HTTPError: when an error occurs doing the request
     """
@@ -261,7 +889,10 @@ class ReMoClient:
     ITEMS_PER_PAGE = 20  # Items per page in ReMo API
     API_PATH = '/api/remo/v1'
 
-    def __init__(self, url):
+    def __init__(self, url, session=None, retry_policy=None, rate_limiter=None,
+                 codec=None, timeout=DEFAULT_TIMEOUT):
+        super().__init__(session=session, retry_policy=retry_policy,
+                         rate_limiter=rate_limiter, codec=codec, timeout=timeout)
         self.url = url
         self.api_activities_url = urijoin(self.url, ReMoClient.API_PATH + '/activities/')
         self.api_activities_url += '/'  # API needs a final /
@@ -274,17 +905,106 @@ class ReMoClient:
         """Run an API command.
         :param params: dict with the HTTP parameters needed to run
             the given command
+
+        :returns: a tuple with the raw response and its decoded
+            JSON object
+        """
+        logger.debug("ReMo client calls APIv2: %s params: %s",
+                     uri, str(params))
+
+        return self.fetch_json(uri, params=params)
+
+    def get_items(self, category='events', offset=REMO_DEFAULT_OFFSET, filters=None):
+        """Retrieve all items for category using pagination.
+
+        Each page is returned as a tuple with its raw content and
+        its decoded JSON object, so it is decoded only once.
+
+        :param category: category of the items
+        :param offset: offset of the first item; the page where it
+            is listed is the first one retrieved
+        :param filters: dict with the filters of the items (i.e
+            {'end__gte': '2017-01-01'})
+        """
+
+        more = True  # There are more items to be processed
+        next_uri = None  # URI for the next items page query
+        page = ReMoClient.FIRST_PAGE
+        page += int(offset / ReMoClient.ITEMS_PER_PAGE)
+
+        if category == 'events':
+            api = self.api_events_url
+        elif category == 'activities':
+            api = self.api_activities_url
+        elif category == 'users':
+            api = self.api_users_url
+        else:
+            raise ValueError(category + ' not supported in ReMo')
+
+        while more:
+            params = {
+                "page": page
+            }
+            if filters:
+                params.update(filters)
+
+            raw_items, items_data = self.call(api, params)
+            yield raw_items, items_data
+
+            next_uri = items_data['next']
+
+            if not next_uri:
+                more = False
+            else:
+                page = _next_page(next_uri)
+
+
+class AsyncReMoClient(AsyncHttpClient):
+    """Asynchronous ReMo API client.
+
+    Asynchronous counterpart of `ReMoClient`. It must be opened
+    with `async with` before sending any request.
+
+    :param url: URL of ReMo (sample https://reps.mozilla.org)
+    :param session: `aiohttp.ClientSession` used to send the requests
+    :param rate_limiter: rate limiter to pace the requests
+    :param codec: codec to decode JSON responses
+    :param retry_policy: policy to retry failed requests
+    :param timeout: seconds to wait for the server
+
+    :raises HTTPError: when an error occurs doing the request
+    """
+    def __init__(self, url, session=None, rate_limiter=None, codec=None, retry_policy=None,
+                 timeout=DEFAULT_TIMEOUT):
+        super().__init__(session=session, rate_limiter=rate_limiter, codec=codec,
+                         retry_policy=retry_policy, timeout=timeout)
+        self.url = url
+        self.api_activities_url = urijoin(self.url, ReMoClient.API_PATH + '/activities/')
+        self.api_activities_url += '/'  # API needs a final /
+        self.api_events_url = urijoin(self.url, ReMoClient.API_PATH + '/events/')
+        self.api_events_url += '/'  # API needs a final /
+        self.api_users_url = urijoin(self.url, ReMoClient.API_PATH + '/users/')
+        self.api_users_url += '/'  # API needs a final /
+
+    async def call(self, uri, params=None):
+        """Run an API command.
+        :param params: dict with the HTTP parameters needed to run
+            the given command
+
+        :returns: a tuple with the raw response and its decoded
+            JSON object
         """
         logger.debug("ReMo client calls APIv2: %s params: %s",
                      uri, str(params))
 
-        req = requests.get(uri, params=params)
-        req.raise_for_status()
+        return await self.fetch_json(uri, params=params)
 
-        return req.text
+    async def get_items(self, category='events', offset=REMO_DEFAULT_OFFSET, filters=None):
+        """Retrieve all items for category using pagination.
 
-    def get_items(self, category='events', offset=REMO_DEFAULT_OFFSET):
-        """Retrieve all items for category using pagination """
+        Each page is returned as a tuple with its raw content and
+        its decoded JSON object.
+        """
 
         more = True  # There are more items to be processed
         next_uri = None  # URI for the next items page query
@@ -304,18 +1024,26 @@ class ReMoClient:
             params = {
                 "page": page
             }
+            if filters:
+                params.update(filters)
 
-            raw_items = self.call(api, params)
-            yield raw_items
+            raw_items, items_data = await self.call(api, params)
+            yield raw_items, items_data
 
-            items_data = json.loads(raw_items)
             next_uri = items_data['next']
 
             if not next_uri:
                 more = False
             else:
-                # https://reps.mozilla.org/remo/api/remo/v1/events/?page=269
-                page = next_uri.split("page=")[1]
+                page = _next_page(next_uri)
+
+
+def _next_page(next_uri):
+    """Get the number of the page of the URI of the next page"""
+
+    # https://reps.mozilla.org/remo/api/remo/v1/events/?page=269
+    query = urllib.parse.urlparse(next_uri).query
+    return urllib.parse.parse_qs(query)['page'][0]
 
 
 class ReMoCommand(BackendCommand):
@@ -333,7 +1061,36 @@ class ReMoCommand(BackendCommand):
         # ReMo options
         group = parser.parser.add_argument_group('ReMo arguments')
         group.add_argument('--category', default='events',
-                           help="category could be events, activities or users")
+                           help="category could be events, activities or users; "
+                                "several ones can be given separated by commas")
+        group.add_argument('--workers', dest='workers',
+                           type=int, default=DEFAULT_WORKERS,
+                           help="number of items whose details are fetched in parallel")
+        group.add_argument('--rate-limit', dest='rate_limit', type=float,
+                           help="maximum number of requests per second sent to the server")
+        group.add_argument('--rate-limit-path', dest='rate_limit_path',
+                           help="directory to share the rate limit with other processes")
+        group.add_argument('--json-codec', dest='json_codec',
+                           choices=JSON_CODECS,
+                           help="library to decode JSON documents (default: fastest installed)")
+        group.add_argument('--flush-items', dest='flush_items', type=int,
+                           help="number of items between writes of the cache (default: 1)")
+        group.add_argument('--flush-pages', dest='flush_pages', type=int,
+                           help="number of pages between writes of the cache")
+        group.add_argument('--flush-interval', dest='flush_interval', type=float,
+                           help="seconds between writes of the cache")
+        group.add_argument('--resolve-users', dest='resolve_users',
+                           action='store_true',
+                           help="add the records of the users referenced by events and activities")
+        group.add_argument('--users-cache-size', dest='users_cache_size',
+                           type=int, default=DEFAULT_USERS_CACHE_SIZE,
+                           help="maximum number of user records kept in memory")
+        group.add_argument('--users-cache-path', dest='users_cache_path',
+                           help="file to store the user records between executions")
+        group.add_argument('--from-date', dest='from_date', type=str_to_datetime,
+                           help="fetch items updated since this date")
+        group.add_argument('--watermark-path', dest='watermark_path',
+                           help="file to store the watermarks of the categories between executions")
 
         # Required arguments
         parser.parser.add_argument('url', nargs='?',
@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+
+import codecs
+import collections
+import functools
+import json
+import os
+import queue
+import re
+import tempfile
+import threading
+import time
+
+from ...backend import metadata
+
+
+# Mark for the end of the items read in advance
+_END = object()
+
+# JSON whitespace characters
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Characters that can follow the beginning of a JSON number
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+
+def ordered_imap(executor, func, iterable, window):
+    """Apply a function to the items of an iterable concurrently.
+
+    Calls to `func` are submitted to `executor`, keeping at most
+    `window` of them pending at the same time. Results are returned
+    in the same order of the items in `iterable`, regardless of the
+    order in which the calls finish. When a call fails, its exception
+    is raised once its result is reached.
+
+    :param executor: `concurrent.futures.Executor` to run the calls
+    :param func: function to apply to each item
+    :param iterable: items to process
+    :param window: maximum number of pending calls
+
+    :returns: a generator of results
+    """
+    pending = collections.deque()
+
+    try:
+        for item in iterable:
+            pending.append(executor.submit(func, item))
+
+            if len(pending) >= window:
+                yield pending.popleft().result()
+
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def prefetch(iterable, depth):
+    """Read in advance the items of an iterable.
+
+    Items are retrieved from `iterable` in a background thread,
+    which keeps up to `depth` of them ready to be consumed. Thus,
+    memory is bounded by `depth`. Items are returned in the same
+    order. When `iterable` raises an exception, it will be raised
+    once the items retrieved before it are consumed.
+
+    :param iterable: items to read
+    :param depth: maximum number of items read in advance
+
+    :returns: a generator of items
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item, error=None):
+        # Wait for a free slot unless the consumer is gone
+        while not stop.is_set():
+            try:
+                items.put((item, error), timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(None, error=e)
+        else:
+            put(_END)
+
+    reader = threading.Thread(target=read)
+    reader.daemon = True
+    reader.start()
+
+    try:
+        while True:
+            item, error = items.get()
+
+            if error:
+                raise error
+            elif item is _END:
+                break
+
+            yield item
+    finally:
+        stop.set()
+
+
+def round_robin(iterables):
+    """Take the items of several iterables in turns.
+
+    One item is taken from each iterable, in the given order, until
+    all of them are exhausted. Iterables are read lazily, so no item
+    is retrieved before it is needed.
+
+    :param iterables: list of iterables to read
+
+    :returns: a generator of items
+    """
+    iterators = collections.deque(iter(iterable) for iterable in iterables)
+
+    while iterators:
+        iterator = iterators.popleft()
+
+        try:
+            item = next(iterator)
+        except StopIteration:
+            continue
+
+        iterators.append(iterator)
+        yield item
+
+
+async def async_round_robin(iterables):
+    """Take the items of several asynchronous iterables in turns.
+
+    Asynchronous counterpart of `round_robin`.
+
+    :param iterables: list of asynchronous iterables to read
+
+    :returns: an asynchronous generator of items
+    """
+    iterators = collections.deque(iterable.__aiter__() for iterable in iterables)
+
+    while iterators:
+        iterator = iterators.popleft()
+
+        try:
+            item = await iterator.__anext__()
+        except StopAsyncIteration:
+            continue
+
+        iterators.append(iterator)
+        yield item
+
+
+def async_metadata(func):
+    """Add metadata to the items of an asynchronous generator.
+
+    Asynchronous counterpart of `metadata` decorator. Items are
+    built by `metadata` itself, so they are the same items that
+    synchronous fetch methods generate.
+    """
+    add_metadata = metadata(lambda backend, data: iter((data,)))
+
+    @functools.wraps(func)
+    async def decorator(self, *args, **kwargs):
+        async for data in func(self, *args, **kwargs):
+            for item in add_metadata(self, data):
+                yield item
+    return decorator
+
+
+def iter_json_array(chunks, path, values=None):
+    """Decode one by one the items of an array in a JSON document.
+
+    The document is read from `chunks`, an iterable of pieces of
+    its text, given as `str` or as UTF-8 encoded `bytes`, which are
+    decoded while they are read. The array is found following the
+    keys of `path` from the root object. Items are decoded and
+    returned as soon as they are read, so memory is bounded by the
+    size of an item and a chunk instead of the size of the whole
+    document. Other values of the document are decoded and discarded,
+    except the ones of the object that contains the array, which are
+    stored by key in `values` when it is given, as soon as they are
+    read. When the array is not found, no items are returned; neither
+    when `chunks` is empty.
+
+    :param chunks: iterable of text or bytes chunks of the document
+    :param path: list of the keys of the objects that contain
+        the array
+    :param values: dict to store the other values of the object
+        that contains the array
+
+    :returns: a generator of items
+
+    :raises JSONDecodeError: when the document is not valid
+    """
+    stream = _JSONStream(chunks)
+
+    if stream.peek() is None:
+        return
+
+    yield from _iter_json_path(stream, path, values)
+
+    if stream.peek() is not None:
+        stream.error("Extra data")
+
+
+def _iter_json_path(stream, path, values):
+    if not path:
+        stream.expect('[')
+
+        if stream.peek() == ']':
+            stream.expect(']')
+            return
+
+        while True:
+            yield stream.value()
+
+            if stream.expect(',]') == ']':
+                return
+
+    stream.expect('{')
+
+    if stream.peek() == '}':
+        stream.expect('}')
+        return
+
+    while True:
+        key = stream.value()
+        stream.expect(':')
+
+        if key == path[0]:
+            yield from _iter_json_path(stream, path[1:], values)
+        else:
+            value = stream.value()
+
+            if values is not None and len(path) == 1:
+                values[key] = value
+
+        if stream.expect(',}') == '}':
+            return
+
+
+def load_state(path):
+    """Read the state of a backend stored in a JSON file.
+
+    :param path: path of the file
+
+    :returns: a dict with the state; empty when the file does
+        not exist
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_state(path, state):
+    """Store the state of a backend in a JSON file.
+
+    The state is written to a temporary file which replaces
+    the given one, so the file is never left half written.
+
+    :param path: path of the file
+    :param state: dict with the state
+    """
+    dirname = os.path.dirname(os.path.abspath(path))
+
+    f = tempfile.NamedTemporaryFile('w', dir=dirname, delete=False)
+
+    try:
+        with f:
+            json.dump(state, f, indent=4, sort_keys=True)
+        os.replace(f.name, path)
+    except Exception:
+        if os.path.exists(f.name):
+            os.remove(f.name)
+        raise
+
+
+class LRUCache:
+    """Mapping which keeps only the most recently used entries.
+
+    When there are more than `maxsize` entries, the least recently
+    used one is removed. Reading or setting an entry makes it the
+    most recently used one.
+
+    :param maxsize: maximum number of entries
+
+    :raises ValueError: when the maximum size is not positive
+    """
+    def __init__(self, maxsize):
+        if maxsize <= 0:
+            raise ValueError("cache size must be greater than 0; %s given" % maxsize)
+
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        """Get the value of an entry or `default` when it is not found"""
+
+        try:
+            self.entries.move_to_end(key)
+        except KeyError:
+            return default
+
+        return self.entries[key]
+
+    def put(self, key, value):
+        """Set the value of an entry, removing the oldest ones when it is full"""
+
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def items(self):
+        """List of the entries, from the least to the most recently used"""
+
+        return list(self.entries.items())
+
+
+class FlushPolicy:
+    """Decide when the cache queue of a backend is flushed.
+
+    Each flush stores the queue in the cache, which is written to
+    disk, so flushing after every item is slow on long fetches. The
+    queue is flushed once `items` items or `pages` pages are done
+    since the last flush, or once `interval` seconds have passed,
+    whatever happens first. When none of them is given, the queue
+    is only flushed at the end of the fetch.
+
+    :param items: number of items between flushes
+    :param pages: number of pages between flushes
+    :param interval: seconds between flushes
+    :param clock: function which returns the current time in seconds
+
+    :raises ValueError: when any of the limits is not positive
+    """
+    def __init__(self, items=None, pages=None, interval=None, clock=time.monotonic):
+        for name, value in (('items', items), ('pages', pages), ('interval', interval)):
+            if value is not None and value <= 0:
+                raise ValueError("flush %s must be greater than 0; %s given" % (name, value))
+
+        self.items = items
+        self.pages = pages
+        self.interval = interval
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        """Start counting after a flush"""
+
+        self.nitems = 0
+        self.npages = 0
+        self.flushed_on = self.clock()
+
+    def item_done(self):
+        """Count an item done.
+
+        :returns: whether the queue must be flushed now
+        """
+        self.nitems += 1
+        return self.__is_due()
+
+    def page_done(self):
+        """Count a page done.
+
+        :returns: whether the queue must be flushed now
+        """
+        self.npages += 1
+        return self.__is_due()
+
+    def __is_due(self):
+        if self.items and self.nitems >= self.items:
+            due = True
+        elif self.pages and self.npages >= self.pages:
+            due = True
+        elif self.interval and self.clock() - self.flushed_on >= self.interval:
+            due = True
+        else:
+            due = False
+
+        if due:
+            self.reset()
+
+        return due
+
+
+class _JSONStream:
+    """Read JSON values from a stream of text or UTF-8 chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = ''
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+        # Characters might be split between two chunks of bytes
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+
+    def read(self):
+        """Append the next chunk to the buffer, dropping the consumed text"""
+
+        chunk = next(self.chunks, None)
+
+        if chunk is None:
+            return False
+
+        if isinstance(chunk, bytes):
+            chunk = self.utf8.decode(chunk)
+
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character or `None` at the end"""
+
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            elif not self.read():
+                return None
+
+    def expect(self, chars):
+        """Consume the next character, which must be one of `chars`"""
+
+        char = self.peek()
+
+        if char is None or char not in chars:
+            self.error("Expecting one of '%s'" % chars)
+
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode the next value"""
+
+        self.peek()
+
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # The value might be incomplete
+                if not self.read():
+                    raise
+                continue
+
+            # Numbers might continue in the next chunk
+            if self.__is_truncated(end) and self.read():
+                continue
+
+            self.pos = end
+            return value
+
+    def __is_truncated(self, end):
+        return end == len(self.buffer) or self.buffer[end] in _NUMBER_CHARS
+
+    def error(self, msg):
+        raise json.JSONDecodeError(msg, self.buffer, self.pos)
@@ -74,4 +74,8 @@ setup(name="perceval-mozilla",
           'grimoirelab-toolkit>=0.1.0',
           'perceval>=0.8'
       ],
+      extras_require={
+          'async': ['aiohttp>=3.3'],
+          'fast-json': ['orjson>=3.0']
+      },
       zip_safe=False)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+
+"""Benchmark of the replay of a Kitsune cache.
+
+A synthetic cache with `--answers` answers, `--answers-per-question`
+for each question, is kept in memory, so only the replay is measured.
+Questions are read from it with `Kitsune.fetch_from_cache` and with
+the previous implementation, which decoded every item of the cache,
+including the marks of the end of the questions, and each page of
+questions twice.
+
+Run it from the tests directory:
+
+    $ python3 bench_kitsune_cache.py --answers 1000000
+"""
+
+import argparse
+import json
+import time
+
+from perceval.backend import metadata
+from perceval.backends.mozilla.kitsune import (END_OF_QUESTION,
+                                               Kitsune,
+                                               KitsuneClient,
+                                               kitsune_metadata)
+from perceval.cache import Cache
+
+
+class MemoryCache(Cache):
+    """Cache which keeps its items in a list"""
+
+    def __init__(self, items):
+        self.items = items
+
+    def retrieve(self):
+        return iter(self.items)
+
+
+class LegacyKitsune(Kitsune):
+    """Kitsune backend with the previous replay of the cache"""
+
+    @kitsune_metadata
+    @metadata
+    def fetch_from_cache(self):
+        def get_drop_questions(offset):
+            page = int(offset / KitsuneClient.ITEMS_PER_PAGE)
+            page_offset = page * KitsuneClient.ITEMS_PER_PAGE
+            drop_questions = offset - page_offset
+            return drop_questions
+
+        def get_answers(cache_answers):
+            answers_data = []
+
+            for answers_raw in cache_answers:
+                answers = self.codec.loads(answers_raw)
+                if not answers:
+                    break
+                else:
+                    answers = answers['results']
+                    answers_data += answers
+
+            return answers_data
+
+        cache_items = self.cache.retrieve()
+
+        for items_raw in cache_items:
+            if type(items_raw) is int:
+                offset = items_raw
+                questions_raw = next(cache_items)
+                drop_questions = get_drop_questions(offset)
+            else:
+                questions_raw = items_raw
+            if not self.codec.loads(questions_raw):
+                questions_raw = next(cache_items)
+            questions = self.codec.loads(questions_raw)['results']
+            for question in questions:
+                if drop_questions > 0:
+                    drop_questions -= 1
+                    continue
+                question['offset'] = offset
+                offset += 1
+                question['answers_data'] = get_answers(cache_items)
+                yield question
+
+
+def build_cache(nanswers, answers_per_question):
+    """Build the items of the cache of one execution"""
+
+    page_size = KitsuneClient.ITEMS_PER_PAGE
+    nquestions = max(1, nanswers // answers_per_question)
+
+    items = [0]
+    answer_id = 0
+
+    for first in range(0, nquestions, page_size):
+        ids = range(first, min(first + page_size, nquestions))
+        questions = [{'id': i,
+                      'title': "Question %i" % i,
+                      'content': "Firefox does not start after the update",
+                      'updated': '2017-01-01T00:00:00Z'} for i in ids]
+        items.append(json.dumps({'count': nquestions, 'results': questions}).encode('utf-8'))
+
+        for _ in ids:
+            answers = []
+            for _ in range(answers_per_question):
+                answers.append({'id': answer_id,
+                                'content': "Remove the profile and try again",
+                                'creator': {'username': 'user%i' % answer_id}})
+                answer_id += 1
+
+            for i in range(0, len(answers), page_size):
+                page = {'results': answers[i:i + page_size]}
+                items.append(json.dumps(page).encode('utf-8'))
+
+            items.append(END_OF_QUESTION)
+
+    return items
+
+
+def replay(backend):
+    """Read the questions from the cache, counting the answers"""
+
+    nanswers = 0
+
+    for item in backend.fetch_from_cache():
+        nanswers += len(item['data']['answers_data'])
+
+    return nanswers
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    args.add_argument('--answers', type=int, default=1000000,
+                      help="number of answers in the cache")
+    args.add_argument('--answers-per-question', type=int, default=10,
+                      help="number of answers of each question")
+    args.add_argument('--repeat', type=int, default=3,
+                      help="number of runs of each benchmark")
+    args = args.parse_args()
+
+    items = build_cache(args.answers, args.answers_per_question)
+    size = sum(len(item) for item in items if type(item) is not int)
+    cache = MemoryCache(items)
+
+    print("Cache: %i items, %.1f MB" % (len(items), size / 1024 / 1024))
+
+    benchmarks = [('previous replay', LegacyKitsune(cache=cache)),
+                  ('streaming replay', Kitsune(cache=cache))]
+
+    for name, backend in benchmarks:
+        elapsed = []
+        for _ in range(args.repeat):
+            before = time.perf_counter()
+            nanswers = replay(backend)
+            elapsed.append(time.perf_counter() - before)
+
+        best = min(elapsed)
+        print("  %-26s %8.3f s %12.0f answers/s (codec: %s)"
+              % (name, best, nanswers / best, backend.codec.name))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+
+"""Micro-benchmark of the timestamps of the MozillaClub parser.
+
+The rows of 'data/mozillaclub/feed.json' are copied `--scale` times
+to build a larger feed. The update dates of the cells are converted
+and compared per row the way the parser did before, running
+`str_to_datetime` twice for each cell, and the way it does now, with
+`parse_cell_datetime`. The time of the whole parser is also shown.
+
+Run it from the tests directory:
+
+    $ python3 bench_mozillaclub.py --scale 100
+"""
+
+import argparse
+import json
+import timeit
+
+from grimoirelab.toolkit.datetime import str_to_datetime
+
+from perceval.utils import DEFAULT_DATETIME
+from perceval.backends.mozilla.mozillaclub import (MozillaClubParser,
+                                                   parse_cell_datetime)
+
+
+def scale_feed(filename, scale):
+    """Copy the rows with events of the feed `scale` times"""
+
+    with open(filename, 'r') as f:
+        feed = json.load(f)
+
+    cells = feed['feed']['entry']
+    header = [cell for cell in cells if cell['gs$cell']['row'] == '1']
+    rows = [cell for cell in cells if cell['gs$cell']['row'] != '1']
+    nrows = max(int(cell['gs$cell']['row']) for cell in rows) - 1
+
+    entry = list(header)
+
+    for n in range(scale):
+        for cell in rows:
+            cell = dict(cell)
+            cell['gs$cell'] = dict(cell['gs$cell'])
+            cell['gs$cell']['row'] = str(int(cell['gs$cell']['row']) + n * nrows)
+            entry.append(cell)
+
+    feed['feed']['entry'] = entry
+
+    return feed
+
+
+def rows_updated(cells):
+    """Group the update dates of the cells by row"""
+
+    rows = []
+    row = None
+
+    for cell in cells:
+        if cell['gs$cell']['row'] != row:
+            row = cell['gs$cell']['row']
+            rows.append([])
+        rows[-1].append(cell['updated']['$t'])
+
+    return rows
+
+
+def legacy_updated(rows):
+    for dates in rows:
+        updated = DEFAULT_DATETIME.isoformat()
+        for date in dates:
+            if str_to_datetime(date) > str_to_datetime(updated):
+                updated = date
+
+
+def current_updated(rows):
+    parse_cell_datetime.cache_clear()
+
+    for dates in rows:
+        updated = DEFAULT_DATETIME
+        updated_str = None
+        for date in dates:
+            cell_updated = parse_cell_datetime(date)
+            if cell_updated > updated:
+                updated = cell_updated
+                updated_str = date
+        _ = updated_str if updated_str else DEFAULT_DATETIME.isoformat()
+
+
+def parse(raw_feed):
+    parse_cell_datetime.cache_clear()
+
+    for _ in MozillaClubParser(raw_feed).parse():
+        pass
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    args.add_argument('--scale', type=int, default=50,
+                      help="number of copies of the rows of the feed")
+    args.add_argument('--repeat', type=int, default=3,
+                      help="number of runs of each benchmark")
+    args = args.parse_args()
+
+    feed = scale_feed('data/mozillaclub/feed.json', args.scale)
+    cells = feed['feed']['entry']
+    rows = rows_updated(cells)
+    raw_feed = json.dumps(feed)
+
+    print("Cells: %i, rows: %i" % (len(cells), len(rows)))
+
+    benchmarks = [('str_to_datetime per cell', lambda: legacy_updated(rows)),
+                  ('parse_cell_datetime', lambda: current_updated(rows)),
+                  ('MozillaClubParser.parse', lambda: parse(raw_feed))]
+
+    for name, func in benchmarks:
+        elapsed = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        print("%-28s %8.3f s" % (name, elapsed))
+
+
+if __name__ == '__main__':
+    main()
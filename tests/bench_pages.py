@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+
+"""Micro-benchmark of the decoding of the pages of the APIs.
+
+Pages of Kitsune questions, ReMo events and Crates.io crates are
+built copying `--scale` times the items of the pages in 'data'.
+`--pages` pages are read with `KitsuneClient.get_questions`,
+`ReMoClient.get_items` and `CratesClient.crates`, which get them
+from a stand-in session instead of the network.
+
+Pages are consumed the way backends do now, using the object
+decoded by the client, and the way they did before, decoding
+again the raw content of each page. Both decode with `--json-codec`,
+which is `json` of the standard library by default.
+
+Run it from the tests directory:
+
+    $ python3 bench_pages.py --scale 50 --pages 20
+"""
+
+import argparse
+import json
+import timeit
+
+import requests
+
+from perceval.backends.mozilla.codec import JSONCodec
+from perceval.backends.mozilla.crates import CratesClient
+from perceval.backends.mozilla.kitsune import KitsuneClient
+from perceval.backends.mozilla.remo import ReMoClient
+
+
+PAGES = [('Kitsune questions', 'data/kitsune/kitsune_questions_1_2.json', 'results'),
+         ('ReMo events', 'data/remo/remo_events_page_1_2.json', 'results'),
+         ('Crates.io crates', 'data/crates/crates_page_1', 'crates')]
+
+
+class PagesSession:
+    """Stand-in session which returns the given pages"""
+
+    def __init__(self, raw_pages):
+        self.raw_pages = raw_pages
+
+    def get(self, url, params=None, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = self.raw_pages[int(params['page']) - 1]
+
+        return response
+
+
+def scale_pages(filename, key, scale, npages):
+    """Build `npages` pages copying the items of a page `scale` times"""
+
+    with open(filename, 'r') as f:
+        page = json.load(f)
+
+    page[key] = page[key] * scale
+
+    if key == 'crates':
+        # Crates.io sets the number of pages with the total of crates
+        page['meta']['total'] = len(page[key]) * npages
+        return [json.dumps(page).encode('utf-8')] * npages
+
+    raw_pages = []
+
+    for npage in range(1, npages + 1):
+        page['next'] = 'http://example.com/api/?page=%i' % (npage + 1) if npage < npages else None
+        raw_pages.append(json.dumps(page).encode('utf-8'))
+
+    return raw_pages
+
+
+def read_pages(name, session, codec):
+    """Pages returned by the client of the API"""
+
+    if name == 'Kitsune questions':
+        client = KitsuneClient('http://example.com', session=session, codec=codec)
+        return client.get_questions()
+    elif name == 'ReMo events':
+        client = ReMoClient('http://example.com', session=session, codec=codec)
+        return client.get_items('events')
+    else:
+        client = CratesClient(session=session, codec=codec)
+        return client.crates()
+
+
+def legacy_pages(pages, key, codec):
+    """Pages decoded again by the backend, as before"""
+
+    for raw_page, _ in pages:
+        _ = codec.loads(raw_page)[key]
+
+
+def current_pages(pages, key):
+    """Pages decoded once by the client"""
+
+    for _, page in pages:
+        _ = page[key]
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    args.add_argument('--scale', type=int, default=50,
+                      help="number of copies of the items of each page")
+    args.add_argument('--pages', type=int, default=20,
+                      help="number of pages read")
+    args.add_argument('--repeat', type=int, default=3,
+                      help="number of runs of each benchmark")
+    args.add_argument('--json-codec', default='json',
+                      help="codec to decode the pages")
+    args = args.parse_args()
+
+    codec = JSONCodec(args.json_codec)
+
+    for name, filename, key in PAGES:
+        raw_pages = scale_pages(filename, key, args.scale, args.pages)
+        session = PagesSession(raw_pages)
+        size = sum(len(raw_page) for raw_page in raw_pages)
+
+        print("%s: %i pages, %.1f MB" % (name, args.pages, size / 1024 / 1024))
+
+        benchmarks = [('decoded twice', lambda: legacy_pages(read_pages(name, session, codec), key, codec)),
+                      ('decoded once', lambda: current_pages(read_pages(name, session, codec), key))]
+
+        for bench, func in benchmarks:
+            elapsed = min(timeit.repeat(func, number=1, repeat=args.repeat))
+            print("  %-26s %8.3f s" % (bench, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+
+"""Benchmark of the policies to flush the cache of ReMo.
+
+ReMo activities are fetched from a client which builds `--items`
+synthetic items without sending any request, so the time measured
+is the time spent writing the cache in a temporary directory with
+each flush policy.
+
+Run it from the tests directory:
+
+    $ python3 bench_remo_cache.py --items 2000
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+
+from perceval.backends.mozilla.remo import ReMo, ReMoClient
+from perceval.cache import Cache
+
+
+POLICIES = [('every item', {'flush_items': 1}),
+            ('every 100 items', {'flush_items': 100}),
+            ('every page', {'flush_pages': 1}),
+            ('every 10 pages', {'flush_pages': 10}),
+            ('every second', {'flush_interval': 1}),
+            ('at the end', {'flush_interval': 3600})]
+
+
+class SyntheticClient:
+    """Client which returns pages of synthetic activities"""
+
+    def __init__(self, nitems):
+        self.nitems = nitems
+
+    def get_items(self, category='activities', offset=0, filters=None):
+        page_size = ReMoClient.ITEMS_PER_PAGE
+
+        for first in range(0, self.nitems, page_size):
+            ids = range(first, min(first + page_size, self.nitems))
+            page = {'count': self.nitems,
+                    'results': [{'_url': 'https://reps.mozilla.org/api/remo/v1/activities/%i/' % i}
+                                for i in ids]}
+            yield json.dumps(page).encode('utf-8'), page
+
+    def call(self, uri, params=None):
+        activity_id = uri.rstrip('/').rsplit('/', 1)[1]
+        activity = {'activity': 'Organized an event',
+                    'report_date': '2017-01-01',
+                    'remo_url': 'https://reps.mozilla.org/activities/' + activity_id,
+                    'user': {'first_name': 'Jane', 'last_name': 'Doe'}}
+        return json.dumps(activity).encode('utf-8'), activity
+
+
+def fetch(nitems, policy):
+    """Fetch the items storing them in a new cache"""
+
+    tmp_path = tempfile.mkdtemp(prefix='perceval_')
+
+    try:
+        remo = ReMo(cache=Cache(tmp_path), **policy)
+        remo.client = SyntheticClient(nitems)
+
+        before = time.perf_counter()
+        for _ in remo.fetch(category='activities'):
+            pass
+        return time.perf_counter() - before
+    finally:
+        shutil.rmtree(tmp_path)
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    args.add_argument('--items', type=int, default=2000,
+                      help="number of items fetched")
+    args.add_argument('--repeat', type=int, default=3,
+                      help="number of runs of each benchmark")
+    args = args.parse_args()
+
+    print("ReMo activities: %i items" % args.items)
+
+    for name, policy in POLICIES:
+        elapsed = min(fetch(args.items, policy) for _ in range(args.repeat))
+        print("  %-26s %8.3f s %10.0f items/s" % (name, elapsed, args.items / elapsed))
+
+
+if __name__ == '__main__':
+    main()
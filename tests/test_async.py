@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+
+import asyncio
+import datetime
+import shutil
+import tempfile
+import time
+import unittest
+import unittest.mock
+import urllib.parse
+
+import requests
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from perceval.backends.mozilla.client import AsyncHttpClient, RetryPolicy
+from perceval.backends.mozilla.codec import JSON_CODECS
+from perceval.backends.mozilla.crates import Crates, CRATES_CATEGORY, SUMMARY_CATEGORY
+from perceval.backends.mozilla.kitsune import Kitsune
+from perceval.backends.mozilla.mozillaclub import MozillaClub
+from perceval.backends.mozilla.ratelimit import RateLimiter
+from perceval.backends.mozilla.remo import ReMo
+from perceval.cache import Cache
+
+from local_server import LocalHTTPServer, LocalHTTPRequestHandler
+
+
+REMO_CATEGORIES = ['events', 'activities', 'users']
+CRATES_IDS = {'a': '1', 'aabb2': '2', 'aac': '3', 'abc': '4'}
+
+
+def read_file(filename, mode='r'):
+    with open(filename, mode) as f:
+        content = f.read()
+    return content
+
+
+class APIHTTPServer(LocalHTTPServer):
+    """Stand-in HTTP server for the Mozilla APIs"""
+
+    def __init__(self):
+        super().__init__(APIHTTPRequestHandler)
+
+
+class APIHTTPRequestHandler(LocalHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        self.server.requests.append(self.path)
+        nrequests = self.server.requests.count(self.path)
+
+        if url.path == '/unavailable' and nrequests <= 2:
+            self.send_body(b'', status=503, headers={'Retry-After': '3'})
+            return
+        elif url.path == '/stalled' and nrequests == 1:
+            time.sleep(1)
+            return
+
+        body = self.route(url.path, params)
+
+        if body is None:
+            self.send_body(b'', status=404)
+        else:
+            self.send_body(body.encode('utf-8'), content_type='application/json; charset=utf-8')
+
+    def route(self, path, params):
+        page = params.get('page', None)
+
+        if path == '/api/2/question/':
+            if page == '1':
+                return read_file('data/kitsune/kitsune_questions_1_2.json')
+            elif page == '2':
+                return read_file('data/kitsune/kitsune_questions_2_2.json')
+        elif path == '/api/2/answer/':
+            if params['question'] == '1129949':
+                return read_file('data/kitsune/kitsune_question_answers.json')
+            else:
+                return read_file('data/kitsune/kitsune_question_answers_empy.json')
+        elif path.startswith('/api/remo/v1/'):
+            category = path.split('/')[4]
+            if page:
+                body = read_file('data/remo/remo_' + category + '_page_' + page + '_2.json')
+                return body.replace('http://example.com', self.server.url)
+            else:
+                return read_file('data/remo/remo_' + category + '.json')
+        elif path in ('/unavailable', '/stalled'):
+            return '{}'
+        elif path == '/feed':
+            return read_file('data/mozillaclub/feed.json')
+        elif path == '/api/v1/summary':
+            return read_file('data/crates/crates_summary')
+        elif path == '/api/v1/crates':
+            if params.get('sort', None) == 'recent-updates':
+                page = 'recent_' + page
+            return read_file('data/crates/crates_page_' + page)
+        elif path.startswith('/api/v1/crates/'):
+            parts = path.split('/')[4:]
+            n = CRATES_IDS[parts[0]]
+            if len(parts) == 1:
+                return read_file('data/crates/crate_example_' + n)
+            elif parts[1] == 'downloads':
+                n = n if n == '1' else 'empty'
+                return read_file('data/crates/crate_version_downloads_' + n)
+            else:
+                return read_file('data/crates/crate_' + parts[1] + '_' + n)
+
+        return None
+
+
+def run(coroutine):
+    """Run a coroutine in a new event loop"""
+
+    loop = asyncio.new_event_loop()
+
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+async def collect(items):
+    return [item async for item in items]
+
+
+def strip_timestamps(items):
+    for item in items:
+        item.pop('timestamp')
+    return items
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class TestAsyncHttpClient(unittest.TestCase):
+    """Tests for AsyncHttpClient class"""
+
+    def test_fetch(self):
+        """Test if the body of the response is returned"""
+
+        async def fetch(url):
+            async with AsyncHttpClient() as client:
+                return await client.fetch(url, params={'page': 1})
+
+        with APIHTTPServer() as server:
+            body = run(fetch(server.url + '/api/v1/crates'))
+
+        self.assertEqual(body, read_file('data/crates/crates_page_1', mode='rb'))
+        self.assertListEqual(server.requests, ['/api/v1/crates?page=1'])
+
+    def test_http_error(self):
+        """Test if errors are raised as HTTPError exceptions"""
+
+        async def fetch(url):
+            async with AsyncHttpClient() as client:
+                return await client.fetch(url)
+
+        with APIHTTPServer() as server:
+            with self.assertRaises(requests.exceptions.HTTPError) as e:
+                run(fetch(server.url + '/unknown'))
+
+        self.assertEqual(e.exception.response.status_code, 404)
+
+    def test_retry(self):
+        """Test if failed requests are retried without blocking"""
+
+        sleeps = []
+
+        async def sleep(seconds):
+            sleeps.append(seconds)
+
+        policy = RetryPolicy(async_sleep=sleep)
+
+        async def fetch(url):
+            async with AsyncHttpClient(retry_policy=policy) as client:
+                return await client.fetch(url)
+
+        with APIHTTPServer() as server:
+            body = run(fetch(server.url + '/unavailable'))
+
+        self.assertEqual(body, b'{}')
+        self.assertEqual(len(server.requests), 3)
+        self.assertListEqual(sleeps, [3.0, 3.0])
+
+        # The last error is raised when there are no more retries
+        policy = RetryPolicy(max_retries=1, async_sleep=sleep)
+
+        with APIHTTPServer() as server:
+            with self.assertRaises(requests.exceptions.HTTPError) as e:
+                run(fetch(server.url + '/unavailable'))
+
+        self.assertEqual(e.exception.response.status_code, 503)
+        self.assertEqual(len(server.requests), 2)
+
+    def test_timeout(self):
+        """Test if requests to a stalled server time out and are retried"""
+
+        sleeps = []
+
+        async def sleep(seconds):
+            sleeps.append(seconds)
+
+        policy = RetryPolicy(async_sleep=sleep)
+
+        async def fetch(url):
+            async with AsyncHttpClient(retry_policy=policy, timeout=0.2) as client:
+                return await client.fetch(url)
+
+        with APIHTTPServer() as server:
+            body = run(fetch(server.url + '/stalled'))
+
+        self.assertEqual(body, b'{}')
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(len(sleeps), 1)
+
+    def test_rate_limiter(self):
+        """Test if requests wait for the rate limiter without blocking"""
+
+        sleeps = []
+        rate_limiter = RateLimiter(1000, burst=1, sleep=sleeps.append)
+
+        async def fetch(url):
+            async with AsyncHttpClient(rate_limiter=rate_limiter) as client:
+                for _ in range(3):
+                    await client.fetch(url)
+
+        with APIHTTPServer() as server:
+            run(fetch(server.url + '/feed'))
+
+        self.assertEqual(len(server.requests), 3)
+        self.assertListEqual(sleeps, [])
+        self.assertLess(rate_limiter.reserve(server.url), 0.01)
+
+    def test_shared_session(self):
+        """Test if a given session is not closed by the client"""
+
+        async def fetch(url):
+            async with aiohttp.ClientSession() as session:
+                async with AsyncHttpClient(session=session) as client:
+                    await client.fetch(url)
+                self.assertFalse(session.closed)
+
+                async with AsyncHttpClient(session=session) as client:
+                    await client.fetch(url)
+                self.assertFalse(session.closed)
+
+        with APIHTTPServer() as server:
+            run(fetch(server.url + '/feed'))
+
+        self.assertEqual(len(server.requests), 2)
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class TestFetchAsync(unittest.TestCase):
+    """Tests for the asynchronous fetch methods of the backends"""
+
+    def test_kitsune(self):
+        """Test if Kitsune returns the same items in both modes"""
+
+        with APIHTTPServer() as server:
+            kitsune = Kitsune(server.url)
+            expected = strip_timestamps([item for item in kitsune.fetch(offset=1)])
+            items = strip_timestamps(run(collect(kitsune.fetch_async(offset=1))))
+
+        self.assertEqual(len(items), 3)
+        self.assertEqual(items[0]['offset'], 1)
+        self.assertListEqual(items, expected)
+
+    def test_remo(self):
+        """Test if ReMo returns the same items in both modes"""
+
+        for category in REMO_CATEGORIES:
+            with APIHTTPServer() as server:
+                remo = ReMo(server.url)
+                expected = strip_timestamps([item for item in remo.fetch(offset=15, category=category)])
+                items = strip_timestamps(run(collect(remo.fetch_async(offset=15, category=category))))
+
+            self.assertEqual(len(items), 25)
+            self.assertEqual(items[0]['offset'], 15)
+            self.assertListEqual(items, expected)
+
+        with APIHTTPServer() as server:
+            remo = ReMo(server.url)
+            offsets = {'events': 15, 'users': 25}
+            expected = strip_timestamps([item for item in remo.fetch(offset=offsets,
+                                                                     category='events,users')])
+            items = strip_timestamps(run(collect(remo.fetch_async(offset=offsets,
+                                                                  category='events,users'))))
+
+        self.assertEqual(len(items), 40)
+        self.assertListEqual(items, expected)
+
+        with APIHTTPServer() as server:
+            remo = ReMo(server.url)
+            from_date = datetime.datetime(2012, 1, 1)
+            expected = strip_timestamps([item for item in remo.fetch(category='events,users',
+                                                                     from_date=from_date)])
+            items = strip_timestamps(run(collect(remo.fetch_async(category='events,users',
+                                                                  from_date=from_date))))
+
+        # Users joined before the date
+        self.assertEqual(len(items), 40)
+        self.assertListEqual(items, expected)
+
+        remo = ReMo()
+        with self.assertRaises(ValueError):
+            run(collect(remo.fetch_async(category='wrong')))
+
+    def test_mozillaclub(self):
+        """Test if MozillaClub returns the same items in both modes"""
+
+        with APIHTTPServer() as server:
+            mozillaclub = MozillaClub(server.url + '/feed')
+            expected = strip_timestamps([item for item in mozillaclub.fetch()])
+            items = strip_timestamps(run(collect(mozillaclub.fetch_async())))
+
+        self.assertEqual(len(items), 92)
+        self.assertListEqual(items, expected)
+
+    def test_crates(self):
+        """Test if Crates returns the same items in both modes"""
+
+        with APIHTTPServer() as server:
+            api_url = server.url + '/api/v1/'
+
+            with unittest.mock.patch('perceval.backends.mozilla.crates.CRATES_API_URL', api_url):
+                crates = Crates(workers=3)
+                expected = strip_timestamps([item for item in crates.fetch()])
+                items = strip_timestamps(run(collect(crates.fetch_async())))
+
+                summary = run(collect(crates.fetch_async(category=SUMMARY_CATEGORY)))
+
+        self.assertEqual(len(items), 4)
+        self.assertEqual(items[0]['category'], CRATES_CATEGORY)
+        self.assertListEqual(items, expected)
+
+        self.assertEqual(len(summary), 1)
+        self.assertEqual(summary[0]['category'], SUMMARY_CATEGORY)
+        self.assertEqual(summary[0]['data']['num_crates'], 10000)
+
+    def test_crates_cache(self):
+        """Test if Crates stores the same crates in the cache in both modes"""
+
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        self.addCleanup(shutil.rmtree, tmp_path)
+
+        with APIHTTPServer() as server:
+            api_url = server.url + '/api/v1/'
+
+            with unittest.mock.patch('perceval.backends.mozilla.crates.CRATES_API_URL', api_url):
+                crates = Crates(workers=3, cache=Cache(tmp_path))
+                items = strip_timestamps(run(collect(crates.fetch_async())))
+
+        cached_items = strip_timestamps([item for item in crates.fetch_from_cache()])
+
+        self.assertEqual(len(items), 4)
+        self.assertListEqual(cached_items, items)
+
+    def test_crates_incremental(self):
+        """Test if Crates returns the same items in both modes in incremental mode"""
+
+        from_date = datetime.datetime(2016, 1, 1)
+
+        with APIHTTPServer() as server:
+            api_url = server.url + '/api/v1/'
+
+            with unittest.mock.patch('perceval.backends.mozilla.crates.CRATES_API_URL', api_url):
+                crates = Crates(workers=2, incremental=True)
+                expected = strip_timestamps([item for item in crates.fetch(from_date=from_date)])
+                items = strip_timestamps(run(collect(crates.fetch_async(from_date=from_date))))
+
+        self.assertEqual(len(items), 3)
+        self.assertListEqual(items, expected)
+        self.assertEqual(len([path for path in server.requests if 'recent-updates' in path]), 4)
+
+    def test_json_codecs(self):
+        """Test if the items are the same with every JSON codec"""
+
+        with APIHTTPServer() as server:
+            expected = strip_timestamps([item for item in Kitsune(server.url).fetch()])
+
+            for name in JSON_CODECS:
+                try:
+                    kitsune = Kitsune(server.url, json_codec=name)
+                except ImportError:
+                    continue
+
+                items = strip_timestamps([item for item in kitsune.fetch()])
+                self.assertListEqual(items, expected)
+
+                items = strip_timestamps(run(collect(kitsune.fetch_async())))
+                self.assertListEqual(items, expected)
+
+    def test_concurrent_origins(self):
+        """Test if several backends run in the same event loop sharing a session"""
+
+        async def fetch_all(url):
+            async with aiohttp.ClientSession() as session:
+                fetching = [collect(Kitsune(url).fetch_async(session=session)),
+                            collect(ReMo(url).fetch_async(category='users', session=session)),
+                            collect(MozillaClub(url + '/feed').fetch_async(session=session))]
+                return await asyncio.gather(*fetching)
+
+        with APIHTTPServer() as server:
+            questions, users, events = run(fetch_all(server.url))
+
+        self.assertEqual(len(questions), 4)
+        self.assertEqual(len(users), 40)
+        self.assertEqual(len(events), 92)
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+
+import asyncio
+import email.utils
+import io
+import time
+import unittest
+
+import requests
+
+from perceval.backends.mozilla.client import (DEFAULT_POOL_SIZE,
+                                              DEFAULT_TIMEOUT,
+                                              HttpClient,
+                                              RetryPolicy,
+                                              create_session)
+from perceval.backends.mozilla.codec import JSONCodec
+
+from local_server import LocalHTTPServer, LocalHTTPRequestHandler
+
+
+class ClientHTTPServer(LocalHTTPServer):
+    """Stand-in HTTP server which tracks the connections of its clients"""
+
+    def __init__(self):
+        super().__init__(ClientHTTPRequestHandler)
+        self.connections = set()  # client ports connected to the server
+        self.headers = []  # headers of the requests received
+
+
+class ClientHTTPRequestHandler(LocalHTTPRequestHandler):
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address[1])
+        self.server.headers.append(self.headers)
+
+        self.send_body(b'{}')
+
+
+class TestCreateSession(unittest.TestCase):
+    """Tests for create_session function"""
+
+    def test_session(self):
+        """Test if a pooled session is created"""
+
+        session = create_session()
+        self.assertIsInstance(session, requests.Session)
+        self.assertEqual(session.headers['Accept-Encoding'], 'gzip, deflate')
+        self.assertEqual(session.headers['Connection'], 'keep-alive')
+
+        adapter = session.get_adapter('https://example.com')
+        self.assertEqual(adapter._pool_connections, DEFAULT_POOL_SIZE)
+        self.assertEqual(adapter._pool_maxsize, DEFAULT_POOL_SIZE)
+
+    def test_pool_size(self):
+        """Test if the pool size can be set"""
+
+        session = create_session(pool_size=25)
+
+        for url in ('http://example.com', 'https://example.com'):
+            adapter = session.get_adapter(url)
+            self.assertEqual(adapter._pool_connections, 25)
+            self.assertEqual(adapter._pool_maxsize, 25)
+
+    def test_no_keep_alive(self):
+        """Test if connections are closed when keep alive is disabled"""
+
+        session = create_session(keep_alive=False)
+        self.assertEqual(session.headers['Connection'], 'close')
+
+
+class TestHttpClient(unittest.TestCase):
+    """Tests for HttpClient class"""
+
+    def test_init(self):
+        """Test if a session is created or the given one is used"""
+
+        client = HttpClient()
+        self.assertIsInstance(client.session, requests.Session)
+        self.assertIsInstance(client.retry_policy, RetryPolicy)
+
+        policy = RetryPolicy(max_retries=0)
+        client = HttpClient(retry_policy=policy)
+        self.assertIs(client.retry_policy, policy)
+
+        session = create_session()
+        client = HttpClient(session=session)
+        self.assertIs(client.session, session)
+
+        self.assertIsInstance(client.codec, JSONCodec)
+
+        codec = JSONCodec('json')
+        client = HttpClient(codec=codec)
+        self.assertIs(client.codec, codec)
+
+        self.assertEqual(client.timeout, DEFAULT_TIMEOUT)
+
+        client = HttpClient(timeout=5)
+        self.assertEqual(client.timeout, 5)
+
+    def test_fetch_json(self):
+        """Test if JSON responses are returned with their decoded objects"""
+
+        with ClientHTTPServer() as server:
+            client = HttpClient()
+            raw_content, content = client.fetch_json(server.url)
+
+        self.assertEqual(raw_content, b'{}')
+        self.assertDictEqual(content, {})
+
+    def test_connections_reused(self):
+        """Test if the same connection is used for several requests"""
+
+        with ClientHTTPServer() as server:
+            client = HttpClient()
+
+            for _ in range(5):
+                response = client.fetch(server.url + '/items', params={'page': 1})
+                self.assertEqual(response.text, '{}')
+
+        self.assertEqual(len(server.headers), 5)
+        self.assertEqual(len(server.connections), 1)
+        self.assertIn('gzip', server.headers[0]['Accept-Encoding'])
+
+    def test_shared_session(self):
+        """Test if clients sharing a session share their connections"""
+
+        with ClientHTTPServer() as server:
+            session = create_session()
+            clients = [HttpClient(session=session) for _ in range(3)]
+
+            for client in clients:
+                client.fetch(server.url)
+
+        self.assertEqual(len(server.headers), 3)
+        self.assertEqual(len(server.connections), 1)
+
+    def test_connections_not_reused(self):
+        """Test if a new connection is used when keep alive is disabled"""
+
+        with ClientHTTPServer() as server:
+            client = HttpClient(session=create_session(keep_alive=False))
+
+            for _ in range(3):
+                client.fetch(server.url)
+
+        self.assertEqual(len(server.headers), 3)
+        self.assertEqual(len(server.connections), 3)
+
+    def test_http_error(self):
+        """Test if an exception is raised when the server returns an error"""
+
+        with ClientHTTPServer() as server:
+            server.RequestHandlerClass = NotFoundRequestHandler
+            client = HttpClient()
+
+            with self.assertRaises(requests.exceptions.HTTPError):
+                client.fetch(server.url)
+
+    def test_retry(self):
+        """Test if failed requests are retried"""
+
+        clock = FakeClock()
+        policy = RetryPolicy(clock=clock.time, sleep=clock.sleep)
+
+        with ClientHTTPServer() as server:
+            server.RequestHandlerClass = UnavailableRequestHandler
+            client = HttpClient(retry_policy=policy)
+
+            response = client.fetch(server.url)
+            self.assertEqual(response.text, '{}')
+
+        self.assertEqual(len(server.headers), 3)
+        self.assertListEqual(clock.sleeps, [3.0, 3.0])
+
+    def test_timeout(self):
+        """Test if requests to a stalled server time out and are retried"""
+
+        clock = FakeClock()
+        policy = RetryPolicy(clock=clock.time, sleep=clock.sleep, random=lambda: 0.0)
+
+        with ClientHTTPServer() as server:
+            server.RequestHandlerClass = StalledRequestHandler
+            client = HttpClient(retry_policy=policy, timeout=0.2)
+
+            response = client.fetch(server.url)
+            self.assertEqual(response.text, '{}')
+
+        self.assertEqual(len(server.headers), 2)
+        self.assertListEqual(clock.sleeps, [0.5])
+
+    def test_rate_limiter(self):
+        """Test if every request waits for the rate limiter"""
+
+        class RecordingRateLimiter:
+            def __init__(self):
+                self.urls = []
+
+            def acquire(self, url):
+                self.urls.append(url)
+
+        clock = FakeClock()
+        policy = RetryPolicy(clock=clock.time, sleep=clock.sleep)
+        rate_limiter = RecordingRateLimiter()
+
+        with ClientHTTPServer() as server:
+            server.RequestHandlerClass = UnavailableRequestHandler
+            client = HttpClient(retry_policy=policy, rate_limiter=rate_limiter)
+            client.fetch(server.url)
+
+        # Retries are paced, too
+        self.assertListEqual(rate_limiter.urls, [server.url] * 3)
+
+    def test_retry_exhausted(self):
+        """Test if an exception is raised when there are no more retries"""
+
+        clock = FakeClock()
+        policy = RetryPolicy(max_retries=1, clock=clock.time, sleep=clock.sleep)
+
+        with ClientHTTPServer() as server:
+            server.RequestHandlerClass = UnavailableRequestHandler
+            client = HttpClient(retry_policy=policy)
+
+            with self.assertRaises(requests.exceptions.HTTPError) as e:
+                client.fetch(server.url)
+
+        self.assertEqual(e.exception.response.status_code, 503)
+        self.assertEqual(len(server.headers), 2)
+
+
+class NotFoundRequestHandler(ClientHTTPRequestHandler):
+
+    def do_GET(self):
+        self.send_body(b'', status=404)
+
+
+class UnavailableRequestHandler(ClientHTTPRequestHandler):
+    """Answer the first two requests with a 503 error"""
+
+    def do_GET(self):
+        if len(self.server.headers) >= 2:
+            super().do_GET()
+            return
+
+        self.server.headers.append(self.headers)
+
+        self.send_body(b'', status=503, headers={'Retry-After': '3'})
+
+
+class StalledRequestHandler(ClientHTTPRequestHandler):
+    """Answer the first request after a long time"""
+
+    def do_GET(self):
+        if not self.server.headers:
+            self.server.headers.append(self.headers)
+            time.sleep(1)
+            return
+
+        super().do_GET()
+
+
+class FakeClock:
+    """Clock which advances only when sleeping"""
+
+    def __init__(self):
+        self.now = 1500000000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def async_sleep(self, seconds):
+        self.sleep(seconds)
+
+
+def build_response(status_code, headers=None):
+    response = requests.models.Response()
+    response.status_code = status_code
+    response.raw = io.BytesIO(b'')
+    response.headers.update(headers or {})
+    return response
+
+
+def fake_send(results):
+    """Return a function that returns (or raises) the given results in order"""
+
+    results = iter(results)
+    calls = []
+
+    def send():
+        calls.append(1)
+        result = next(results)
+
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return send, calls
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """Tests for RetryPolicy class"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def build_policy(self, **kwargs):
+        return RetryPolicy(clock=self.clock.time, sleep=self.clock.sleep,
+                           random=lambda: 0.5, **kwargs)
+
+    def test_success(self):
+        """Test if successful responses are not retried"""
+
+        policy = self.build_policy()
+        send, calls = fake_send([build_response(200)])
+
+        response = policy.call(send)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 1)
+        self.assertListEqual(self.clock.sleeps, [])
+
+    def test_not_retried_status(self):
+        """Test if other errors are not retried"""
+
+        policy = self.build_policy()
+
+        for status_code in (400, 404, 500):
+            send, calls = fake_send([build_response(status_code)])
+
+            response = policy.call(send)
+            self.assertEqual(response.status_code, status_code)
+            self.assertEqual(len(calls), 1)
+
+        self.assertListEqual(self.clock.sleeps, [])
+
+    def test_backoff(self):
+        """Test if the time between retries grows exponentially"""
+
+        policy = self.build_policy(backoff_factor=2, max_backoff=10)
+        send, calls = fake_send([build_response(503), build_response(502),
+                                 build_response(429), build_response(504),
+                                 build_response(200)])
+
+        response = policy.call(send)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 5)
+
+        # Half of the backoff is random
+        self.assertListEqual(self.clock.sleeps, [1.5, 3.0, 6.0, 7.5])
+
+    def test_jitter(self):
+        """Test if the delay is randomized between half and the whole backoff"""
+
+        policy = RetryPolicy(backoff_factor=4, random=lambda: 0.0)
+        self.assertEqual(policy.delay(0), 2.0)
+
+        policy = RetryPolicy(backoff_factor=4, random=lambda: 0.99)
+        self.assertAlmostEqual(policy.delay(0), 3.98)
+
+    def test_retry_after(self):
+        """Test if the time set by the server is waited"""
+
+        date = email.utils.formatdate(self.clock.now + 30, usegmt=True)
+
+        policy = self.build_policy()
+        send, calls = fake_send([build_response(503, {'Retry-After': date}),
+                                 build_response(429, {'Retry-After': '7'}),
+                                 build_response(503, {'Retry-After': 'soon'}),
+                                 build_response(200)])
+
+        response = policy.call(send)
+        self.assertEqual(response.status_code, 200)
+        self.assertListEqual(self.clock.sleeps, [30.0, 7.0, 3.0])
+
+    def test_max_retries(self):
+        """Test if the last response is returned when there are no more retries"""
+
+        policy = self.build_policy(max_retries=3)
+        send, calls = fake_send([build_response(503)] * 10)
+
+        response = policy.call(send)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(len(self.clock.sleeps), 3)
+
+    def test_max_elapsed(self):
+        """Test if no retries are done when they would exceed the maximum time"""
+
+        policy = self.build_policy(max_elapsed=60)
+        send, calls = fake_send([build_response(503, {'Retry-After': '40'})] * 10)
+
+        response = policy.call(send)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(calls), 2)
+        self.assertListEqual(self.clock.sleeps, [40.0])
+
+    def test_connection_error(self):
+        """Test if connection errors are retried"""
+
+        policy = self.build_policy()
+        send, calls = fake_send([requests.exceptions.ConnectionError(),
+                                 requests.exceptions.Timeout(),
+                                 build_response(200)])
+
+        response = policy.call(send)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 3)
+
+        policy = self.build_policy(max_retries=2)
+        send, calls = fake_send([requests.exceptions.ConnectionError()] * 5)
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            policy.call(send)
+
+        self.assertEqual(len(calls), 3)
+
+    def test_call_async(self):
+        """Test if requests sent by coroutines are retried without blocking"""
+
+        policy = self.build_policy(async_sleep=self.clock.async_sleep)
+        send, calls = fake_send([build_response(503, {'Retry-After': '7'}),
+                                 requests.exceptions.Timeout(),
+                                 build_response(200)])
+
+        async def send_async():
+            return send()
+
+        loop = asyncio.new_event_loop()
+
+        try:
+            response = loop.run_until_complete(policy.call_async(send_async))
+        finally:
+            loop.close()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 3)
+        self.assertListEqual(self.clock.sleeps, [7.0, 1.5])
+
+    def test_no_retries(self):
+        """Test if requests are not retried when retries are disabled"""
+
+        policy = self.build_policy(max_retries=0)
+        send, calls = fake_send([build_response(503)])
+
+        response = policy.call(send)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(calls), 1)
+        self.assertListEqual(self.clock.sleeps, [])
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
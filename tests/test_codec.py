@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+
+import json
+import unittest
+import unittest.mock
+
+from perceval.backends.mozilla.codec import (JSON_CODECS,
+                                             JSONCodec,
+                                             default_codec,
+                                             orjson,
+                                             ujson)
+
+
+DOCUMENT = '{"count": 2, "next": null, "results": [{"id": 1, "title": "\\u00bfQu\\u00e9?"}, {"id": 2.5}]}'
+OBJECT = {'count': 2, 'next': None, 'results': [{'id': 1, 'title': '¿Qué?'}, {'id': 2.5}]}
+
+
+def installed_codecs():
+    installed = {'orjson': orjson, 'ujson': ujson, 'json': json}
+    return [name for name in JSON_CODECS if installed[name]]
+
+
+class TestJSONCodec(unittest.TestCase):
+    """Tests for JSONCodec class"""
+
+    def test_default(self):
+        """Test if the fastest codec installed is used by default"""
+
+        codec = JSONCodec()
+        self.assertEqual(codec.name, default_codec())
+        self.assertEqual(codec.name, installed_codecs()[0])
+
+        with unittest.mock.patch('perceval.backends.mozilla.codec.orjson', None), \
+                unittest.mock.patch('perceval.backends.mozilla.codec.ujson', None):
+            self.assertEqual(default_codec(), 'json')
+            self.assertEqual(JSONCodec().name, 'json')
+
+    def test_loads(self):
+        """Test if documents are decoded from text and from bytes"""
+
+        for name in installed_codecs():
+            codec = JSONCodec(name)
+            self.assertEqual(codec.name, name)
+            self.assertDictEqual(codec.loads(DOCUMENT), OBJECT)
+            self.assertDictEqual(codec.loads(DOCUMENT.encode('utf-8')), OBJECT)
+
+            document = '{"title": "¿Qué?"}'.encode('utf-8')
+            self.assertDictEqual(codec.loads(document), {'title': '¿Qué?'})
+
+    def test_loads_error(self):
+        """Test if decoding errors are raised as ValueError exceptions"""
+
+        for name in installed_codecs():
+            codec = JSONCodec(name)
+
+            with self.assertRaises(ValueError):
+                codec.loads('{"count": 2, "results": [')
+
+            with self.assertRaises(ValueError):
+                codec.loads(b'')
+
+    def test_dumps(self):
+        """Test if objects are encoded into UTF-8 bytes"""
+
+        for name in installed_codecs():
+            codec = JSONCodec(name)
+            document = codec.dumps(OBJECT)
+            self.assertIsInstance(document, bytes)
+            self.assertDictEqual(json.loads(document), OBJECT)
+
+    def test_unknown_codec(self):
+        """Test if an exception is raised when the codec is not supported"""
+
+        with self.assertRaises(ValueError):
+            JSONCodec('simplejson')
+
+    def test_missing_library(self):
+        """Test if an exception is raised when the library is not installed"""
+
+        with unittest.mock.patch('perceval.backends.mozilla.codec.orjson', None):
+            with self.assertRaises(ImportError):
+                JSONCodec('orjson')
+
+        with unittest.mock.patch('perceval.backends.mozilla.codec.ujson', None):
+            with self.assertRaises(ImportError):
+                JSONCodec('ujson')
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
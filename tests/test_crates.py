@@ -23,17 +23,28 @@
 
 import datetime
 import json
+import os
+import shutil
+import tempfile
 import unittest
 
 import httpretty
 
 from perceval.backend import BackendCommandArgumentParser
+from perceval.backends.mozilla.client import DEFAULT_POOL_SIZE, RetryPolicy
 from perceval.backends.mozilla.crates import (Crates,
+                                              CratesCheckpoint,
                                               CratesClient,
                                               CratesCommand,
+                                              CratesIndex,
                                               CRATES_CATEGORY,
+                                              DEFAULT_CHECKPOINT_INTERVAL,
+                                              DEFAULT_REFRESH_INTERVAL,
+                                              SORT_RECENT_UPDATES,
                                               SUMMARY_CATEGORY)
-
+from perceval.backends.mozilla.ratelimit import RateLimiter
+from perceval.cache import Cache
+from perceval.errors import CacheError
 from perceval.utils import DEFAULT_DATETIME
 
 CRATES_API_URL = "https://crates.io/api/v1/"
@@ -46,7 +57,12 @@ def read_file(filename, mode='r'):
 
 
 def setup_http_server(empty=False):
-    """Setup a mock HTTP server"""
+    """Setup a mock HTTP server.
+
+    Returns the list of pages of crates requested sorted
+    by recent updates.
+    """
+    recent_pages = []
 
     summary = read_file('data/crates/crates_summary')
     httpretty.register_uri(httpretty.GET,
@@ -58,6 +74,7 @@ def setup_http_server(empty=False):
         page_empty = read_file('data/crates/crates_page_empty')
         httpretty.register_uri(httpretty.GET,
                                CRATES_API_URL + 'crates?sort=alphabetical&page=1',
+                               match_querystring=True,
                                body=page_empty,
                                status=200)
     else:
@@ -66,13 +83,18 @@ def setup_http_server(empty=False):
 
         httpretty.register_uri(httpretty.GET,
                                CRATES_API_URL + 'crates?sort=alphabetical&page=2',
+                               match_querystring=True,
                                body=page_2,
                                status=200)
         httpretty.register_uri(httpretty.GET,
                                CRATES_API_URL + 'crates?sort=alphabetical&page=1',
+                               match_querystring=True,
                                body=page_1,
                                status=200)
 
+        for page in ('1', '2'):
+            register_recent_page(page, read_file('data/crates/crates_page_recent_' + page), recent_pages)
+
         crate_1 = read_file('data/crates/crate_example_1')
         crate_2 = read_file('data/crates/crate_example_2')
         crate_3 = read_file('data/crates/crate_example_3')
@@ -161,6 +183,21 @@ def setup_http_server(empty=False):
                                body=crate_version_downloads_4,
                                status=200)
 
+    return recent_pages
+
+
+def register_recent_page(page, body, recent_pages):
+    """Serve a page of crates sorted by recent updates"""
+
+    def request_callback(method, uri, headers):
+        recent_pages.append(page)
+        return (200, headers, body)
+
+    httpretty.register_uri(httpretty.GET,
+                           CRATES_API_URL + 'crates?sort=recent-updates&page=' + page,
+                           match_querystring=True,
+                           body=request_callback)
+
 
 class TestCratesBackend(unittest.TestCase):
     """Crates.io backend tests"""
@@ -172,6 +209,25 @@ class TestCratesBackend(unittest.TestCase):
 
         self.assertEqual(crates.origin, 'https://crates.io/')
         self.assertEqual(crates.tag, 'test')
+        self.assertEqual(crates.workers, 1)
+        self.assertFalse(crates.incremental)
+        self.assertIsNone(crates.index_path)
+        self.assertEqual(crates.refresh_interval, DEFAULT_REFRESH_INTERVAL)
+        self.assertIsNone(crates.checkpoint_path)
+        self.assertEqual(crates.checkpoint_interval, DEFAULT_CHECKPOINT_INTERVAL)
+        self.assertIsInstance(crates.client, CratesClient)
+
+        crates = Crates(incremental=True)
+        self.assertTrue(crates.incremental)
+        self.assertIsNone(crates.client.rate_limiter)
+
+        crates = Crates(rate_limit=1)
+        self.assertIsInstance(crates.rate_limiter, RateLimiter)
+        self.assertIs(crates.client.rate_limiter, crates.rate_limiter)
+
+        crates = Crates(json_codec='json')
+        self.assertEqual(crates.codec.name, 'json')
+        self.assertIs(crates.client.codec, crates.codec)
 
         # When tag is empty or None it will be set to
         # the value in origin
@@ -183,15 +239,26 @@ class TestCratesBackend(unittest.TestCase):
         self.assertEqual(crates.origin, 'https://crates.io/')
         self.assertEqual(crates.tag, 'https://crates.io/')
 
+    def test_pool_size(self):
+        """Test if the connections pool fits the number of workers"""
+
+        crates = Crates()
+        adapter = crates.client.session.get_adapter(CRATES_API_URL)
+        self.assertEqual(adapter._pool_maxsize, DEFAULT_POOL_SIZE)
+
+        crates = Crates(workers=8)
+        adapter = crates.client.session.get_adapter(CRATES_API_URL)
+        self.assertEqual(adapter._pool_maxsize, 32)
+
     def test_has_caching(self):
         """Test if it returns True when has_caching is called"""
 
-        self.assertEqual(Crates.has_caching(), False)
+        self.assertEqual(Crates.has_caching(), True)
 
     def test_has_resuming(self):
         """Test if it returns True when has_resuming is called"""
 
-        self.assertEqual(Crates.has_resuming(), False)
+        self.assertEqual(Crates.has_resuming(), True)
 
     @httpretty.activate
     def test_fetch_crates(self):
@@ -228,6 +295,88 @@ class TestCratesBackend(unittest.TestCase):
         self.assertEqual(len(item['data']['owner_user_data']['users']), 3)
         self.assertEqual(len(item['data']['version_downloads_data']), 0)
 
+    @httpretty.activate
+    def test_fetch_crates_workers(self):
+        """Test whether crates are returned in order when using several workers"""
+
+        setup_http_server()
+
+        backend = Crates()
+        expected = [item['data'] for item in backend.fetch()]
+
+        backend = Crates(workers=3)
+        items = [item['data'] for item in backend.fetch()]
+
+        self.assertEqual(len(items), 4)
+        self.assertListEqual([item['id'] for item in items],
+                             ['a', 'aabb2', 'aac', 'abc'])
+
+        for i in range(len(expected)):
+            self.assertDictEqual(items[i], expected[i])
+
+    @httpretty.activate
+    def test_fetch_crates_incremental(self):
+        """Test whether only the crates updated since a date are listed"""
+
+        recent_pages = setup_http_server()
+
+        backend = Crates(incremental=True)
+
+        # Only the first page is requested
+        from_date = datetime.datetime(2017, 9, 1)
+        items = [item['data'] for item in backend.fetch(from_date=from_date)]
+
+        self.assertListEqual([item['id'] for item in items], ['aac'])
+        self.assertListEqual(recent_pages, ['1'])
+
+        # The listing stops in the second page
+        from_date = datetime.datetime(2016, 1, 1)
+        items = [item['data'] for item in backend.fetch(from_date=from_date)]
+
+        self.assertListEqual([item['id'] for item in items], ['aac', 'aabb2', 'abc'])
+        self.assertListEqual(recent_pages, ['1', '1', '2'])
+
+        # The same crates are returned in alphabetical order
+        backend = Crates()
+        expected = {item['data']['id']: item['data'] for item in backend.fetch(from_date=from_date)}
+
+        for item in items:
+            self.assertDictEqual(item, expected[item['id']])
+
+    @httpretty.activate
+    def test_fetch_crates_incremental_workers(self):
+        """Test whether crates are returned in order using workers in incremental mode"""
+
+        setup_http_server()
+
+        backend = Crates(workers=3, incremental=True)
+        items = [item['data'] for item in backend.fetch()]
+
+        self.assertListEqual([item['id'] for item in items],
+                             ['aac', 'aabb2', 'abc', 'a'])
+
+    @httpretty.activate
+    def test_fetch_crates_incremental_duplicated(self):
+        """Test whether crates listed twice are returned once"""
+
+        recent_pages = []
+
+        # Page 2 was shifted by the update of a crate
+        # after reading the first page
+        page_1 = json.loads(read_file('data/crates/crates_page_recent_1'))
+        page_2 = json.loads(read_file('data/crates/crates_page_recent_2'))
+        page_2['crates'].insert(0, page_1['crates'][1])
+
+        register_recent_page('1', json.dumps(page_1), recent_pages)
+        register_recent_page('2', json.dumps(page_2), recent_pages)
+        setup_http_server()
+
+        backend = Crates(incremental=True)
+        from_date = datetime.datetime(2016, 1, 1)
+        items = [item['data'] for item in backend.fetch(from_date=from_date)]
+
+        self.assertListEqual([item['id'] for item in items], ['aac', 'aabb2', 'abc'])
+
     @httpretty.activate
     def test_fetch_summary(self):
         """Test whether a summary is returned"""
@@ -291,6 +440,451 @@ class TestCratesBackend(unittest.TestCase):
         self.assertEqual(len(items), 0)
 
 
+class TestCratesBackendIndex(unittest.TestCase):
+    """Crates.io backend tests using an index of crates"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        self.index_path = os.path.join(self.tmp_path, 'crates.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    @httpretty.activate
+    def test_fetch_unchanged(self):
+        """Test whether unchanged crates are not requested again"""
+
+        setup_http_server()
+
+        backend = Crates(index_path=self.index_path)
+        items = [item['data'] for item in backend.fetch()]
+        self.assertListEqual([item['id'] for item in items],
+                             ['a', 'aabb2', 'aac', 'abc'])
+
+        # Only the listing is requested
+        items = [item for item in backend.fetch()]
+        self.assertListEqual(items, [])
+        self.assertEqual(httpretty.last_request().path, '/api/v1/crates?sort=alphabetical&page=2')
+
+        with CratesIndex(self.index_path) as index:
+            entry = index.get('aac')
+        self.assertEqual(entry.updated_at, '2017-09-19T03:31:00.306621')
+
+    @httpretty.activate
+    def test_fetch_updated(self):
+        """Test whether crates updated in the listing are fetched"""
+
+        setup_http_server()
+
+        backend = Crates(index_path=self.index_path)
+        expected = [item['data'] for item in backend.fetch()]
+
+        page_2 = json.loads(read_file('data/crates/crates_page_2'))
+        page_2['crates'][1]['updated_at'] = '2017-10-01T10:00:00.000000'
+        httpretty.register_uri(httpretty.GET,
+                               CRATES_API_URL + 'crates?sort=alphabetical&page=2',
+                               match_querystring=True,
+                               body=json.dumps(page_2),
+                               status=200)
+
+        items = [item['data'] for item in backend.fetch()]
+        self.assertEqual(len(items), 1)
+        self.assertDictEqual(items[0], expected[3])
+
+        with CratesIndex(self.index_path) as index:
+            entry = index.get('abc')
+        self.assertEqual(entry.updated_at, '2017-10-01T10:00:00.000000')
+
+    @httpretty.activate
+    def test_fetch_refresh(self):
+        """Test whether sub-resources are checked once the refresh interval passed"""
+
+        setup_http_server()
+
+        backend = Crates(index_path=self.index_path, refresh_interval=0)
+        _ = [item for item in backend.fetch()]
+
+        # Sub-resources are requested but they did not change
+        items = [item for item in backend.fetch()]
+        self.assertListEqual(items, [])
+        self.assertEqual(httpretty.last_request().path, '/api/v1/crates/abc/downloads')
+
+        owner_user = json.loads(read_file('data/crates/crate_owner_user_3'))
+        owner_user['users'] = []
+        httpretty.register_uri(httpretty.GET,
+                               CRATES_API_URL + 'crates/aac/owner_user',
+                               body=json.dumps(owner_user),
+                               status=200)
+
+        items = [item['data'] for item in backend.fetch()]
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0]['id'], 'aac')
+        self.assertListEqual(items[0]['owner_user_data']['users'], [])
+
+    @httpretty.activate
+    def test_fetch_workers(self):
+        """Test whether the index works with several workers"""
+
+        setup_http_server()
+
+        backend = Crates()
+        expected = [item['data'] for item in backend.fetch()]
+
+        backend = Crates(workers=3, index_path=self.index_path)
+        items = [item['data'] for item in backend.fetch()]
+        self.assertEqual(len(items), 4)
+
+        for i in range(len(expected)):
+            self.assertDictEqual(items[i], expected[i])
+
+        items = [item for item in backend.fetch()]
+        self.assertListEqual(items, [])
+
+
+class TestCratesBackendCache(unittest.TestCase):
+    """Crates.io backend tests using a cache"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    @httpretty.activate
+    def test_fetch_from_cache(self):
+        """Test whether the crates are fetched from the cache"""
+
+        setup_http_server()
+
+        cache = Cache(self.tmp_path)
+        backend = Crates(cache=cache)
+        items = [item for item in backend.fetch()]
+
+        requests_done = len(httpretty.httpretty.latest_requests)
+
+        cached_items = [item for item in backend.fetch_from_cache()]
+
+        # No new requests to the server
+        self.assertEqual(len(httpretty.httpretty.latest_requests), requests_done)
+
+        self.assertEqual(len(cached_items), 4)
+        for item, cached_item in zip(items, cached_items):
+            self.assertEqual(cached_item['uuid'], item['uuid'])
+            self.assertEqual(cached_item['category'], CRATES_CATEGORY)
+            self.assertDictEqual(cached_item['data'], item['data'])
+
+    @httpretty.activate
+    def test_fetch_from_cache_workers(self):
+        """Test whether the crates are cached in order when using workers"""
+
+        setup_http_server()
+
+        cache = Cache(self.tmp_path)
+        backend = Crates(cache=cache, workers=4)
+        items = [item['data'] for item in backend.fetch()]
+
+        cached_items = [item['data'] for item in backend.fetch_from_cache()]
+        self.assertListEqual(cached_items, items)
+
+    @httpretty.activate
+    def test_fetch_summary_from_cache(self):
+        """Test whether the summary is fetched from the cache"""
+
+        setup_http_server()
+
+        cache = Cache(self.tmp_path)
+        backend = Crates(cache=cache)
+        summary = [item for item in backend.fetch(category=SUMMARY_CATEGORY)]
+        crates = [item for item in backend.fetch()]
+
+        cached_items = [item for item in backend.fetch_from_cache()]
+
+        self.assertEqual(len(cached_items), 5)
+        self.assertEqual(cached_items[0]['category'], SUMMARY_CATEGORY)
+        self.assertEqual(cached_items[0]['uuid'], summary[0]['uuid'])
+        self.assertEqual(cached_items[0]['updated_on'], summary[0]['updated_on'])
+        self.assertDictEqual(cached_items[0]['data'], summary[0]['data'])
+        self.assertListEqual([item['uuid'] for item in cached_items[1:]],
+                             [item['uuid'] for item in crates])
+
+    @httpretty.activate
+    def test_fetch_from_cache_index(self):
+        """Test whether only the crates fetched are stored in the cache"""
+
+        setup_http_server()
+
+        index_path = os.path.join(self.tmp_path, 'crates.db')
+        cache = Cache(os.path.join(self.tmp_path, 'cache'))
+        backend = Crates(cache=cache, index_path=index_path)
+        _ = [item for item in backend.fetch()]
+        _ = [item for item in backend.fetch()]
+
+        cached_items = [item['data']['id'] for item in backend.fetch_from_cache()]
+        self.assertListEqual(cached_items, ['a', 'aabb2', 'aac', 'abc'])
+
+    def test_fetch_from_empty_cache(self):
+        """Test if there are not any crates returned when the cache is empty"""
+
+        cache = Cache(self.tmp_path)
+        backend = Crates(cache=cache)
+        cached_items = [item for item in backend.fetch_from_cache()]
+        self.assertEqual(len(cached_items), 0)
+
+    def test_fetch_from_non_set_cache(self):
+        """Test if a error is raised when the cache was not set"""
+
+        backend = Crates()
+
+        with self.assertRaises(CacheError):
+            _ = [item for item in backend.fetch_from_cache()]
+
+
+class TestCratesBackendCheckpoint(unittest.TestCase):
+    """Crates.io backend tests resuming the fetch of crates"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        self.checkpoint_path = os.path.join(self.tmp_path, 'checkpoint.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    @httpretty.activate
+    def test_fetch_resume_token(self):
+        """Test whether the fetch starts after the crate of the token"""
+
+        setup_http_server()
+
+        backend = Crates()
+
+        items = [item['data']['id'] for item in backend.fetch(resume_token='1:aabb2')]
+        self.assertListEqual(items, ['aac', 'abc'])
+
+        items = [item['data']['id'] for item in backend.fetch(resume_token='2:aac')]
+        self.assertListEqual(items, ['abc'])
+
+        # The whole page is fetched when the crate is not found
+        items = [item['data']['id'] for item in backend.fetch(resume_token='2:zzz')]
+        self.assertListEqual(items, ['aac', 'abc'])
+
+        items = [item['data']['id'] for item in backend.fetch(resume_token='2:')]
+        self.assertListEqual(items, ['aac', 'abc'])
+
+    def test_fetch_invalid_token(self):
+        """Test whether an exception is raised when the token is not valid"""
+
+        backend = Crates()
+
+        for token in ('aac', '0:aac', 'page:aac'):
+            with self.assertRaises(ValueError):
+                _ = [item for item in backend.fetch(resume_token=token)]
+
+    @httpretty.activate
+    def test_fetch_interrupted(self):
+        """Test whether an interrupted fetch is resumed from the checkpoint"""
+
+        setup_http_server()
+
+        backend = Crates(checkpoint_path=self.checkpoint_path, checkpoint_interval=3600)
+        items = backend.fetch()
+
+        self.assertEqual(next(items)['data']['id'], 'a')
+        self.assertEqual(next(items)['data']['id'], 'aabb2')
+        self.assertEqual(next(items)['data']['id'], 'aac')
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+        items.close()
+
+        # The last crate returned might not have been written
+        with open(self.checkpoint_path, 'r') as f:
+            state = json.load(f)
+
+        self.assertEqual(state['page'], 1)
+        self.assertEqual(state['crate'], 'aabb2')
+        self.assertEqual(state['token'], '1:aabb2')
+
+        # A new execution resumes the fetch and removes the checkpoint
+        backend = Crates(checkpoint_path=self.checkpoint_path)
+        items = [item['data']['id'] for item in backend.fetch()]
+        self.assertListEqual(items, ['aac', 'abc'])
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+        items = [item['data']['id'] for item in backend.fetch()]
+        self.assertListEqual(items, ['a', 'aabb2', 'aac', 'abc'])
+
+    @httpretty.activate
+    def test_fetch_interval(self):
+        """Test whether the checkpoint is stored while crates are fetched"""
+
+        setup_http_server()
+
+        backend = Crates(checkpoint_path=self.checkpoint_path, checkpoint_interval=0)
+        tokens = []
+
+        for _ in backend.fetch():
+            if os.path.exists(self.checkpoint_path):
+                with open(self.checkpoint_path, 'r') as f:
+                    tokens.append(json.load(f)['token'])
+
+        # Crates are done once the next one is requested
+        self.assertListEqual(tokens, ['1:a', '1:aabb2', '2:aac'])
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    @httpretty.activate
+    def test_fetch_index(self):
+        """Test whether crates up to date in the index are checkpointed"""
+
+        setup_http_server()
+
+        index_path = os.path.join(self.tmp_path, 'crates.db')
+        backend = Crates(index_path=index_path)
+        _ = [item for item in backend.fetch()]
+
+        backend = Crates(index_path=index_path, checkpoint_path=self.checkpoint_path,
+                         checkpoint_interval=0)
+        items = backend.fetch(resume_token='1:a')
+        self.assertListEqual([item for item in items], [])
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    @httpretty.activate
+    def test_fetch_other_order(self):
+        """Test whether checkpoints of listings in other order are ignored"""
+
+        setup_http_server()
+
+        checkpoint = CratesCheckpoint(self.checkpoint_path)
+        checkpoint.page, checkpoint.crate = 2, 'aac'
+        checkpoint.save()
+
+        backend = Crates(incremental=True, checkpoint_path=self.checkpoint_path)
+
+        with self.assertLogs('perceval.backends.mozilla.crates', level='WARNING'):
+            items = [item['data']['id'] for item in backend.fetch()]
+
+        self.assertEqual(len(items), 4)
+
+
+class TestCratesCheckpoint(unittest.TestCase):
+    """CratesCheckpoint tests"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        self.path = os.path.join(self.tmp_path, 'checkpoint.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def test_token(self):
+        """Test whether tokens are built and parsed"""
+
+        self.assertEqual(CratesCheckpoint.parse_token(None), (1, None))
+        self.assertEqual(CratesCheckpoint.parse_token('900:serde'), (900, 'serde'))
+        self.assertEqual(CratesCheckpoint.parse_token('900:'), (900, None))
+
+        checkpoint = CratesCheckpoint()
+        self.assertIsNone(checkpoint.token)
+
+        listed = [(1, {'id': 'a'}), (2, {'id': 'serde'})]
+        self.assertListEqual([crate['id'] for crate in checkpoint.track(listed)], ['a', 'serde'])
+
+        checkpoint.done()
+        self.assertEqual(checkpoint.token, '1:a')
+        checkpoint.done()
+        self.assertEqual(checkpoint.token, '2:serde')
+        self.assertEqual(CratesCheckpoint.parse_token(checkpoint.token), (2, 'serde'))
+
+    def test_load(self):
+        """Test whether tokens are read from the file of the same listing order"""
+
+        checkpoint = CratesCheckpoint(self.path)
+        self.assertIsNone(checkpoint.load())
+
+        # Nothing is stored until a crate is done
+        checkpoint.save()
+        self.assertFalse(os.path.exists(self.path))
+
+        checkpoint.page, checkpoint.crate = 900, 'serde'
+        checkpoint.save()
+
+        self.assertEqual(CratesCheckpoint(self.path).load(), '900:serde')
+
+        with self.assertLogs('perceval.backends.mozilla.crates', level='WARNING'):
+            self.assertIsNone(CratesCheckpoint(self.path, sort=SORT_RECENT_UPDATES).load())
+
+        checkpoint.clear()
+        self.assertFalse(os.path.exists(self.path))
+        self.assertIsNone(checkpoint.load())
+
+
+class TestCratesIndex(unittest.TestCase):
+    """CratesIndex tests"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        self.index_path = os.path.join(self.tmp_path, 'crates.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def test_update(self):
+        """Test whether the entries are stored and updated"""
+
+        digest = CratesIndex.digest(['{}', '[]'])
+
+        with CratesIndex(self.index_path) as index:
+            self.assertIsNone(index.get('a'))
+
+            index.update('a', '2017-09-19T03:31:00.306621', digest, 100.0)
+            entry = index.get('a')
+            self.assertEqual(entry.updated_at, '2017-09-19T03:31:00.306621')
+            self.assertEqual(entry.digest, digest)
+            self.assertEqual(entry.refreshed_on, 100.0)
+
+            index.update('a', '2017-10-01T10:00:00.000000', digest, 200.0)
+            entry = index.get('a')
+            self.assertEqual(entry.updated_at, '2017-10-01T10:00:00.000000')
+            self.assertEqual(entry.refreshed_on, 200.0)
+
+        # Entries are kept in the file
+        with CratesIndex(self.index_path) as index:
+            entry = index.get('a')
+            self.assertEqual(entry.updated_at, '2017-10-01T10:00:00.000000')
+            self.assertIsNone(index.get('b'))
+
+    def test_commit(self):
+        """Test whether entries are committed in batches"""
+
+        digest = CratesIndex.digest([])
+
+        index = CratesIndex(self.index_path)
+        index.COMMIT_SIZE = 3
+
+        index.update('a', '2017-09-19T03:31:00.306621', digest, 100.0)
+        index.update('b', '2017-09-19T03:31:00.306621', digest, 100.0)
+        self.assertEqual(index.pending, 2)
+
+        index.update('c', '2017-09-19T03:31:00.306621', digest, 100.0)
+        self.assertEqual(index.pending, 0)
+
+        # The last changes are committed on close
+        index.update('d', '2017-09-19T03:31:00.306621', digest, 100.0)
+        index.close()
+
+        with CratesIndex(self.index_path) as index:
+            for crate_id in ('a', 'b', 'c', 'd'):
+                self.assertIsNotNone(index.get(crate_id))
+
+    def test_digest(self):
+        """Test whether the digest depends on every resource"""
+
+        digest = CratesIndex.digest(['{"teams": []}', '{"users": []}'])
+
+        self.assertEqual(len(digest), 20)
+        self.assertEqual(CratesIndex.digest(['{"teams": []}', '{"users": []}']), digest)
+        self.assertNotEqual(CratesIndex.digest(['{"users": []}', '{"teams": []}']), digest)
+        self.assertNotEqual(CratesIndex.digest(['{"teams": []}{"users": []}', '']), digest)
+
+
 class TestCratesClient(unittest.TestCase):
     """Crates API client tests"""
 
@@ -316,6 +910,10 @@ class TestCratesClient(unittest.TestCase):
         crates = [crates for crates in client.crates()]
         self.assertEqual(len(crates), 2)
 
+        raw_crates, crates_page = crates[0]
+        self.assertEqual(raw_crates, read_file('data/crates/crates_page_1', mode='rb'))
+        self.assertDictEqual(crates_page, json.loads(raw_crates))
+
         # Check requests
         expected = {
             'sort': ['alphabetical'],
@@ -324,6 +922,24 @@ class TestCratesClient(unittest.TestCase):
 
         self.assertDictEqual(httpretty.last_request().querystring, expected)
 
+    @httpretty.activate
+    def test_crates_recent_updates(self):
+        """Test crates API call sorting by recent updates"""
+
+        setup_http_server()
+
+        client = CratesClient()
+        crates = [crates for crates in client.crates(sort='recent-updates')]
+        self.assertEqual(len(crates), 2)
+
+        # Check requests
+        expected = {
+            'sort': ['recent-updates'],
+            'page': ['2']
+        }
+
+        self.assertDictEqual(httpretty.last_request().querystring, expected)
+
     @httpretty.activate
     def test_crate(self):
         """ Test crate API call """
@@ -335,6 +951,37 @@ class TestCratesClient(unittest.TestCase):
 
         self.assertNotEqual(crate, None)
 
+    def test_retry_policy(self):
+        """Test if the default retry policy is built from the sleep time"""
+
+        client = CratesClient(sleep_time=30)
+        self.assertEqual(client.retry_policy.max_retries, CratesClient.MAX_RETRIES)
+        self.assertEqual(client.retry_policy.max_backoff, 30)
+        self.assertEqual(client.retry_policy.max_elapsed, 30 * CratesClient.MAX_RETRIES)
+
+    @httpretty.activate
+    def test_retry(self):
+        """Test if unavailable responses are retried"""
+
+        body = read_file('data/crates/crates_summary')
+        httpretty.register_uri(httpretty.GET,
+                               CRATES_API_URL + 'summary',
+                               responses=[
+                                   httpretty.Response(body='', status=503,
+                                                      forcing_headers={'Retry-After': '2'}),
+                                   httpretty.Response(body='', status=429),
+                                   httpretty.Response(body=body, status=200)
+                               ])
+
+        sleeps = []
+        policy = RetryPolicy(sleep=sleeps.append, random=lambda: 0.0)
+
+        client = CratesClient(retry_policy=policy)
+        summary = json.loads(client.summary())
+
+        self.assertEqual(summary['num_crates'], 10000)
+        self.assertListEqual(sleeps, [2.0, 1.0])
+
 
 class TestCratesCommand(unittest.TestCase):
     """CratesCommand unit tests"""
@@ -353,13 +1000,35 @@ class TestCratesCommand(unittest.TestCase):
         args = ['--tag', 'test',
                 '--from-date', '1970-01-01',
                 '--category', 'summary',
-                '--sleep-time', '600']
+                '--sleep-time', '600',
+                '--workers', '4',
+                '--incremental',
+                '--index-path', '/tmp/crates.db',
+                '--refresh-interval', '3600',
+                '--rate-limit', '2.5',
+                '--rate-limit-path', '/tmp/limits',
+                '--json-codec', 'json',
+                '--checkpoint-path', '/tmp/crates.json',
+                '--checkpoint-interval', '30',
+                '--resume-token', '900:serde',
+                '--no-cache']
 
         parsed_args = parser.parse(*args)
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
         self.assertEqual(parsed_args.category, SUMMARY_CATEGORY)
         self.assertEqual(parsed_args.sleep_time, '600')
+        self.assertEqual(parsed_args.workers, 4)
+        self.assertTrue(parsed_args.incremental)
+        self.assertEqual(parsed_args.index_path, '/tmp/crates.db')
+        self.assertEqual(parsed_args.refresh_interval, 3600)
+        self.assertEqual(parsed_args.rate_limit, 2.5)
+        self.assertEqual(parsed_args.rate_limit_path, '/tmp/limits')
+        self.assertEqual(parsed_args.json_codec, 'json')
+        self.assertEqual(parsed_args.checkpoint_path, '/tmp/crates.json')
+        self.assertEqual(parsed_args.checkpoint_interval, 30)
+        self.assertEqual(parsed_args.resume_token, '900:serde')
+        self.assertTrue(parsed_args.no_cache)
 
 
 if __name__ == "__main__":
@@ -27,16 +27,22 @@ import shutil
 import tempfile
 import unittest
 
+from urllib.parse import parse_qs, unquote, urlparse
+
 import httpretty
 import requests
 
 from perceval.backend import BackendCommandArgumentParser
 from perceval.cache import Cache
-from perceval.errors import CacheError
+from perceval.errors import CacheError, ParseError
+from perceval.backends.mozilla.client import create_session
 
 from perceval.backends.mozilla.kitsune import (Kitsune,
                                                KitsuneCommand,
                                                KitsuneClient)
+from perceval.backends.mozilla.ratelimit import RateLimiter
+
+from local_server import LocalHTTPServer, LocalHTTPRequestHandler
 
 
 KITSUNE_SERVER_URL = 'http://example.com'
@@ -75,6 +81,14 @@ class HTTPServer():
             if page == "1":
                 if 'question/' in uri:
                     body = mozilla_questions_1
+                elif 'question__in=' in uri:
+                    questions = uri.split("question__in=")[1].split("&")[0]
+                    questions = unquote(questions).split(',')
+                    body = mozilla_question_answers_1
+                    body_json = json.loads(body)['results']
+                    if str(body_json[0]['question']) not in questions:
+                        # The answers are not for these questions
+                        body = mozilla_question_answers_empty
                 else:
                     question = uri.split("question=")[1].split("&")[0]
                     body = mozilla_question_answers_1
@@ -112,6 +126,97 @@ class HTTPServer():
                                ])
 
 
+class KitsuneHTTPRequestHandler(LocalHTTPRequestHandler):
+    """Serve the same questions and answers of `HTTPServer` routes.
+
+    Each request is answered on its own, so unlike the mocked
+    routes, it can be used by clients sending concurrent requests.
+    """
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        page = params['page'][0]
+        self.server.requests.append(self.path)
+
+        if url.path == '/api/2/question/' and page in ('1', '2'):
+            body = read_file('data/kitsune/kitsune_questions_' + page + '_2.json', mode='rb')
+        elif url.path == '/api/2/answer/' and page == '1':
+            body = read_file('data/kitsune/kitsune_question_answers.json', mode='rb')
+            question = json.loads(body.decode('utf-8'))['results'][0]['question']
+
+            if params['question'][0] != str(question):
+                # The answers are not for this question
+                body = read_file('data/kitsune/kitsune_question_answers_empy.json', mode='rb')
+        else:
+            self.send_body(b'', status=404)
+            return
+
+        self.send_body(body)
+
+
+class PagesHTTPRequestHandler(LocalHTTPRequestHandler):
+    """Serve complete pages of questions.
+
+    Questions with an even id have a page with an answer. The page
+    `fail_page` of the server returns a server error. When the server
+    ignores the filter of questions, a page with the answers of all
+    the questions is returned. Questions report `num_answers` answers
+    when it is set.
+    """
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        page = int(params['page'][0])
+        nquestions = self.server.nquestions
+        self.server.requests.append(self.path)
+        status = 200
+
+        if url.path == '/api/2/question/':
+            first = (page - 1) * KITSUNE_ITEMS_PER_PAGE
+            ids = range(first, min(first + KITSUNE_ITEMS_PER_PAGE, nquestions))
+
+            if page == self.server.fail_page:
+                status, body = 500, {}
+            elif not ids:
+                status, body = 404, {}
+            else:
+                body = {
+                    'count': nquestions,
+                    'next': None if ids[-1] == nquestions - 1 else 'page=%i' % (page + 1),
+                    'results': [{'id': i, 'num_answers': self.__num_answers(i), 'updated': '2017-01-01T00:00:00Z'}
+                                for i in ids]
+                }
+        else:
+            if 'question__in' in params and self.server.ignore_filter:
+                questions = range(nquestions)
+            elif 'question__in' in params:
+                questions = [int(question) for question in params['question__in'][0].split(',')]
+            else:
+                questions = [int(params['question'][0])]
+
+            answers = [{'id': question * 10, 'question': question}
+                       for question in questions if question % 2 == 0]
+            body = {'count': len(answers), 'next': None, 'results': answers}
+
+        self.send_body(json.dumps(body).encode('utf-8'), status=status)
+
+    def __num_answers(self, question):
+        if self.server.num_answers is not None:
+            return self.server.num_answers
+        return int(question % 2 == 0)
+
+
+class PagesHTTPServer(LocalHTTPServer):
+    """Local server of pages of questions, reachable from other processes"""
+
+    def __init__(self, nquestions, fail_page=None, ignore_filter=False, num_answers=None):
+        super().__init__(PagesHTTPRequestHandler)
+        self.nquestions = nquestions
+        self.fail_page = fail_page
+        self.ignore_filter = ignore_filter
+        self.num_answers = num_answers
+
+
 class TestKitsuneBackend(unittest.TestCase):
     """Kitsune backend tests"""
 
@@ -124,6 +229,41 @@ class TestKitsuneBackend(unittest.TestCase):
         self.assertEqual(kitsune.origin, KITSUNE_SERVER_URL)
         self.assertEqual(kitsune.tag, 'test')
         self.assertIsInstance(kitsune.client, KitsuneClient)
+        self.assertEqual(kitsune.client.prefetch, 0)
+        self.assertIsNone(kitsune.rate_limiter)
+        self.assertIsNone(kitsune.client.rate_limiter)
+
+        kitsune = Kitsune(KITSUNE_SERVER_URL, prefetch=4)
+        self.assertEqual(kitsune.client.prefetch, 4)
+        self.assertEqual(kitsune.workers, 1)
+
+        self.assertEqual(kitsune.batch_answers, False)
+
+        kitsune = Kitsune(KITSUNE_SERVER_URL, workers=8, batch_answers=True)
+        self.assertEqual(kitsune.workers, 8)
+        self.assertEqual(kitsune.batch_answers, True)
+
+        kitsune = Kitsune(KITSUNE_SERVER_URL, rate_limit=5)
+        self.assertIsInstance(kitsune.rate_limiter, RateLimiter)
+        self.assertEqual(kitsune.rate_limiter.rate, 5)
+        self.assertIs(kitsune.client.rate_limiter, kitsune.rate_limiter)
+
+        kitsune = Kitsune(KITSUNE_SERVER_URL, json_codec='json')
+        self.assertEqual(kitsune.codec.name, 'json')
+        self.assertIs(kitsune.client.codec, kitsune.codec)
+
+        self.assertEqual(kitsune.shards, 1)
+        self.assertEqual(kitsune.shard_pages, 10)
+
+        kitsune = Kitsune(KITSUNE_SERVER_URL, shards=4, shard_pages=2)
+        self.assertEqual(kitsune.shards, 4)
+        self.assertEqual(kitsune.shard_pages, 2)
+
+        with self.assertRaises(ValueError):
+            Kitsune(KITSUNE_SERVER_URL, shards=0)
+
+        with self.assertRaises(ValueError):
+            Kitsune(KITSUNE_SERVER_URL, shards=2, shard_pages=0)
 
         # When tag is empty or None it will be set to
         # the value in url
@@ -184,6 +324,130 @@ class TestKitsuneBackend(unittest.TestCase):
 
         self.__check_questions_contents(questions)
 
+    @httpretty.activate
+    def test_fetch_prefetch(self):
+        """Test whether the questions are returned when pages are read in advance"""
+
+        HTTPServer.routes()
+
+        kitsune = Kitsune(KITSUNE_SERVER_URL)
+        expected = [question['data'] for question in kitsune.fetch()]
+
+        kitsune = Kitsune(KITSUNE_SERVER_URL, prefetch=2)
+        questions = [question for question in kitsune.fetch()]
+
+        self.assertEqual(len(questions), 4)
+        self.__check_questions_contents(questions)
+
+        for i in range(len(expected)):
+            self.assertDictEqual(questions[i]['data'], expected[i])
+
+        # Offsets work in the same way
+        questions = [question for question in kitsune.fetch(offset=2)]
+        self.assertEqual(len(questions), 2)
+        self.assertEqual(questions[0]['offset'], 2)
+        self.assertEqual(questions[1]['offset'], 3)
+
+    def test_fetch_workers(self):
+        """Test whether the answers are fetched concurrently"""
+
+        with LocalHTTPServer(KitsuneHTTPRequestHandler) as server:
+            kitsune = Kitsune(server.url)
+            expected = [question['data'] for question in kitsune.fetch()]
+
+            kitsune = Kitsune(server.url, workers=4)
+            questions = [question for question in kitsune.fetch()]
+            questions_offset = [question for question in kitsune.fetch(offset=3)]
+
+            kitsune = Kitsune(server.url, workers=4, prefetch=2)
+            questions_prefetch = [question for question in kitsune.fetch()]
+
+        self.assertEqual(len(questions), 4)
+        self.assertEqual(questions[0]['data']['num_votes'], 2)
+        self.assertEqual(questions[1]['data']['locale'], 'es')
+
+        for i in range(len(expected)):
+            self.assertEqual(questions[i]['offset'], i)
+            self.assertDictEqual(questions[i]['data'], expected[i])
+            self.assertDictEqual(questions_prefetch[i]['data'], expected[i])
+
+        # The last question of the data set has answers
+        self.assertEqual(len(questions[2]['data']['answers_data']), 5)
+
+        self.assertEqual(len(questions_offset), 1)
+        self.assertEqual(questions_offset[0]['offset'], 3)
+
+    @httpretty.activate
+    def test_fetch_batch_answers(self):
+        """Test whether the answers are requested in bulk"""
+
+        HTTPServer.routes()
+
+        kitsune = Kitsune(KITSUNE_SERVER_URL)
+        expected = [question['data'] for question in kitsune.fetch()]
+
+        HTTPServer.requests_http = []
+
+        kitsune = Kitsune(KITSUNE_SERVER_URL, batch_answers=True)
+        questions = [question for question in kitsune.fetch()]
+
+        self.assertEqual(len(questions), 4)
+        self.__check_questions_contents(questions)
+
+        for i in range(len(expected)):
+            self.assertDictEqual(questions[i]['data'], expected[i])
+
+        # A request for the questions and another for the
+        # answers of each page
+        self.assertEqual(len(HTTPServer.requests_http), 4)
+
+        req = HTTPServer.requests_http[1]
+        expected = {
+            'question__in': ['1129969,1129968'],
+            'page': ['1'],
+            'ordering': ['updated']
+        }
+        self.assertDictEqual(req.querystring, expected)
+
+    def test_fetch_batch_answers_filter_ignored(self):
+        """Test whether answers are requested by question when the server ignores the filter"""
+
+        with PagesHTTPServer(50) as server:
+            kitsune = Kitsune(server.url)
+            expected = [question['data'] for question in kitsune.fetch()]
+
+        with PagesHTTPServer(50, ignore_filter=True) as server:
+            kitsune = Kitsune(server.url, batch_answers=True)
+            questions = [question['data'] for question in kitsune.fetch()]
+
+        self.assertListEqual(questions, expected)
+        self.assertFalse(kitsune.batch_answers)
+
+        # Answers are requested in bulk only once
+        answers = [path for path in server.requests if path.startswith('/api/2/answer/')]
+        self.assertEqual(len([path for path in answers if 'question__in' in path]), 1)
+        self.assertEqual(len(answers), 51)
+
+    def test_fetch_batch_answers_count_exceeded(self):
+        """Test whether answers are requested by question when there are more than expected"""
+
+        # Questions report fewer answers than the ones they have
+        with PagesHTTPServer(50, num_answers=0) as server:
+            kitsune = Kitsune(server.url)
+            expected = [question['data'] for question in kitsune.fetch()]
+
+            server.requests = []
+            kitsune = Kitsune(server.url, batch_answers=True)
+            questions = [question['data'] for question in kitsune.fetch()]
+
+        self.assertListEqual(questions, expected)
+        self.assertTrue(kitsune.batch_answers)
+
+        # Answers of each page are requested in bulk and then by question
+        answers = [path for path in server.requests if path.startswith('/api/2/answer/')]
+        self.assertEqual(len([path for path in answers if 'question__in' in path]), 3)
+        self.assertEqual(len(answers), 53)
+
     @httpretty.activate
     def test_fetch_offset(self):
         """Test whether the questions are returned offset"""
@@ -239,6 +503,105 @@ class TestKitsuneBackend(unittest.TestCase):
         # After the failing page there are a page with 2 questions
         self.assertEqual(len(questions), 2)
 
+        # The failing page is skipped when pages are read in advance
+        kitsune = Kitsune(KITSUNE_SERVER_URL, prefetch=2)
+        questions = [event for event in kitsune.fetch(offset=offset)]
+        self.assertEqual(len(questions), 2)
+
+    def test_fetch_shards(self):
+        """Test whether pages fetched by several processes are returned in order"""
+
+        with PagesHTTPServer(95) as server:
+            kitsune = Kitsune(server.url)
+            expected = [question for question in kitsune.fetch()]
+
+            kitsune = Kitsune(server.url, shards=3, shard_pages=1)
+            questions = [question for question in kitsune.fetch()]
+
+            # Ranges start at the page of the offset
+            kitsune = Kitsune(server.url, shards=2, shard_pages=2, batch_answers=True)
+            questions_offset = [question for question in kitsune.fetch(offset=27)]
+
+        self.assertEqual(len(questions), 95)
+
+        for i in range(len(questions)):
+            self.assertEqual(questions[i]['offset'], i)
+            self.assertDictEqual(questions[i]['data'], expected[i]['data'])
+
+        self.assertEqual(len(questions[2]['data']['answers_data']), 1)
+        self.assertEqual(len(questions[3]['data']['answers_data']), 0)
+
+        self.assertListEqual([question['offset'] for question in questions_offset],
+                             list(range(27, 95)))
+        self.assertListEqual([question['data'] for question in questions_offset],
+                             [question['data'] for question in expected[27:]])
+
+    def test_fetch_shards_server_error(self):
+        """Test whether failing pages are skipped when fetching with several processes"""
+
+        with PagesHTTPServer(70, fail_page=2) as server:
+            kitsune = Kitsune(server.url)
+            expected = [question for question in kitsune.fetch()]
+
+            kitsune = Kitsune(server.url, shards=2, shard_pages=1)
+            questions = [question for question in kitsune.fetch()]
+
+        self.assertEqual(len(questions), 50)
+        self.assertListEqual([question['offset'] for question in questions],
+                             [question['offset'] for question in expected])
+        self.assertEqual(questions[20]['offset'], 40)
+
+    def test_fetch_shards_first_page_error(self):
+        """Test whether a failing first page is skipped when fetching with several processes"""
+
+        with PagesHTTPServer(70, fail_page=1) as server:
+            kitsune = Kitsune(server.url)
+            expected = [question for question in kitsune.fetch()]
+
+            server.requests = []
+            kitsune = Kitsune(server.url, shards=2, shard_pages=1)
+            questions = [question for question in kitsune.fetch()]
+
+        self.assertEqual(len(questions), 50)
+        self.assertListEqual([question['offset'] for question in questions],
+                             [question['offset'] for question in expected])
+        self.assertEqual(questions[0]['offset'], 20)
+
+        # Each page of questions is requested once
+        pages = [path for path in server.requests if path.startswith('/api/2/question/')]
+        self.assertEqual(len(pages), 4)
+
+    def test_fetch_shards_unaligned_first_page_error(self):
+        """Test whether offsets are kept when a first page not starting at the offset fails"""
+
+        with PagesHTTPServer(70, fail_page=2) as server:
+            kitsune = Kitsune(server.url)
+            expected = [(question['offset'], question['data']['id'])
+                        for question in kitsune.fetch(offset=25)]
+
+            kitsune = Kitsune(server.url, shards=2, shard_pages=1)
+            questions = [(question['offset'], question['data']['id'])
+                         for question in kitsune.fetch(offset=25)]
+
+        # Questions before the offset are dropped from the next page
+        self.assertEqual(expected[0], (45, 45))
+        self.assertEqual(len(expected), 25)
+        self.assertListEqual(questions, expected)
+
+    @httpretty.activate
+    def test_fetch_parse_error(self):
+        """Test whether an exception is raised when a page is not valid JSON"""
+
+        httpretty.register_uri(httpretty.GET,
+                               KITSUNE_API_QUESTION,
+                               body='{"count": 1, "results": [',
+                               status=200)
+
+        kitsune = Kitsune(KITSUNE_SERVER_URL)
+
+        with self.assertRaises(ParseError):
+            _ = [event for event in kitsune.fetch()]
+
 
 class TestKitsuneBackendCache(unittest.TestCase):
     """Kitsune backend tests using a cache"""
@@ -275,6 +638,142 @@ class TestKitsuneBackendCache(unittest.TestCase):
         for i in range(0, len(questions)):
             self.assertDictEqual(cached_questions[i]['data'], questions[i]['data'])
 
+    def test_fetch_from_cache_shards(self):
+        """Test whether the cache layout is the same when fetching with several processes"""
+
+        cache = Cache(self.tmp_path)
+
+        with PagesHTTPServer(50, fail_page=2) as server:
+            kitsune = Kitsune(server.url, cache=cache, shards=2, shard_pages=1)
+            questions = [question for question in kitsune.fetch(offset=5)]
+
+        self.assertEqual(len(questions), 25)
+
+        # The offset of the page after the failing one is stored
+        raw_items = [raw_item for raw_item in cache.retrieve()]
+        self.assertListEqual([raw_item for raw_item in raw_items if type(raw_item) is int], [5, 40])
+
+        cached_questions = [question for question in kitsune.fetch_from_cache()]
+        self.assertEqual(len(cached_questions), len(questions))
+
+        for i in range(len(questions)):
+            self.assertDictEqual(cached_questions[i]['data'], questions[i]['data'])
+            self.assertEqual(cached_questions[i]['offset'], questions[i]['offset'])
+
+        # Same layout as a serial fetch when no page fails
+        with PagesHTTPServer(50) as server:
+            cache.clean(erase=True)
+            kitsune = Kitsune(server.url, cache=cache)
+            _ = [question for question in kitsune.fetch(offset=5)]
+            expected = [raw_item for raw_item in cache.retrieve()]
+
+            cache.clean(erase=True)
+            kitsune = Kitsune(server.url, cache=cache, shards=2, shard_pages=1)
+            _ = [question for question in kitsune.fetch(offset=5)]
+
+        self.assertListEqual([raw_item for raw_item in cache.retrieve()], expected)
+
+    def test_fetch_from_cache_server_error(self):
+        """Test whether questions after a failing page are recovered from the cache"""
+
+        cache = Cache(self.tmp_path)
+
+        with PagesHTTPServer(70, fail_page=2) as server:
+            kitsune = Kitsune(server.url, cache=cache)
+            questions = [question for question in kitsune.fetch(offset=25)]
+            expected = [raw_item for raw_item in cache.retrieve()]
+
+            cached_questions = [question for question in kitsune.fetch_from_cache()]
+
+            # The layout of the cache is the same when fetching with several processes
+            cache.clean(erase=True)
+            kitsune = Kitsune(server.url, cache=cache, shards=2, shard_pages=1)
+            _ = [question for question in kitsune.fetch(offset=25)]
+
+        self.assertEqual(len(questions), 25)
+        self.assertListEqual([raw_item for raw_item in expected if type(raw_item) is int], [25, 45])
+        self.assertListEqual([raw_item for raw_item in cache.retrieve()], expected)
+
+        self.assertEqual(len(cached_questions), len(questions))
+
+        for i in range(len(questions)):
+            self.assertDictEqual(cached_questions[i]['data'], questions[i]['data'])
+            self.assertEqual(cached_questions[i]['offset'], questions[i]['offset'])
+
+    def test_fetch_from_cache_workers(self):
+        """Test whether the cache layout is the same when using workers"""
+
+        cache = Cache(self.tmp_path)
+
+        with LocalHTTPServer(KitsuneHTTPRequestHandler) as server:
+            kitsune = Kitsune(server.url, cache=cache)
+            questions = [event for event in kitsune.fetch()]
+            expected = [item for item in cache.retrieve()]
+
+            cache.clean(erase=True)
+            kitsune = Kitsune(server.url, cache=cache, workers=4)
+            questions = [event for event in kitsune.fetch()]
+            cached = [item for item in cache.retrieve()]
+
+        self.assertListEqual(cached, expected)
+
+        cached_questions = [event for event in kitsune.fetch_from_cache()]
+        self.assertEqual(len(cached_questions), len(questions))
+        for i in range(0, len(questions)):
+            self.assertDictEqual(cached_questions[i]['data'], questions[i]['data'])
+
+    @httpretty.activate
+    def test_fetch_from_cache_batch_answers(self):
+        """Test whether the cache works when answers are requested in bulk"""
+
+        HTTPServer.routes()
+
+        cache = Cache(self.tmp_path)
+        kitsune = Kitsune(KITSUNE_SERVER_URL, cache=cache, batch_answers=True)
+        questions = [event for event in kitsune.fetch()]
+
+        cached_questions = [event for event in kitsune.fetch_from_cache()]
+        self.assertEqual(len(cached_questions), len(questions))
+        for i in range(0, len(questions)):
+            self.assertDictEqual(cached_questions[i]['data'], questions[i]['data'])
+
+    def test_fetch_from_cache_executions(self):
+        """Test whether questions of several executions are read from the cache"""
+
+        def page(*ids):
+            questions = [{'id': i, 'updated': '2017-01-01T00:00:00Z'} for i in ids]
+            return json.dumps({'count': 40, 'results': questions}).encode('utf-8')
+
+        def answers(*ids):
+            return json.dumps({'results': [{'id': i} for i in ids]}).encode('utf-8')
+
+        cache = Cache(self.tmp_path)
+        cache.store(0, page(1, 2), answers(10, 11), answers(12), b'{}', b'{}',
+                    page(), 21, page(20, 21, 22), answers(30), b'{}', b'{}')
+
+        kitsune = Kitsune(KITSUNE_SERVER_URL, cache=cache)
+        questions = [item for item in kitsune.fetch_from_cache()]
+
+        self.assertListEqual([question['offset'] for question in questions], [0, 1, 21, 22])
+        self.assertListEqual([question['data']['id'] for question in questions], [1, 2, 21, 22])
+        self.assertListEqual([[answer['id'] for answer in question['data']['answers_data']]
+                              for question in questions],
+                             [[10, 11, 12], [], [30], []])
+
+    def test_fetch_from_text_cache(self):
+        """Test whether caches written as text by previous versions are read"""
+
+        cache = Cache(self.tmp_path)
+        cache.store(0, '{"count": 1, "results": [{"id": 1, "updated": "2017-01-01T00:00:00Z"}]}',
+                    '{"results": [{"id": 10}]}', '{}')
+
+        kitsune = Kitsune(KITSUNE_SERVER_URL, cache=cache)
+        questions = [item['data'] for item in kitsune.fetch_from_cache()]
+
+        self.assertEqual(len(questions), 1)
+        self.assertEqual(questions[0]['id'], 1)
+        self.assertListEqual(questions[0]['answers_data'], [{'id': 10}])
+
     def test_fetch_from_empty_cache(self):
         """Test if there are not any questions returned when the cache is empty"""
 
@@ -309,13 +808,29 @@ class TestKitsuneCommand(unittest.TestCase):
         args = [KITSUNE_SERVER_URL,
                 '--tag', 'test',
                 '--no-cache',
-                '--offset', '88']
+                '--offset', '88',
+                '--prefetch', '3',
+                '--workers', '5',
+                '--batch-answers',
+                '--rate-limit', '2.5',
+                '--rate-limit-path', '/tmp/limits',
+                '--json-codec', 'json',
+                '--shards', '4',
+                '--shard-pages', '25']
 
         parsed_args = parser.parse(*args)
         self.assertEqual(parsed_args.url, KITSUNE_SERVER_URL)
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.no_cache, True)
         self.assertEqual(parsed_args.offset, 88)
+        self.assertEqual(parsed_args.prefetch, 3)
+        self.assertEqual(parsed_args.workers, 5)
+        self.assertEqual(parsed_args.batch_answers, True)
+        self.assertEqual(parsed_args.rate_limit, 2.5)
+        self.assertEqual(parsed_args.rate_limit_path, '/tmp/limits')
+        self.assertEqual(parsed_args.json_codec, 'json')
+        self.assertEqual(parsed_args.shards, 4)
+        self.assertEqual(parsed_args.shard_pages, 25)
 
 
 class TestKitsuneClient(unittest.TestCase):
@@ -330,6 +845,11 @@ class TestKitsuneClient(unittest.TestCase):
     def test_init(self):
         """Test initialization"""
         client = KitsuneClient(KITSUNE_SERVER_URL)
+        self.assertIsInstance(client.session, requests.Session)
+
+        session = create_session()
+        client = KitsuneClient(KITSUNE_SERVER_URL, session=session)
+        self.assertIs(client.session, session)
 
     @httpretty.activate
     def test_get_questions(self):
@@ -338,11 +858,12 @@ class TestKitsuneClient(unittest.TestCase):
         HTTPServer.routes()
 
         # Set up a mock HTTP server
-        body = read_file('data/kitsune/kitsune_questions_1_2.json')
+        body = read_file('data/kitsune/kitsune_questions_1_2.json', mode='rb')
         client = KitsuneClient(KITSUNE_SERVER_URL)
-        response = next(client.get_questions())  # first group of questions
+        response, questions = next(client.get_questions())  # first group of questions
         req = HTTPServer.requests_http[-1]
         self.assertEqual(response, body)
+        self.assertDictEqual(questions, json.loads(body))
         self.assertEqual(req.method, 'GET')
         self.assertRegex(req.path, '/api/2/question/')
         # Check request params
@@ -352,6 +873,30 @@ class TestKitsuneClient(unittest.TestCase):
         }
         self.assertDictEqual(req.querystring, expected)
 
+    def test_get_questions_pages(self):
+        """Test if a range of pages of questions is retrieved"""
+
+        with PagesHTTPServer(70) as server:
+            client = KitsuneClient(server.url)
+            pages = [questions['results'][0]['id'] for _, questions in client.get_questions_pages(2, 3)]
+            self.assertListEqual(pages, [20, 40])
+
+            # Until the last page
+            pages = [questions['results'][0]['id'] for _, questions in client.get_questions_pages(2)]
+            self.assertListEqual(pages, [20, 40, 60])
+
+    @httpretty.activate
+    def test_get_questions_prefetch(self):
+        """Test get_questions API call reading pages in advance"""
+
+        HTTPServer.routes()
+
+        body_1 = read_file('data/kitsune/kitsune_questions_1_2.json', mode='rb')
+        body_2 = read_file('data/kitsune/kitsune_questions_2_2.json', mode='rb')
+        client = KitsuneClient(KITSUNE_SERVER_URL, prefetch=1)
+        pages = [page for page, _ in client.get_questions()]
+        self.assertListEqual(pages, [body_1, body_2])
+
     @httpretty.activate
     def test_get_question_answers(self):
         """Test get_question_answers API call"""
@@ -359,12 +904,13 @@ class TestKitsuneClient(unittest.TestCase):
         HTTPServer.routes()
 
         # Set up a mock HTTP server
-        body = read_file('data/kitsune/kitsune_question_answers.json')
+        body = read_file('data/kitsune/kitsune_question_answers.json', mode='rb')
         client = KitsuneClient(KITSUNE_SERVER_URL)
         question_id = 1129949
-        response = next(client.get_question_answers(question_id))
+        response, answers = next(client.get_question_answers(question_id))
         req = HTTPServer.requests_http[-1]
         self.assertEqual(response, body)
+        self.assertDictEqual(answers, json.loads(body))
         self.assertEqual(req.method, 'GET')
         self.assertRegex(req.path, '/api/2/answer/')
         # Check request params
@@ -375,6 +921,28 @@ class TestKitsuneClient(unittest.TestCase):
         }
         self.assertDictEqual(req.querystring, expected)
 
+    @httpretty.activate
+    def test_get_answers(self):
+        """Test get_answers API call"""
+
+        HTTPServer.routes()
+
+        body = read_file('data/kitsune/kitsune_question_answers.json', mode='rb')
+        client = KitsuneClient(KITSUNE_SERVER_URL)
+        response, answers = next(client.get_answers([1129948, 1129949]))
+        req = HTTPServer.requests_http[-1]
+        self.assertEqual(response, body)
+        self.assertDictEqual(answers, json.loads(body))
+        self.assertEqual(req.method, 'GET')
+        self.assertRegex(req.path, '/api/2/answer/')
+        # Check request params
+        expected = {
+            'question__in': ['1129948,1129949'],
+            'page': ['1'],
+            'ordering': ['updated']
+        }
+        self.assertDictEqual(req.querystring, expected)
+
 
 if __name__ == "__main__":
     unittest.main(warnings='ignore')
@@ -22,16 +22,29 @@
 #     Alvaro del Castillo <acs@bitergia.com>
 #
 
+import collections
+import datetime
+import hashlib
+import inspect
+import json
+import os
 import shutil
 import tempfile
 import unittest
+import unittest.mock
 
 import httpretty
+import requests
 
 from perceval.backend import BackendCommandArgumentParser
 from perceval.cache import Cache
 from perceval.errors import CacheError
-from perceval.backends.mozilla.mozillaclub import MozillaClub, MozillaClubCommand, MozillaClubClient, MozillaClubParser
+from perceval.backends.mozilla.client import create_session
+from perceval.backends.mozilla.mozillaclub import (MozillaClub,
+                                                   MozillaClubCommand,
+                                                   MozillaClubClient,
+                                                   MozillaClubParser,
+                                                   parse_cell_datetime)
 
 
 MozillaClub_FEED_URL = 'http://example.com/feed'
@@ -74,6 +87,44 @@ def configure_http_server():
     return http_requests
 
 
+def read_feed_updated_first(updated):
+    """Read the test feed setting its update date before the cells"""
+
+    feed = json.loads(read_file('data/mozillaclub/feed.json'),
+                      object_pairs_hook=collections.OrderedDict)
+    feed['feed']['updated']['$t'] = updated
+    feed['feed'].move_to_end('updated', last=False)
+
+    return json.dumps(feed)
+
+
+def configure_conditional_http_server(feeds):
+    """Serve the given feeds, one per request, supporting validators"""
+
+    http_requests = []
+
+    def request_callback(method, uri, headers):
+        last_request = httpretty.last_request()
+        http_requests.append(last_request)
+
+        body = feeds[min(len(http_requests), len(feeds)) - 1]
+        etag = '"' + hashlib.sha1(body.encode('utf-8')).hexdigest() + '"'
+
+        if last_request.headers.get('If-None-Match', None) == etag:
+            return (304, headers, '')
+
+        headers['etag'] = etag
+        headers['last-modified'] = 'Tue, 13 Dec 2016 15:44:04 GMT'
+
+        return (200, headers, body)
+
+    httpretty.register_uri(httpretty.GET,
+                           MozillaClub_FEED_URL,
+                           body=request_callback)
+
+    return http_requests
+
+
 class TestMozillaClubBackend(unittest.TestCase):
     """MozillaClub backend tests"""
 
@@ -85,6 +136,8 @@ class TestMozillaClubBackend(unittest.TestCase):
         self.assertEqual(mozillaclub.url, MozillaClub_FEED_URL)
         self.assertEqual(mozillaclub.origin, MozillaClub_FEED_URL)
         self.assertEqual(mozillaclub.tag, 'test')
+        self.assertIsNone(mozillaclub.state_path)
+        self.assertDictEqual(mozillaclub.state, {})
         self.assertIsInstance(mozillaclub.client, MozillaClubClient)
 
         # When tag is empty or None it will be set to
@@ -181,6 +234,109 @@ class TestMozillaClubBackend(unittest.TestCase):
         self.assertEqual(len(events), 0)
 
 
+class TestMozillaClubBackendState(unittest.TestCase):
+    """MozillaClub backend tests of conditional requests"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        self.state_path = os.path.join(self.tmp_path, 'state.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    @httpretty.activate
+    def test_fetch_not_modified(self):
+        """Test whether no events are returned when the feed was not modified"""
+
+        feed = read_file('data/mozillaclub/feed.json')
+        http_requests = configure_conditional_http_server([feed])
+
+        mozillaclub = MozillaClub(MozillaClub_FEED_URL, state_path=self.state_path)
+        events = [event for event in mozillaclub.fetch()]
+        self.assertEqual(len(events), 92)
+
+        with open(self.state_path, 'r') as f:
+            state = json.load(f)
+
+        etag = '"' + hashlib.sha1(feed.encode('utf-8')).hexdigest() + '"'
+        self.assertEqual(state['etag'], etag)
+        self.assertEqual(state['last_modified'], 'Tue, 13 Dec 2016 15:44:04 GMT')
+        self.assertEqual(state['updated'], '2016-12-13T15:44:04.821Z')
+
+        # A new execution reads the state from the file
+        mozillaclub = MozillaClub(MozillaClub_FEED_URL, state_path=self.state_path)
+        events = [event for event in mozillaclub.fetch()]
+        self.assertEqual(len(events), 0)
+        self.assertFalse(mozillaclub.client.modified)
+
+        self.assertEqual(len(http_requests), 2)
+        self.assertNotIn('If-None-Match', http_requests[0].headers)
+        self.assertEqual(http_requests[1].headers['If-None-Match'], etag)
+        self.assertEqual(http_requests[1].headers['If-Modified-Since'],
+                         'Tue, 13 Dec 2016 15:44:04 GMT')
+
+        with open(self.state_path, 'r') as f:
+            self.assertDictEqual(json.load(f), state)
+
+    @httpretty.activate
+    def test_fetch_not_modified_without_state_path(self):
+        """Test whether the validators are kept in memory without a state file"""
+
+        feed = read_file('data/mozillaclub/feed.json')
+        http_requests = configure_conditional_http_server([feed])
+
+        mozillaclub = MozillaClub(MozillaClub_FEED_URL)
+        events = [event for event in mozillaclub.fetch()]
+        self.assertEqual(len(events), 92)
+
+        events = [event for event in mozillaclub.fetch()]
+        self.assertEqual(len(events), 0)
+        self.assertEqual(len(http_requests), 2)
+        self.assertIn('If-None-Match', http_requests[1].headers)
+        self.assertFalse(os.path.exists(self.state_path))
+
+    @httpretty.activate
+    def test_fetch_not_updated(self):
+        """Test whether the feed is not parsed when its update date is the same"""
+
+        feeds = [read_feed_updated_first('2016-12-13T15:44:04.821Z'),
+                 read_feed_updated_first('2016-12-13T15:44:04.821Z') + '\n',
+                 read_feed_updated_first('2017-01-01T10:00:00.000Z')]
+        http_requests = configure_conditional_http_server(feeds)
+
+        cache = Cache(self.tmp_path)
+        mozillaclub = MozillaClub(MozillaClub_FEED_URL, cache=cache,
+                                  state_path=self.state_path)
+        events = [event for event in mozillaclub.fetch()]
+        self.assertEqual(len(events), 92)
+        nchunks = len([chunk for chunk in cache.retrieve()])
+
+        # The feed was downloaded but it was not updated
+        streams = []
+        stream_cells = mozillaclub.client.stream_cells
+
+        def track_stream(*args, **kwargs):
+            stream = stream_cells(*args, **kwargs)
+            streams.append(stream)
+            return stream
+
+        with unittest.mock.patch.object(mozillaclub.client, 'stream_cells', side_effect=track_stream):
+            events = [event for event in mozillaclub.fetch()]
+        self.assertEqual(len(events), 0)
+
+        # The stream of the feed, and its response, are closed
+        self.assertEqual(inspect.getgeneratorstate(streams[0]), inspect.GEN_CLOSED)
+        self.assertTrue(mozillaclub.client.modified)
+        self.assertEqual(mozillaclub.state['updated'], '2016-12-13T15:44:04.821Z')
+        self.assertEqual(len([chunk for chunk in cache.retrieve()]), nchunks)
+
+        events = [event for event in mozillaclub.fetch()]
+        self.assertEqual(len(events), 92)
+        self.assertEqual(mozillaclub.state['updated'], '2017-01-01T10:00:00.000Z')
+
+        self.assertEqual(len(http_requests), 3)
+
+
 class TestMozillaClubBackendCache(unittest.TestCase):
     """MozillaClub backend tests using a cache"""
 
@@ -201,9 +357,14 @@ class TestMozillaClubBackendCache(unittest.TestCase):
         cache = Cache(self.tmp_path)
         mozillaclub = MozillaClub(MozillaClub_FEED_URL, cache=cache)
 
-        events = [event for event in mozillaclub.fetch()]
+        with unittest.mock.patch.object(cache, 'store', wraps=cache.store) as store:
+            events = [event for event in mozillaclub.fetch()]
         self.assertEqual(len(http_requests), 1)
 
+        # Several events are read from each chunk, so the cache
+        # is written fewer times than events are returned
+        self.assertLess(store.call_count, len(events))
+
         # Now, we get the events from the cache.
         # The contents should be the same and there won't be
         # any new request to the server
@@ -213,6 +374,61 @@ class TestMozillaClubBackendCache(unittest.TestCase):
             self.assertDictEqual(cached_events[i]['data'], events[i]['data'])
         self.assertEqual(len(http_requests), 1)  # no more requests done
 
+    @httpretty.activate
+    def test_fetch_from_cache_chunks(self):
+        """Test whether the feed is stored in the cache in chunks"""
+
+        configure_http_server()
+
+        cache = Cache(self.tmp_path)
+        mozillaclub = MozillaClub(MozillaClub_FEED_URL, cache=cache)
+        mozillaclub.client.CHUNK_SIZE = 4096
+
+        with unittest.mock.patch.object(cache, 'store', wraps=cache.store) as store:
+            events = [event for event in mozillaclub.fetch()]
+
+        chunks = [chunk for chunk in cache.retrieve()]
+        self.assertIsNone(chunks.pop(0))
+        self.assertGreater(len(chunks), 1)
+
+        # The cache is written only when new chunks were read, and at the end
+        self.assertLessEqual(store.call_count, len(chunks) + 1)
+        self.assertEqual(b''.join(chunks), read_file('data/mozillaclub/feed.json', mode='rb'))
+
+        cached_events = [event for event in mozillaclub.fetch_from_cache()]
+        self.assertEqual(len(cached_events), 92)
+        for i in range(0, len(events)):
+            self.assertDictEqual(cached_events[i]['data'], events[i]['data'])
+
+    @httpretty.activate
+    def test_fetch_from_cache_several_fetches(self):
+        """Test whether the events of each fetch stored in the cache are returned"""
+
+        configure_http_server()
+
+        cache = Cache(self.tmp_path)
+        mozillaclub = MozillaClub(MozillaClub_FEED_URL, cache=cache)
+        mozillaclub.client.CHUNK_SIZE = 4096
+
+        events = [event for event in mozillaclub.fetch()]
+        events += [event for event in mozillaclub.fetch()]
+        self.assertEqual(len(events), 184)
+
+        cached_events = [event for event in mozillaclub.fetch_from_cache()]
+        self.assertEqual(len(cached_events), len(events))
+        for i in range(0, len(events)):
+            self.assertDictEqual(cached_events[i]['data'], events[i]['data'])
+
+    def test_fetch_from_cache_without_marks(self):
+        """Test whether caches without the marks of the feeds are read"""
+
+        cache = Cache(self.tmp_path)
+        cache.store(read_file('data/mozillaclub/feed.json', mode='rb'))
+
+        mozillaclub = MozillaClub(MozillaClub_FEED_URL, cache=cache)
+        cached_events = [event for event in mozillaclub.fetch_from_cache()]
+        self.assertEqual(len(cached_events), 92)
+
     def test_fetch_from_empty_cache(self):
         """Test if there are not any events returned when the cache is empty"""
 
@@ -246,12 +462,14 @@ class TestMozillaClubCommand(unittest.TestCase):
 
         args = [MozillaClub_FEED_URL,
                 '--tag', 'test',
-                '--no-cache']
+                '--no-cache',
+                '--state-path', '/tmp/mozillaclub.json']
 
         parsed_args = parser.parse(*args)
         self.assertEqual(parsed_args.url, MozillaClub_FEED_URL)
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.no_cache, True)
+        self.assertEqual(parsed_args.state_path, '/tmp/mozillaclub.json')
 
 
 class TestMozillaClubClient(unittest.TestCase):
@@ -266,13 +484,18 @@ class TestMozillaClubClient(unittest.TestCase):
     def test_init(self):
         """Test initialization"""
         client = MozillaClubClient(MozillaClub_FEED_URL)
+        self.assertIsInstance(client.session, requests.Session)
+
+        session = create_session()
+        client = MozillaClubClient(MozillaClub_FEED_URL, session=session)
+        self.assertIs(client.session, session)
 
     @httpretty.activate
     def test_get_events(self):
         """Test get_events API call"""
 
         # Set up a mock HTTP server
-        body = read_file('data/mozillaclub/feed.json')
+        body = read_file('data/mozillaclub/feed.json', mode='rb')
         httpretty.register_uri(httpretty.GET,
                                MozillaClub_FEED_URL,
                                body=body, status=200)
@@ -282,6 +505,50 @@ class TestMozillaClubClient(unittest.TestCase):
 
         self.assertEqual(response, body)
 
+    @httpretty.activate
+    def test_stream_cells(self):
+        """Test if the feed is read in chunks"""
+
+        body = read_file('data/mozillaclub/feed.json', mode='rb')
+        httpretty.register_uri(httpretty.GET,
+                               MozillaClub_FEED_URL,
+                               body=body, status=200)
+
+        client = MozillaClubClient(MozillaClub_FEED_URL)
+        client.CHUNK_SIZE = 1024
+        chunks = [chunk for chunk in client.stream_cells()]
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(isinstance(chunk, bytes) for chunk in chunks))
+        self.assertEqual(b''.join(chunks), body)
+
+    @httpretty.activate
+    def test_stream_cells_not_modified(self):
+        """Test if no chunks are returned when the feed was not modified"""
+
+        feed = read_file('data/mozillaclub/feed.json')
+        http_requests = configure_conditional_http_server([feed])
+
+        client = MozillaClubClient(MozillaClub_FEED_URL)
+        chunks = [chunk for chunk in client.stream_cells()]
+        self.assertEqual(b''.join(chunks).decode('utf-8'), feed)
+        self.assertTrue(client.modified)
+
+        etag = client.etag
+        last_modified = client.last_modified
+        self.assertIsNotNone(etag)
+        self.assertEqual(last_modified, 'Tue, 13 Dec 2016 15:44:04 GMT')
+
+        chunks = [chunk for chunk in client.stream_cells(etag=etag,
+                                                         last_modified=last_modified)]
+        self.assertListEqual(chunks, [])
+        self.assertFalse(client.modified)
+        self.assertEqual(client.etag, etag)
+        self.assertEqual(client.last_modified, last_modified)
+
+        self.assertEqual(http_requests[1].headers['If-None-Match'], etag)
+        self.assertEqual(http_requests[1].headers['If-Modified-Since'], last_modified)
+
 
 class TestMozillaClubParser(unittest.TestCase):
     """MozillaClub parser tests"""
@@ -300,6 +567,114 @@ class TestMozillaClubParser(unittest.TestCase):
         self.assertEqual(events[45]['Links to Photos (Optional)'], None)
         self.assertEqual(events[53]['updated'], '2016-12-13T15:44:04.821Z')
 
+    def test_parser_chunks(self):
+        """Test if it parses a JSON feed given in chunks"""
+
+        feed = read_file('data/mozillaclub/feed.json')
+        expected = [event for event in MozillaClubParser(feed).parse()]
+
+        for size in (13, 1000, 4096):
+            chunks = (feed[i:i + size] for i in range(0, len(feed), size))
+            parser = MozillaClubParser(chunks)
+            events = [event for event in parser.parse()]
+            self.assertListEqual(events, expected)
+
+    def test_parser_no_entries(self):
+        """Test if no events are returned when the feed has no cells"""
+
+        parser = MozillaClubParser('{"feed": {"updated": {"$t": "2016-12-13T15:44:04.821Z"}}}')
+        events = [event for event in parser.parse()]
+        self.assertListEqual(events, [])
+
+        parser = MozillaClubParser([])
+        events = [event for event in parser.parse()]
+        self.assertListEqual(events, [])
+
+    def test_parser_not_updated(self):
+        """Test if cells are not parsed when the feed was not updated"""
+
+        feed = read_feed_updated_first('2016-12-13T15:44:04.821Z')
+
+        parser = MozillaClubParser(feed)
+        events = [event for event in parser.parse(last_updated='2016-12-13T15:44:04.821Z')]
+        self.assertListEqual(events, [])
+        self.assertEqual(parser.updated, '2016-12-13T15:44:04.821Z')
+        self.assertTrue(parser.unchanged)
+
+        parser = MozillaClubParser(feed)
+        events = [event for event in parser.parse(last_updated='2016-12-01T10:00:00.000Z')]
+        self.assertEqual(len(events), 92)
+        self.assertFalse(parser.unchanged)
+
+        # The source of the chunks is closed
+        chunks = (chunk for chunk in [feed])
+        parser = MozillaClubParser(chunks)
+        events = [event for event in parser.parse(last_updated='2016-12-13T15:44:04.821Z')]
+        self.assertListEqual(events, [])
+        self.assertEqual(inspect.getgeneratorstate(chunks), inspect.GEN_CLOSED)
+
+        # The update date is read after the cells
+        parser = MozillaClubParser(read_file('data/mozillaclub/feed.json'))
+        events = [event for event in parser.parse(last_updated='2016-12-13T15:44:04.821Z')]
+        self.assertEqual(len(events), 92)
+        self.assertEqual(parser.updated, '2016-12-13T15:44:04.821Z')
+
+    def test_parser_updated(self):
+        """Test if the latest update of the cells of a row is set to the event"""
+
+        def cell(row, col, value, updated):
+            return {
+                'gs$cell': {'row': str(row), 'col': str(col)},
+                'content': {'$t': value},
+                'updated': {'$t': updated}
+            }
+
+        cells = [cell(1, 2, 'Date of Event', '2016-12-13T15:44:04.821Z'),
+                 cell(1, 3, 'Club Name', '2016-12-13T15:44:04.821Z'),
+                 cell(2, 2, '2016-01-01', '2016-12-13T15:44:04.821Z'),
+                 cell(2, 3, 'Club A', '2017-01-02T10:00:00.5Z'),
+                 cell(3, 2, '2016-02-02', '2016-12-13T16:00:00+01:00'),
+                 cell(3, 3, 'Club B', '2016-12-13T15:30:00.000Z')]
+        feed = json.dumps({'feed': {'entry': cells}})
+
+        parser = MozillaClubParser(feed)
+        events = [event for event in parser.parse()]
+
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0]['Club Name'], 'Club A')
+        self.assertEqual(events[0]['updated'], '2017-01-02T10:00:00.5Z')
+        self.assertEqual(events[1]['Club Name'], 'Club B')
+        self.assertEqual(events[1]['updated'], '2016-12-13T15:30:00.000Z')
+
+
+class TestParseCellDatetime(unittest.TestCase):
+    """Tests for parse_cell_datetime function"""
+
+    def test_parse(self):
+        """Test if dates in the format of the feed are converted"""
+
+        expected = datetime.datetime(2016, 12, 13, 15, 44, 4, 821000,
+                                     tzinfo=datetime.timezone.utc)
+        self.assertEqual(parse_cell_datetime('2016-12-13T15:44:04.821Z'), expected)
+
+        expected = datetime.datetime(2016, 12, 13, 15, 44, 4, 500000,
+                                     tzinfo=datetime.timezone.utc)
+        self.assertEqual(parse_cell_datetime('2016-12-13T15:44:04.5Z'), expected)
+
+        expected = datetime.datetime(2016, 12, 13, 15, 44, 4, 123456,
+                                     tzinfo=datetime.timezone.utc)
+        self.assertEqual(parse_cell_datetime('2016-12-13T15:44:04.123456Z'), expected)
+
+    def test_other_formats(self):
+        """Test if dates in other formats are converted too"""
+
+        expected = datetime.datetime(2016, 12, 13, 14, 44, 4,
+                                     tzinfo=datetime.timezone.utc)
+        self.assertEqual(parse_cell_datetime('2016-12-13T15:44:04+01:00'), expected)
+
+        expected = datetime.datetime(2016, 12, 13, tzinfo=datetime.timezone.utc)
+        self.assertEqual(parse_cell_datetime('2016-12-13'), expected)
+
 
 if __name__ == "__main__":
     unittest.main(warnings='ignore')
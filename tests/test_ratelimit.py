@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from perceval.backends.mozilla.ratelimit import (FileTokenBucket,
+                                                 RateLimiter,
+                                                 TokenBucket,
+                                                 fcntl,
+                                                 get_rate_limiter)
+
+
+class FakeClock:
+    """Clock which only advances when it is told to"""
+
+    def __init__(self, now=1500000000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Tests for TokenBucket class"""
+
+    def test_burst(self):
+        """Test if requests are not delayed until the bucket is empty"""
+
+        clock = FakeClock()
+        bucket = TokenBucket(2, burst=3, clock=clock)
+
+        self.assertEqual(bucket.burst, 3)
+        self.assertListEqual([bucket.reserve() for _ in range(3)], [0, 0, 0])
+        self.assertEqual(bucket.reserve(), 0.5)
+        self.assertEqual(bucket.reserve(), 1.0)
+
+    def test_default_burst(self):
+        """Test if the default burst is the number of tokens of a second"""
+
+        self.assertEqual(TokenBucket(10).burst, 10)
+        self.assertEqual(TokenBucket(0.5).burst, 1)
+
+    def test_refill(self):
+        """Test if the bucket is refilled over time up to the burst"""
+
+        clock = FakeClock()
+        bucket = TokenBucket(2, burst=2, clock=clock)
+
+        bucket.reserve()
+        bucket.reserve()
+        self.assertEqual(bucket.reserve(), 0.5)
+
+        # The token reserved in debt is paid first
+        clock.now += 1
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0.5)
+
+        # Idle time does not add more tokens than the burst
+        clock.now += 3600
+        self.assertListEqual([bucket.reserve() for _ in range(3)], [0, 0, 0.5])
+
+    def test_several_tokens(self):
+        """Test if several tokens are taken at once"""
+
+        clock = FakeClock()
+        bucket = TokenBucket(1, burst=5, clock=clock)
+
+        self.assertEqual(bucket.reserve(tokens=5), 0)
+        self.assertEqual(bucket.reserve(tokens=2), 2.0)
+
+    def test_threads(self):
+        """Test if concurrent reservations are serialized"""
+
+        clock = FakeClock()
+        bucket = TokenBucket(10, burst=1, clock=clock)
+        waits = []
+
+        def reserve():
+            for _ in range(50):
+                waits.append(bucket.reserve())
+
+        threads = [threading.Thread(target=reserve) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Each reservation waits a tenth of a second more than the previous
+        self.assertEqual(len(waits), 200)
+        self.assertAlmostEqual(max(waits), 19.9)
+        self.assertEqual(len(set(round(wait, 6) for wait in waits)), 200)
+
+    def test_invalid_rate(self):
+        """Test if an exception is raised when the rate is not positive"""
+
+        with self.assertRaises(ValueError):
+            TokenBucket(0)
+
+        with self.assertRaises(ValueError):
+            RateLimiter(-1)
+
+
+@unittest.skipIf(fcntl is None, "file locks are not available")
+class TestFileTokenBucket(unittest.TestCase):
+    """Tests for FileTokenBucket class"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        self.path = os.path.join(self.tmp_path, 'bucket')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def test_shared(self):
+        """Test if buckets on the same file share their tokens"""
+
+        clock = FakeClock()
+        bucket_a = FileTokenBucket(self.path, 1, burst=2, clock=clock)
+        bucket_b = FileTokenBucket(self.path, 1, burst=2, clock=clock)
+
+        self.assertEqual(bucket_a.reserve(), 0)
+        self.assertEqual(bucket_b.reserve(), 0)
+        self.assertEqual(bucket_a.reserve(), 1.0)
+        self.assertEqual(bucket_b.reserve(), 2.0)
+
+        clock.now += 10
+        self.assertEqual(bucket_b.reserve(), 0)
+
+    def test_invalid_state(self):
+        """Test if the bucket is reset when its file is not valid"""
+
+        with open(self.path, 'w') as f:
+            f.write("invalid state")
+
+        clock = FakeClock()
+        bucket = FileTokenBucket(self.path, 1, burst=1, clock=clock)
+
+        with self.assertLogs('perceval.backends.mozilla.ratelimit', level='WARNING'):
+            self.assertEqual(bucket.reserve(), 0)
+
+        self.assertEqual(bucket.reserve(), 1.0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Tests for RateLimiter class"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def test_hosts(self):
+        """Test if each host has its own bucket"""
+
+        rate_limiter = RateLimiter(1)
+
+        bucket = rate_limiter.bucket('https://crates.io/api/v1/crates')
+        self.assertIsInstance(bucket, TokenBucket)
+        self.assertIs(rate_limiter.bucket('https://CRATES.io/api/v1/summary'), bucket)
+        self.assertIsNot(rate_limiter.bucket('https://support.mozilla.org/api/2/'), bucket)
+
+    def test_acquire(self):
+        """Test if requests wait when the limit is reached"""
+
+        sleeps = []
+        rate_limiter = RateLimiter(100, burst=1, sleep=sleeps.append)
+
+        rate_limiter.acquire('https://crates.io/api/v1/crates')
+        rate_limiter.acquire('https://support.mozilla.org/api/2/question/')
+        self.assertListEqual(sleeps, [])
+
+        rate_limiter.acquire('https://crates.io/api/v1/crates')
+        self.assertEqual(len(sleeps), 1)
+        self.assertGreater(sleeps[0], 0)
+        self.assertLessEqual(sleeps[0], 0.01)
+
+    @unittest.skipIf(fcntl is None, "file locks are not available")
+    def test_path(self):
+        """Test if buckets are stored in the given directory"""
+
+        path = os.path.join(self.tmp_path, 'limits')
+
+        rate_limiter = RateLimiter(1, path=path)
+        self.assertTrue(os.path.isdir(path))
+
+        bucket = rate_limiter.bucket('https://crates.io:443/api/v1/crates')
+        self.assertIsInstance(bucket, FileTokenBucket)
+        self.assertEqual(bucket.path, os.path.join(path, 'crates.io_443.bucket'))
+
+        rate_limiter.reserve('https://crates.io:443/api/v1/crates')
+        self.assertTrue(os.path.exists(bucket.path))
+
+        # Limiters of other processes share the bucket
+        other = RateLimiter(1, path=path)
+        self.assertGreater(other.reserve('https://crates.io:443/api/v1/summary'), 0)
+
+
+class TestGetRateLimiter(unittest.TestCase):
+    """Tests for get_rate_limiter function"""
+
+    def test_shared(self):
+        """Test if the same limiter is returned for the same limits"""
+
+        rate_limiter = get_rate_limiter(3)
+        self.assertIsInstance(rate_limiter, RateLimiter)
+        self.assertEqual(rate_limiter.rate, 3)
+        self.assertIs(get_rate_limiter(3), rate_limiter)
+        self.assertIsNot(get_rate_limiter(4), rate_limiter)
+        self.assertIsNot(get_rate_limiter(3, burst=10), rate_limiter)
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')
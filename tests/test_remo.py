@@ -22,25 +22,36 @@
 #     Alvaro del Castillo <acs@bitergia.com>
 #
 
+import datetime
+import json
+import os
 import re
 import shutil
 import tempfile
 import unittest
+import unittest.mock
 
 import httpretty
+import requests
+
+from grimoirelab.toolkit.datetime import str_to_datetime
 
 from perceval.backend import BackendCommandArgumentParser
 from perceval.cache import Cache
 from perceval.errors import CacheError
+from perceval.backends.mozilla.client import create_session
+from perceval.backends.mozilla.ratelimit import RateLimiter
 
 from perceval.backends.mozilla.remo import (ReMo,
                                             ReMoCommand,
                                             ReMoClient,
+                                            ReMoWatermarks,
                                             MOZILLA_REPS_URL)
 
 
 MOZILLA_REPS_SERVER_URL = 'http://example.com'
 MOZILLA_REPS_API = MOZILLA_REPS_SERVER_URL + '/api/remo/v1'
+REPS_USERS_API = 'https://reps.mozilla.org/api/remo/v1/users/'
 
 MOZILLA_REPS_CATEGORIES = ['events', 'activities', 'users']
 
@@ -99,6 +110,58 @@ class HTTPServer():
                                ])
 
 
+def setup_users_server():
+    """Serve the records of the users referenced by the items.
+
+    Returns the list of URLs of the users requested.
+    """
+    requested = []
+    body = read_file('data/remo/remo_users.json')
+
+    def request_callback(method, uri, headers):
+        requested.append(uri)
+        return (200, headers, body)
+
+    httpretty.register_uri(httpretty.GET,
+                           re.compile(REPS_USERS_API + ".*"),
+                           responses=[
+                               httpretty.Response(body=request_callback)
+                           ])
+
+    return requested
+
+
+def setup_dated_events_server(nevents):
+    """Serve a page of events which end on consecutive days of 2017.
+
+    Returns the list of query strings of the pages requested.
+    """
+    requested = []
+    event = json.loads(read_file('data/remo/remo_events.json'))
+
+    def request_callback(method, uri, headers):
+        if 'page' in uri:
+            requested.append(httpretty.last_request().querystring)
+            results = [{'_url': MOZILLA_REPS_API + '/events/%i/' % i}
+                       for i in range(1, nevents + 1)]
+            body = {'count': nevents, 'next': None, 'results': results}
+        else:
+            event_id = int(uri.rstrip('/').rsplit('/', 1)[1])
+            body = dict(event)
+            body['remo_url'] = 'https://reps.mozilla.org/e/%i/' % event_id
+            body['end'] = '2017-01-%02iT10:00:00Z' % event_id
+
+        return (200, headers, json.dumps(body))
+
+    httpretty.register_uri(httpretty.GET,
+                           re.compile(MOZILLA_REPS_API + "/events/.*"),
+                           responses=[
+                               httpretty.Response(body=request_callback)
+                           ])
+
+    return requested
+
+
 class TestReMoBackend(unittest.TestCase):
     """ReMo backend tests"""
 
@@ -110,8 +173,42 @@ class TestReMoBackend(unittest.TestCase):
         self.assertEqual(remo.url, MOZILLA_REPS_SERVER_URL)
         self.assertEqual(remo.origin, MOZILLA_REPS_SERVER_URL)
         self.assertEqual(remo.tag, 'test')
+        self.assertEqual(remo.workers, 1)
         self.assertIsInstance(remo.client, ReMoClient)
 
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, workers=4)
+        self.assertEqual(remo.workers, 4)
+        self.assertIsNone(remo.client.rate_limiter)
+
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, rate_limit=2)
+        self.assertIsInstance(remo.rate_limiter, RateLimiter)
+        self.assertEqual(remo.rate_limiter.rate, 2)
+        self.assertIs(remo.client.rate_limiter, remo.rate_limiter)
+
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, json_codec='json')
+        self.assertEqual(remo.codec.name, 'json')
+        self.assertIs(remo.client.codec, remo.codec)
+
+        # The cache is flushed after every item by default
+        self.assertEqual(remo.flush_items, 1)
+        self.assertIsNone(remo.flush_pages)
+        self.assertIsNone(remo.flush_interval)
+
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, flush_pages=1, flush_interval=30)
+        self.assertIsNone(remo.flush_items)
+        self.assertEqual(remo.flush_pages, 1)
+        self.assertEqual(remo.flush_interval, 30)
+
+        with self.assertRaises(ValueError):
+            ReMo(MOZILLA_REPS_SERVER_URL, flush_items=-1)
+
+        self.assertFalse(remo.resolve_users)
+        self.assertIsNone(remo.users_cache_path)
+        self.assertIsNone(remo.watermark_path)
+
+        with self.assertRaises(ValueError):
+            ReMo(MOZILLA_REPS_SERVER_URL, users_cache_size=0)
+
         # When tag is empty or None it will be set to
         # the value in url
         remo = ReMo(MOZILLA_REPS_SERVER_URL)
@@ -244,10 +341,113 @@ class TestReMoBackend(unittest.TestCase):
         self.assertEqual(items[5]['offset'], 17)
         self.assertEqual(uuid_17_1, uuid_17_2)
 
+    @httpretty.activate
+    def test_fetch_workers(self):
+        """Test whether items are returned in order when using workers"""
+
+        HTTPServer.routes()
+
+        for category in MOZILLA_REPS_CATEGORIES:
+            remo = ReMo(MOZILLA_REPS_SERVER_URL)
+            expected = [item for item in remo.fetch(offset=5, category=category)]
+
+            remo = ReMo(MOZILLA_REPS_SERVER_URL, workers=4)
+            items = [item for item in remo.fetch(offset=5, category=category)]
+
+            self.assertEqual(len(items), 35)
+            self.assertEqual(len(items), len(expected))
+
+            for i in range(len(items)):
+                self.assertEqual(items[i]['offset'], i + 5)
+                self.assertEqual(items[i]['uuid'], expected[i]['uuid'])
+                self.assertDictEqual(items[i]['data'], expected[i]['data'])
+
+    @httpretty.activate
+    def test_fetch_categories(self):
+        """Test whether several categories are fetched in turns"""
+
+        items_page = ReMoClient.ITEMS_PER_PAGE
+
+        HTTPServer.routes()
+
+        expected = {}
+        for category in MOZILLA_REPS_CATEGORIES:
+            remo = ReMo(MOZILLA_REPS_SERVER_URL)
+            expected[category] = [item['data'] for item in remo.fetch(category=category)]
+
+        prev_requests_http = len(HTTPServer.requests_http)
+
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, workers=4)
+        items = [item for item in remo.fetch(category='events,activities,users')]
+
+        self.assertEqual(len(items), 3 * 2 * items_page)
+
+        # A page of each category in turns
+        categories = [item['category'] for item in items[::items_page]]
+        self.assertListEqual(categories, ['event', 'activity', 'user'] * 2)
+
+        for category, item_category in [('events', 'event'), ('activities', 'activity'),
+                                        ('users', 'user')]:
+            category_items = [item for item in items if item['category'] == item_category]
+            self.assertListEqual([item['data'] for item in category_items], expected[category])
+            self.assertListEqual([item['offset'] for item in category_items],
+                                 list(range(2 * items_page)))
+
+        pages = [request.querystring['page'][0] + '/' + request.path.split('/')[4]
+                 for request in HTTPServer.requests_http[prev_requests_http:]
+                 if request.querystring]
+        self.assertListEqual(pages, ['1/events', '1/activities', '1/users',
+                                     '2/events', '2/activities', '2/users'])
+
+        # Categories can also be given in a list
+        remo = ReMo(MOZILLA_REPS_SERVER_URL)
+        items = [item['data'] for item in remo.fetch(category=['users', 'events'])]
+        self.assertListEqual(items[:items_page], expected['users'][:items_page])
+        self.assertListEqual(items[items_page:2 * items_page], expected['events'][:items_page])
+
+    @httpretty.activate
+    def test_fetch_categories_offset(self):
+        """Test whether each category is fetched from its offset"""
+
+        HTTPServer.routes()
+
+        remo = ReMo(MOZILLA_REPS_SERVER_URL)
+        expected = [item['uuid'] for item in remo.fetch(offset=25, category='activities')]
+
+        items = [item for item in remo.fetch(offset={'events': 15, 'activities': 25},
+                                             category='events,activities,users')]
+
+        events = [item for item in items if item['category'] == 'event']
+        activities = [item for item in items if item['category'] == 'activity']
+        users = [item for item in items if item['category'] == 'user']
+
+        self.assertEqual(len(events), 25)
+        self.assertEqual(events[0]['offset'], 15)
+        self.assertListEqual([item['uuid'] for item in activities], expected)
+        self.assertEqual(activities[0]['offset'], 25)
+        self.assertEqual(len(users), 40)
+        self.assertEqual(users[0]['offset'], 0)
+
+        # An integer is the offset of every category
+        items = [item for item in remo.fetch(offset=30, category='events,users')]
+        self.assertEqual(len(items), 20)
+        self.assertListEqual([item['offset'] for item in items], list(range(30, 40)) * 2)
+
+        with self.assertRaises(ValueError):
+            _ = [item for item in remo.fetch(offset={'users': 5}, category='events')]
+
     def test_fetch_wrong_category(self):
         with self.assertRaises(ValueError):
             self.__test_fetch(category='wrong')
 
+        remo = ReMo(MOZILLA_REPS_SERVER_URL)
+
+        with self.assertRaises(ValueError):
+            _ = [item for item in remo.fetch(category='events,wrong')]
+
+        with self.assertRaises(ValueError):
+            _ = [item for item in remo.fetch(category='')]
+
     @httpretty.activate
     def test_fetch_empty(self):
         """Test whether it works when no items are fetched"""
@@ -260,6 +460,290 @@ class TestReMoBackend(unittest.TestCase):
         self.assertEqual(len(events), 0)
 
 
+class TestReMoBackendUsers(unittest.TestCase):
+    """ReMo backend tests resolving the users referenced by the items"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        self.users_cache_path = os.path.join(self.tmp_path, 'users.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    @httpretty.activate
+    def test_fetch_events(self):
+        """Test whether the owners of the events are requested once"""
+
+        HTTPServer.routes()
+        requested = setup_users_server()
+
+        user = json.loads(read_file('data/remo/remo_users.json'))
+
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, resolve_users=True)
+        events = [item['data'] for item in remo.fetch(category='events')]
+
+        self.assertGreater(len(events), 1)
+        self.assertListEqual(requested, [REPS_USERS_API + '180/'])
+
+        for event in events:
+            self.assertDictEqual(event['owner_data'], user)
+
+        # Records are not shared among items
+        self.assertIsNot(events[0]['owner_data'], events[1]['owner_data'])
+
+    @httpretty.activate
+    def test_fetch_activities(self):
+        """Test whether users and mentors of the activities are added"""
+
+        HTTPServer.routes()
+        requested = setup_users_server()
+
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, resolve_users=True)
+        activities = [item['data'] for item in remo.fetch(category='activities')]
+
+        self.assertListEqual(requested, [REPS_USERS_API + '1976/', REPS_USERS_API + '325/'])
+        self.assertEqual(activities[0]['user_data']['remo_url'], 'https://reps.mozilla.org/u/aaroncajes/')
+        self.assertEqual(activities[0]['mentor_data']['remo_url'], 'https://reps.mozilla.org/u/aaroncajes/')
+
+        # Users are not resolved by default
+        remo = ReMo(MOZILLA_REPS_SERVER_URL)
+        activities = [item['data'] for item in remo.fetch(category='activities')]
+        self.assertNotIn('user_data', activities[0])
+        self.assertEqual(len(requested), 2)
+
+    @httpretty.activate
+    def test_users_cache_size(self):
+        """Test whether evicted users are requested again"""
+
+        HTTPServer.routes()
+        requested = setup_users_server()
+
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, resolve_users=True, users_cache_size=1)
+        activities = [item for item in remo.fetch(category='activities')]
+
+        # User and mentor evict each other
+        self.assertEqual(len(requested), 2 * len(activities))
+
+    @httpretty.activate
+    def test_users_cache_path(self):
+        """Test whether user records are stored between executions"""
+
+        HTTPServer.routes()
+        requested = setup_users_server()
+
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, resolve_users=True,
+                    users_cache_path=self.users_cache_path)
+        expected = [item['data'] for item in remo.fetch(category='events')]
+        self.assertEqual(len(requested), 1)
+
+        with open(self.users_cache_path, 'r') as f:
+            users = json.load(f)['users']
+        self.assertEqual(len(users), 1)
+        self.assertEqual(users[0][0], REPS_USERS_API + '180/')
+
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, resolve_users=True,
+                    users_cache_path=self.users_cache_path)
+        events = [item['data'] for item in remo.fetch(category='events')]
+
+        self.assertEqual(len(requested), 1)
+        self.assertListEqual(events, expected)
+
+    @httpretty.activate
+    def test_fetch_from_cache(self):
+        """Test whether the user records are stored in the cache once"""
+
+        HTTPServer.routes()
+        requested = setup_users_server()
+
+        cache = Cache(self.tmp_path)
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, cache=cache, resolve_users=True)
+        events = [item['data'] for item in remo.fetch(category='events')]
+
+        users = [item for item in cache.retrieve() if type(item) is tuple]
+        self.assertEqual(len(users), 1)
+
+        cached_events = [item['data'] for item in remo.fetch_from_cache()]
+        self.assertListEqual(cached_events, events)
+        self.assertEqual(len(requested), 1)
+
+
+class TestReMoBackendFromDate(unittest.TestCase):
+    """ReMo backend tests fetching the items updated since a date"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        self.watermark_path = os.path.join(self.tmp_path, 'watermarks.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    @httpretty.activate
+    def test_fetch_from_date(self):
+        """Test whether only the items updated since the date are returned"""
+
+        requested = setup_dated_events_server(5)
+
+        remo = ReMo(MOZILLA_REPS_SERVER_URL)
+        from_date = datetime.datetime(2017, 1, 3, 10, 0, 0)
+        items = [item for item in remo.fetch(category='events', from_date=from_date)]
+
+        self.assertListEqual([item['data']['remo_url'] for item in items],
+                             ['https://reps.mozilla.org/e/3/',
+                              'https://reps.mozilla.org/e/4/',
+                              'https://reps.mozilla.org/e/5/'])
+        self.assertListEqual([item['offset'] for item in items], [2, 3, 4])
+
+        # Events are filtered by date in the server
+        self.assertListEqual(requested, [{'page': ['1'], 'end__gte': ['2017-01-03']}])
+
+        items = [item for item in remo.fetch(category='events')]
+        self.assertEqual(len(items), 5)
+        self.assertDictEqual(requested[-1], {'page': ['1']})
+
+    @httpretty.activate
+    def test_fetch_from_date_cache(self):
+        """Test whether the offsets of the items are recovered from the cache"""
+
+        setup_dated_events_server(6)
+
+        cache = Cache(self.tmp_path)
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, cache=cache)
+        from_date = datetime.datetime(2017, 1, 4)
+        items = [item for item in remo.fetch(offset=1, category='events', from_date=from_date)]
+
+        cached_items = [item for item in remo.fetch_from_cache()]
+        self.assertEqual(len(cached_items), 3)
+
+        for i in range(len(items)):
+            self.assertDictEqual(cached_items[i]['data'], items[i]['data'])
+            self.assertEqual(cached_items[i]['offset'], items[i]['offset'])
+
+    @httpretty.activate
+    def test_fetch_from_watermark(self):
+        """Test whether categories without date filters start at their watermark"""
+
+        HTTPServer.routes()
+
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, watermark_path=self.watermark_path)
+
+        # Interrupted fetch; the watermark is set at the last item returned
+        items = remo.fetch(category='users')
+        _ = [next(items) for _ in range(25)]
+        items.close()
+
+        joined_on = str_to_datetime('2011-06-01').timestamp()
+        watermarks = ReMoWatermarks(self.watermark_path)
+        watermarks.load()
+        self.assertDictEqual(watermarks.marks, {'users': {'offset': 25, 'updated_on': joined_on}})
+
+        # None of the users before the watermark was updated since
+        # the date, so the listing starts at the watermark
+        prev_requests_http = len(HTTPServer.requests_http)
+        from_date = datetime.datetime(2012, 1, 1)
+        items = [item for item in remo.fetch(category='users', from_date=from_date)]
+        self.assertEqual(len(items), 0)
+
+        pages = [request.querystring for request in HTTPServer.requests_http[prev_requests_http:]
+                 if request.querystring]
+        self.assertListEqual(pages, [{'page': ['2']}])
+
+        # Details of the users from the last one before the watermark
+        self.assertEqual(len(HTTPServer.requests_http) - prev_requests_http, 1 + 16)
+
+        watermarks.load()
+        self.assertDictEqual(watermarks.marks, {'users': {'offset': 40, 'updated_on': joined_on}})
+
+        # Users before the watermark were updated since this date
+        from_date = datetime.datetime(2011, 1, 1)
+        items = [item for item in remo.fetch(category='users', from_date=from_date)]
+        self.assertListEqual([item['offset'] for item in items], list(range(40)))
+
+    @httpretty.activate
+    def test_fetch_from_date_categories(self):
+        """Test whether each category is fetched with its own strategy"""
+
+        HTTPServer.routes()
+
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, watermark_path=self.watermark_path)
+        _ = [item for item in remo.fetch(category='events,users')]
+
+        prev_requests_http = len(HTTPServer.requests_http)
+        from_date = datetime.datetime(2012, 1, 1)
+        items = [item for item in remo.fetch(category='events,users', from_date=from_date)]
+
+        # The server used by the tests does not filter events
+        self.assertEqual(len(items), 40)
+        self.assertTrue(all(item['category'] == 'event' for item in items))
+
+        # Users are listed from the page of their watermark
+        pages = [request.querystring for request in HTTPServer.requests_http[prev_requests_http:]
+                 if request.querystring]
+        self.assertListEqual(pages, [{'page': ['1'], 'end__gte': ['2012-01-01']},
+                                     {'page': ['2']},
+                                     {'page': ['2'], 'end__gte': ['2012-01-01']}])
+
+
+class TestReMoWatermarks(unittest.TestCase):
+    """Tests for ReMoWatermarks class"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        self.path = os.path.join(self.tmp_path, 'watermarks.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def test_start(self):
+        """Test the offset where the listings start"""
+
+        watermarks = ReMoWatermarks()
+        watermarks.marks = {'users': {'offset': 30, 'updated_on': 100.0}}
+
+        from_date = datetime.datetime.fromtimestamp(200.0, datetime.timezone.utc)
+        self.assertEqual(watermarks.start('users', 0, from_date), 29)
+        self.assertEqual(watermarks.start('users', 35, from_date), 35)
+
+        from_date = datetime.datetime.fromtimestamp(100.0, datetime.timezone.utc)
+        self.assertEqual(watermarks.start('users', 10, from_date), 10)
+        self.assertEqual(watermarks.start('users', 10), 10)
+        self.assertEqual(watermarks.start('events', 10, from_date), 10)
+
+    def test_tracked(self):
+        """Test if only the categories whose previous items are known are tracked"""
+
+        watermarks = ReMoWatermarks(self.path)
+        watermarks.marks = {'users': {'offset': 30, 'updated_on': 100.0}}
+
+        watermarks.start('events', 10)
+        watermarks.done('events', 10, 500.0)
+        watermarks.start('activities', 0)
+        watermarks.done('activities', 0, 50.0)
+        watermarks.start('users', 20)
+        watermarks.done('users', 20, 300.0)
+        watermarks.save()
+
+        watermarks = ReMoWatermarks(self.path)
+        watermarks.load()
+
+        expected = {
+            'activities': {'offset': 1, 'updated_on': 50.0},
+            'users': {'offset': 30, 'updated_on': 300.0}
+        }
+        self.assertDictEqual(watermarks.marks, expected)
+
+    def test_no_path(self):
+        """Test if nothing is stored when there is no path"""
+
+        watermarks = ReMoWatermarks()
+        watermarks.load()
+        watermarks.start('users', 0)
+        watermarks.done('users', 0, 50.0)
+        watermarks.save()
+
+        self.assertDictEqual(watermarks.marks, {'users': {'offset': 1, 'updated_on': 50.0}})
+        self.assertListEqual(os.listdir(self.tmp_path), [])
+
+
 class TestReMoBackendCache(unittest.TestCase):
     """ReMo backend tests using a cache"""
 
@@ -299,12 +783,116 @@ class TestReMoBackendCache(unittest.TestCase):
     def test_fetch_from_cache_events(self):
         self.__test_fetch_from_cache('events')
 
+    @httpretty.activate
+    def test_flush_policies(self):
+        """Test whether the cache holds the same data with any flush policy"""
+
+        HTTPServer.routes()
+
+        cache = Cache(os.path.join(self.tmp_path, 'items'))
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, cache=cache)
+        items = [item for item in remo.fetch()]
+        expected = [item for item in cache.retrieve()]
+
+        policies = [{'flush_items': 5}, {'flush_pages': 1}, {'flush_interval': 3600}]
+        writes = []
+
+        for policy in policies:
+            cache.clean(erase=True)
+            remo = ReMo(MOZILLA_REPS_SERVER_URL, cache=cache, **policy)
+
+            with unittest.mock.patch.object(cache, 'store', wraps=cache.store) as store:
+                _ = [item for item in remo.fetch()]
+            writes.append(store.call_count)
+
+            self.assertListEqual([item for item in cache.retrieve()], expected)
+
+            cached_items = [item['data'] for item in remo.fetch_from_cache()]
+            self.assertListEqual(cached_items, [item['data'] for item in items])
+
+        # Every 5 items, after each of the 2 pages and at the end
+        self.assertListEqual(writes, [len(items) // 5 + 1, 3, 1])
+
+    @httpretty.activate
+    def test_flush_interrupted(self):
+        """Test whether the items returned are stored when the fetch is interrupted"""
+
+        HTTPServer.routes()
+
+        cache = Cache(self.tmp_path)
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, cache=cache, flush_pages=1)
+
+        items = remo.fetch()
+        expected = [next(items)['data'] for _ in range(3)]
+        items.close()
+
+        cached_items = [item['data'] for item in remo.fetch_from_cache()]
+        self.assertListEqual(cached_items, expected)
+
     def test_fetch_from_cache_users(self):
         self.__test_fetch_from_cache('users')
 
     def test_fetch_from_cache_activitites(self):
         self.__test_fetch_from_cache('activities')
 
+    @httpretty.activate
+    def test_fetch_from_cache_workers(self):
+        """Test whether the cache layout is the same when using workers"""
+
+        HTTPServer.routes()
+
+        cache = Cache(self.tmp_path)
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, cache=cache)
+        items = [item for item in remo.fetch(offset=3)]
+        expected = [raw for raw in cache.retrieve()]
+
+        cache = Cache(os.path.join(self.tmp_path, 'workers'))
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, cache=cache, workers=4)
+        _ = [item for item in remo.fetch(offset=3)]
+        self.assertListEqual([raw for raw in cache.retrieve()], expected)
+
+        cached_items = [item for item in remo.fetch_from_cache()]
+        self.assertEqual(len(cached_items), len(items))
+
+        for i in range(len(items)):
+            self.assertDictEqual(cached_items[i]['data'], items[i]['data'])
+            self.assertEqual(cached_items[i]['offset'], items[i]['offset'])
+
+    @httpretty.activate
+    def test_fetch_from_cache_categories(self):
+        """Test whether the items of several categories are retrieved from the cache"""
+
+        HTTPServer.routes()
+
+        cache = Cache(self.tmp_path)
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, cache=cache)
+        items = [item for item in remo.fetch(offset={'events': 3, 'users': 25},
+                                             category='events,activities,users')]
+
+        requests_done = len(HTTPServer.requests_http)
+
+        cached_items = [item for item in remo.fetch_from_cache()]
+        self.assertEqual(len(HTTPServer.requests_http), requests_done)
+        self.assertEqual(len(cached_items), len(items))
+
+        for i in range(len(items)):
+            self.assertDictEqual(cached_items[i]['data'], items[i]['data'])
+            self.assertEqual(cached_items[i]['offset'], items[i]['offset'])
+
+    def test_fetch_from_text_cache(self):
+        """Test if items stored as text by previous versions are retrieved"""
+
+        page = read_file('data/remo/remo_events_page_1_2.json')
+        event = read_file('data/remo/remo_events.json')
+
+        cache = Cache(self.tmp_path)
+        cache.store(0, page, event)
+
+        remo = ReMo(MOZILLA_REPS_SERVER_URL, cache=cache)
+        cached_events = [item['data'] for item in remo.fetch_from_cache()]
+        self.assertEqual(len(cached_events), 1)
+        self.assertEqual(cached_events[0]['remo_url'], json.loads(event)['remo_url'])
+
     def test_fetch_from_empty_cache(self):
         """Test if there are not any events returned when the cache is empty"""
 
@@ -340,7 +928,19 @@ class TestReMoCommand(unittest.TestCase):
                 '--category', 'users',
                 '--tag', 'test',
                 '--no-cache',
-                '--offset', '88']
+                '--offset', '88',
+                '--workers', '6',
+                '--rate-limit', '2.5',
+                '--rate-limit-path', '/tmp/limits',
+                '--json-codec', 'json',
+                '--flush-items', '100',
+                '--flush-pages', '2',
+                '--flush-interval', '30',
+                '--resolve-users',
+                '--users-cache-size', '500',
+                '--users-cache-path', '/tmp/users.json',
+                '--from-date', '2017-01-01',
+                '--watermark-path', '/tmp/watermarks.json']
 
         parsed_args = parser.parse(*args)
         self.assertEqual(parsed_args.url, MOZILLA_REPS_SERVER_URL)
@@ -348,6 +948,21 @@ class TestReMoCommand(unittest.TestCase):
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.no_cache, True)
         self.assertEqual(parsed_args.offset, 88)
+        self.assertEqual(parsed_args.workers, 6)
+        self.assertEqual(parsed_args.rate_limit, 2.5)
+        self.assertEqual(parsed_args.rate_limit_path, '/tmp/limits')
+        self.assertEqual(parsed_args.json_codec, 'json')
+        self.assertEqual(parsed_args.flush_items, 100)
+        self.assertEqual(parsed_args.flush_pages, 2)
+        self.assertEqual(parsed_args.flush_interval, 30)
+        self.assertTrue(parsed_args.resolve_users)
+        self.assertEqual(parsed_args.users_cache_size, 500)
+        self.assertEqual(parsed_args.users_cache_path, '/tmp/users.json')
+        self.assertEqual(parsed_args.from_date, str_to_datetime('2017-01-01'))
+        self.assertEqual(parsed_args.watermark_path, '/tmp/watermarks.json')
+
+        parsed_args = parser.parse(MOZILLA_REPS_SERVER_URL)
+        self.assertIsNone(parsed_args.from_date)
 
 
 class TestReMoClient(unittest.TestCase):
@@ -362,6 +977,11 @@ class TestReMoClient(unittest.TestCase):
     def test_init(self):
         """Test initialization"""
         client = ReMoClient(MOZILLA_REPS_SERVER_URL)
+        self.assertIsInstance(client.session, requests.Session)
+
+        session = create_session()
+        client = ReMoClient(MOZILLA_REPS_SERVER_URL, session=session)
+        self.assertIs(client.session, session)
 
     @httpretty.activate
     def test_get_items(self):
@@ -370,11 +990,12 @@ class TestReMoClient(unittest.TestCase):
         HTTPServer.routes()
 
         # Set up a mock HTTP server
-        body = read_file('data/remo/remo_events_page_1_2.json')
+        body = read_file('data/remo/remo_events_page_1_2.json', mode='rb')
         client = ReMoClient(MOZILLA_REPS_SERVER_URL)
-        response = next(client.get_items())
+        response, items = next(client.get_items())
         req = HTTPServer.requests_http[-1]
         self.assertEqual(response, body)
+        self.assertDictEqual(items, json.loads(body))
         self.assertEqual(req.method, 'GET')
         self.assertEqual(req.path, '/api/remo/v1/events/?page=1')
         # Check request params
@@ -383,6 +1004,24 @@ class TestReMoClient(unittest.TestCase):
         }
         self.assertDictEqual(req.querystring, expected)
 
+    @httpretty.activate
+    def test_get_items_filters(self):
+        """Test if filters are sent in the requests of every page"""
+
+        HTTPServer.routes()
+
+        client = ReMoClient(MOZILLA_REPS_SERVER_URL)
+        pages = [page for page in client.get_items('activities',
+                                                   filters={'report_date__gte': '2017-01-01'})]
+        self.assertEqual(len(pages), 2)
+
+        expected = [
+            {'page': ['1'], 'report_date__gte': ['2017-01-01']},
+            {'page': ['2'], 'report_date__gte': ['2017-01-01']}
+        ]
+        requests_http = HTTPServer.requests_http[-2:]
+        self.assertListEqual([req.querystring for req in requests_http], expected)
+
     @httpretty.activate
     def test_call(self):
         """Test get_all_users API call"""
@@ -390,11 +1029,12 @@ class TestReMoClient(unittest.TestCase):
         HTTPServer.routes()
 
         # Set up a mock HTTP server
-        body = read_file('data/remo/remo_events_page_1_2.json')
+        body = read_file('data/remo/remo_events_page_1_2.json', mode='rb')
         client = ReMoClient(MOZILLA_REPS_SERVER_URL)
-        response = client.call(MOZILLA_REPS_API + '/events/?page=1')
+        response, items = client.call(MOZILLA_REPS_API + '/events/?page=1')
         req = HTTPServer.requests_http[-1]
         self.assertEqual(response, body)
+        self.assertDictEqual(items, json.loads(body))
         self.assertEqual(req.method, 'GET')
         self.assertEqual(req.path, '/api/remo/v1/events/?page=1')
         # Check request params
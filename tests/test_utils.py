@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2015-2017 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, 51 Franklin Street, Fifth Floor, Boston, MA 02110-1335, USA.
+#
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from perceval.backends.mozilla.utils import (FlushPolicy,
+                                             LRUCache,
+                                             async_round_robin,
+                                             iter_json_array,
+                                             load_state,
+                                             ordered_imap,
+                                             prefetch,
+                                             round_robin,
+                                             save_state)
+
+
+class TestOrderedIMap(unittest.TestCase):
+    """Tests for ordered_imap function"""
+
+    def test_order(self):
+        """Test if results are returned in the order of the items"""
+
+        def slow_identity(n):
+            # First items take longer to finish
+            time.sleep((10 - n) * 0.005)
+            return n
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
+            results = [r for r in ordered_imap(executor, slow_identity, range(10), 5)]
+
+        self.assertListEqual(results, list(range(10)))
+
+    def test_window(self):
+        """Test if the number of pending calls is bounded"""
+
+        lock = threading.Lock()
+        running = [0]
+        max_running = [0]
+
+        def count(n):
+            with lock:
+                running[0] += 1
+                max_running[0] = max(max_running[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return n
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+            results = [r for r in ordered_imap(executor, count, range(20), 3)]
+
+        self.assertListEqual(results, list(range(20)))
+        self.assertLessEqual(max_running[0], 3)
+
+    def test_exception(self):
+        """Test if exceptions are raised when their result is reached"""
+
+        def fail_on_three(n):
+            if n == 3:
+                raise ValueError(n)
+            return n
+
+        results = []
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            with self.assertRaises(ValueError):
+                for r in ordered_imap(executor, fail_on_three, range(10), 2):
+                    results.append(r)
+
+        self.assertListEqual(results, [0, 1, 2])
+
+
+class TestPrefetch(unittest.TestCase):
+    """Tests for prefetch function"""
+
+    def test_order(self):
+        """Test if items are returned in order"""
+
+        items = [item for item in prefetch(iter(range(50)), 3)]
+        self.assertListEqual(items, list(range(50)))
+
+    def test_depth(self):
+        """Test if no more than depth items are read in advance"""
+
+        read = []
+
+        def numbers():
+            for n in range(20):
+                read.append(n)
+                yield n
+
+        items = prefetch(numbers(), 2)
+        self.assertEqual(next(items), 0)
+
+        # Wait until the reader is blocked
+        time.sleep(0.2)
+
+        # One item consumed, two queued and one waiting for a slot
+        self.assertLessEqual(len(read), 4)
+
+        self.assertListEqual([item for item in items], list(range(1, 20)))
+
+    def test_exception(self):
+        """Test if exceptions are raised after the previous items"""
+
+        def numbers():
+            yield 0
+            yield 1
+            raise ValueError('error')
+
+        results = []
+
+        with self.assertRaises(ValueError):
+            for item in prefetch(numbers(), 5):
+                results.append(item)
+
+        self.assertListEqual(results, [0, 1])
+
+    def test_close(self):
+        """Test if the reader stops when the consumer is closed"""
+
+        read = []
+
+        def numbers():
+            for n in range(1000):
+                read.append(n)
+                yield n
+
+        items = prefetch(numbers(), 1)
+        self.assertEqual(next(items), 0)
+        items.close()
+
+        time.sleep(0.3)
+        nread = len(read)
+        time.sleep(0.3)
+
+        self.assertEqual(len(read), nread)
+        self.assertLess(nread, 1000)
+
+
+class TestRoundRobin(unittest.TestCase):
+    """Tests for round_robin and async_round_robin functions"""
+
+    def test_turns(self):
+        """Test if an item of each iterable is taken in turns"""
+
+        items = [item for item in round_robin([['a1', 'a2', 'a3'], [], ['b1'], ['c1', 'c2']])]
+        self.assertListEqual(items, ['a1', 'b1', 'c1', 'a2', 'c2', 'a3'])
+
+        self.assertListEqual([item for item in round_robin([])], [])
+
+    def test_lazy(self):
+        """Test if items are not read before they are needed"""
+
+        read = []
+
+        def numbers(name):
+            for n in range(3):
+                read.append((name, n))
+                yield n
+
+        items = round_robin([numbers('a'), numbers('b')])
+        self.assertEqual(next(items), 0)
+        self.assertListEqual(read, [('a', 0)])
+
+    def test_async_turns(self):
+        """Test if asynchronous iterables are read in turns"""
+
+        async def letters(name, n):
+            for i in range(n):
+                yield name + str(i + 1)
+
+        async def collect():
+            iterables = [letters('a', 3), letters('b', 0), letters('c', 1)]
+            return [item async for item in async_round_robin(iterables)]
+
+        loop = asyncio.new_event_loop()
+
+        try:
+            items = loop.run_until_complete(collect())
+        finally:
+            loop.close()
+
+        self.assertListEqual(items, ['a1', 'c1', 'a2', 'a3'])
+
+
+def split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestIterJSONArray(unittest.TestCase):
+    """Tests for iter_json_array function"""
+
+    DOCUMENT = json.dumps({
+        'version': 1.0,
+        'feed': {
+            'title': {'$t': 'cells'},
+            'entry': [{'id': 1, 'links': ['a', 'b']}, 12345, "text, with ]", None, [1, [2]]],
+            'updated': 1.5e10
+        },
+        'encoding': 'UTF-8'
+    }, indent=2)
+
+    ITEMS = [{'id': 1, 'links': ['a', 'b']}, 12345, "text, with ]", None, [1, [2]]]
+
+    def test_items(self):
+        """Test if the items of the array are returned"""
+
+        items = [item for item in iter_json_array([self.DOCUMENT], ['feed', 'entry'])]
+        self.assertListEqual(items, self.ITEMS)
+
+    def test_chunks(self):
+        """Test if items split among several chunks are decoded"""
+
+        for size in (1, 2, 3, 5, 16):
+            chunks = split(self.DOCUMENT, size)
+            items = [item for item in iter_json_array(chunks, ['feed', 'entry'])]
+            self.assertListEqual(items, self.ITEMS)
+
+    def test_bytes(self):
+        """Test if chunks of UTF-8 bytes are decoded, even splitting characters"""
+
+        document = '{"feed": {"entry": [{"title": "¿Qué?"}, "€"]}}'.encode('utf-8')
+        expected = [{'title': '¿Qué?'}, '€']
+
+        for size in (1, 2, 3, 16):
+            chunks = split(document, size)
+            items = [item for item in iter_json_array(chunks, ['feed', 'entry'])]
+            self.assertListEqual(items, expected)
+
+    def test_values(self):
+        """Test if the other values of the object are stored"""
+
+        for size in (1, 7, len(self.DOCUMENT)):
+            values = {}
+            items = iter_json_array(split(self.DOCUMENT, size), ['feed', 'entry'], values=values)
+
+            self.assertEqual(next(items), self.ITEMS[0])
+            self.assertDictEqual(values, {'title': {'$t': 'cells'}})
+
+            self.assertListEqual([item for item in items], self.ITEMS[1:])
+            self.assertDictEqual(values, {'title': {'$t': 'cells'}, 'updated': 1.5e10})
+
+    def test_root_array(self):
+        """Test if the items of an array in the root are returned"""
+
+        chunks = split('[1, 23, 456, {"a": [7]}]', 2)
+        items = [item for item in iter_json_array(chunks, [])]
+        self.assertListEqual(items, [1, 23, 456, {'a': [7]}])
+
+    def test_not_found(self):
+        """Test if no items are returned when the array is not found"""
+
+        items = [item for item in iter_json_array([self.DOCUMENT], ['feed', 'unknown'])]
+        self.assertListEqual(items, [])
+
+        items = [item for item in iter_json_array(['{}'], ['feed', 'entry'])]
+        self.assertListEqual(items, [])
+
+        items = [item for item in iter_json_array(['{"feed": {"entry": []}}'], ['feed', 'entry'])]
+        self.assertListEqual(items, [])
+
+    def test_empty(self):
+        """Test if no items are returned when there are no chunks"""
+
+        items = [item for item in iter_json_array([], ['feed', 'entry'])]
+        self.assertListEqual(items, [])
+
+        items = [item for item in iter_json_array(['', '  '], ['feed', 'entry'])]
+        self.assertListEqual(items, [])
+
+    def test_invalid(self):
+        """Test if an exception is raised when the document is not valid"""
+
+        documents = ['{"feed": {"entry": [1, 2}}',
+                     '{"feed": {"entry": [1, 2]',
+                     '{"feed": [1, 2]}',
+                     '{"feed": {"entry": [1, 2]}} 3']
+
+        for document in documents:
+            with self.assertRaises(json.JSONDecodeError):
+                _ = [item for item in iter_json_array(split(document, 3), ['feed', 'entry'])]
+
+
+class TestLRUCache(unittest.TestCase):
+    """Tests for LRUCache class"""
+
+    def test_get_put(self):
+        """Test if entries are stored and retrieved"""
+
+        cache = LRUCache(10)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('a', 0), 0)
+
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.put('a', 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertIn('a', cache)
+        self.assertEqual(cache.get('a'), 3)
+        self.assertListEqual(cache.items(), [('b', 2), ('a', 3)])
+
+    def test_evict(self):
+        """Test if the least recently used entries are removed"""
+
+        cache = LRUCache(2)
+
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn('b', cache)
+        self.assertListEqual(cache.items(), [('a', 1), ('c', 3)])
+
+    def test_invalid_size(self):
+        """Test if an exception is raised when the size is not positive"""
+
+        with self.assertRaises(ValueError):
+            LRUCache(0)
+
+
+class TestFlushPolicy(unittest.TestCase):
+    """Tests for FlushPolicy class"""
+
+    def test_items(self):
+        """Test if the queue is flushed every number of items"""
+
+        policy = FlushPolicy(items=3)
+
+        flushes = [policy.item_done() for _ in range(7)]
+        self.assertListEqual(flushes, [False, False, True, False, False, True, False])
+        self.assertFalse(policy.page_done())
+
+    def test_pages(self):
+        """Test if the queue is flushed every number of pages"""
+
+        policy = FlushPolicy(pages=2)
+
+        self.assertFalse(policy.item_done())
+        self.assertFalse(policy.page_done())
+        self.assertTrue(policy.page_done())
+        self.assertFalse(policy.page_done())
+
+    def test_interval(self):
+        """Test if the queue is flushed every number of seconds"""
+
+        now = [100.0]
+        policy = FlushPolicy(interval=10, clock=lambda: now[0])
+
+        self.assertFalse(policy.item_done())
+
+        now[0] += 10
+        self.assertTrue(policy.item_done())
+        self.assertFalse(policy.page_done())
+
+        now[0] += 5
+        self.assertFalse(policy.item_done())
+
+        now[0] += 5
+        self.assertTrue(policy.page_done())
+
+    def test_first_limit(self):
+        """Test if the queue is flushed when any of the limits is reached"""
+
+        now = [100.0]
+        policy = FlushPolicy(items=2, pages=1, interval=10, clock=lambda: now[0])
+
+        self.assertFalse(policy.item_done())
+        self.assertTrue(policy.page_done())
+        self.assertFalse(policy.item_done())
+        self.assertTrue(policy.item_done())
+
+        now[0] += 10
+        self.assertTrue(policy.item_done())
+
+    def test_no_limits(self):
+        """Test if the queue is never flushed when there are not limits"""
+
+        policy = FlushPolicy()
+
+        self.assertFalse(any(policy.item_done() for _ in range(100)))
+        self.assertFalse(any(policy.page_done() for _ in range(100)))
+
+    def test_invalid_limits(self):
+        """Test if an exception is raised when a limit is not positive"""
+
+        with self.assertRaises(ValueError):
+            FlushPolicy(items=0)
+
+        with self.assertRaises(ValueError):
+            FlushPolicy(pages=-1)
+
+        with self.assertRaises(ValueError):
+            FlushPolicy(interval=0)
+
+
+class TestState(unittest.TestCase):
+    """Tests for load_state and save_state functions"""
+
+    def setUp(self):
+        self.tmp_path = tempfile.mkdtemp(prefix='perceval_')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_path)
+
+    def test_load_not_found(self):
+        """Test if an empty state is returned when the file does not exist"""
+
+        state = load_state(os.path.join(self.tmp_path, 'state.json'))
+        self.assertDictEqual(state, {})
+
+    def test_save(self):
+        """Test if the state is stored and read"""
+
+        path = os.path.join(self.tmp_path, 'state.json')
+
+        save_state(path, {'etag': '"abc"', 'updated': None})
+        self.assertDictEqual(load_state(path), {'etag': '"abc"', 'updated': None})
+
+        save_state(path, {'etag': '"def"'})
+        self.assertDictEqual(load_state(path), {'etag': '"def"'})
+
+        # No temporary files are left
+        self.assertListEqual(os.listdir(self.tmp_path), ['state.json'])
+
+    def test_save_error(self):
+        """Test if the previous state is kept when the new one cannot be stored"""
+
+        path = os.path.join(self.tmp_path, 'state.json')
+        save_state(path, {'etag': '"abc"'})
+
+        with self.assertRaises(TypeError):
+            save_state(path, {'etag': object()})
+
+        self.assertDictEqual(load_state(path), {'etag': '"abc"'})
+        self.assertListEqual(os.listdir(self.tmp_path), ['state.json'])
+
+
+if __name__ == "__main__":
+    unittest.main(warnings='ignore')